@@ -1,6 +1,7 @@
 import re
 from .badge import Badge
 from .colors import Color
+from .gradient import Gradient
 from .styles import Style
 
 # Package information
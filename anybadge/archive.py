@@ -0,0 +1,246 @@
+"""Writing many badges into a single tar or zip archive.
+
+Writing each badge to its own file costs a file creation per badge, which dominates
+the time taken to write large numbers of badges, especially on network storage.  An
+archive is written as one file, sequentially, through a large buffer.  An
+``index.json`` member maps badge names to their members, labels, values and colors.
+"""
+
+import io
+import json
+import os
+import posixpath
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Mapping, Optional, Set, Tuple, Union
+
+from . import config
+from .badge import Badge
+
+#: Archive formats, by file name suffix.
+ARCHIVE_FORMATS = {
+    ".tar": "tar",
+    ".tar.gz": "tar.gz",
+    ".tgz": "tar.gz",
+    ".zip": "zip",
+}
+
+#: Name of the archive member mapping badge names to members.
+INDEX_MEMBER = "index.json"
+
+
+def archive_format(path: Union[str, Path]) -> Optional[str]:
+    """Return the archive format of a file name, or None if it is not an archive.
+
+    Examples:
+
+        >>> archive_format('badges.tar.gz'), archive_format('badges.zip')
+        ('tar.gz', 'zip')
+        >>> archive_format('badge.svg') is None
+        True
+    """
+    name = str(path).lower()
+    for suffix, archive_type in ARCHIVE_FORMATS.items():
+        if name.endswith(suffix):
+            return archive_type
+    return None
+
+
+def member_name(name: str) -> str:
+    """Return the archive member for a badge name.
+
+    Names can contain ``/`` to place badges in directories of the archive.
+
+    Raises:
+        ValueError: When the name is empty, absolute or outside the archive.
+
+    Examples:
+
+        >>> member_name('coverage'), member_name('packages/app.svg')
+        ('coverage.svg', 'packages/app.svg')
+    """
+    path = posixpath.normpath(str(name).replace("\\", "/"))
+    if path.endswith(".svg"):
+        path = path[: -len(".svg")]
+    if not name or path in (".", "..") or path.startswith(("/", "../")):
+        raise ValueError(f"Invalid badge name '{name}'.")
+    return path + ".svg"
+
+
+class _SequentialWriter:
+    """A file that can only be written in order, so archives are streamed.
+
+    Without ``seek()``, ``zipfile`` writes the sizes of members after their data
+    instead of going back to write them before.
+    """
+
+    def __init__(self, file_handle: BinaryIO):
+        self._file = file_handle
+
+    def write(self, data: bytes) -> int:
+        return self._file.write(data)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+
+class BadgeArchive:
+    """An archive that badges are written into.
+
+    The archive format is taken from the file name, which must end with ``.tar``,
+    ``.tar.gz``, ``.tgz`` or ``.zip``.  The index is written when the archive is
+    closed.  If an exception is raised inside a ``with`` block, the incomplete
+    archive is removed.
+
+    Args:
+        path: Location of the archive.
+        overwrite(bool, optional): Overwrite the archive if it already exists.
+
+    Raises:
+        ValueError: When the file name does not have an archive suffix.
+        RuntimeError: When the archive already exists and ``overwrite`` is False.
+
+    Examples:
+
+        >>> import tempfile
+        >>> directory = tempfile.TemporaryDirectory()
+        >>> with BadgeArchive(f'{directory.name}/badges.zip') as archive:
+        ...     archive.add('coverage', Badge('coverage', '97%'))
+        ...     archive.add('packages/app', Badge('app', '93%'))
+        'coverage.svg'
+        'packages/app.svg'
+        >>> with zipfile.ZipFile(f'{directory.name}/badges.zip') as zip_file:
+        ...     zip_file.namelist()
+        ['coverage.svg', 'packages/app.svg', 'index.json']
+        >>> directory.cleanup()
+    """
+
+    def __init__(self, path: Union[str, Path], overwrite: bool = False):
+        self.path = Path(path)
+        self.format = archive_format(self.path)
+        if self.format is None:
+            raise ValueError(
+                f"Unknown archive format for '{path}'. Archive names must end with "
+                + ", ".join(ARCHIVE_FORMATS)
+            )
+        if not overwrite and self.path.exists():
+            raise RuntimeError('File "{}" already exists.'.format(self.path))
+
+        self.index: Dict[str, Dict[str, str]] = {}
+        self._members: Set[str] = set()
+        self._mtime = time.time()
+        self._file = open(self.path, mode="wb", buffering=config.ARCHIVE_BUFFER_SIZE)
+        writer = _SequentialWriter(self._file)
+        self._tar: Optional[tarfile.TarFile] = None
+        self._zip: Optional[zipfile.ZipFile] = None
+        if self.format == "zip":
+            self._zip = zipfile.ZipFile(
+                writer,  # type: ignore
+                mode="w",
+                compression=zipfile.ZIP_DEFLATED,
+            )
+        else:
+            mode = "w|gz" if self.format == "tar.gz" else "w|"
+            self._tar = tarfile.open(fileobj=writer, mode=mode)  # type: ignore
+
+    def _write_member(self, name: str, data: bytes) -> None:
+        if self._zip is not None:
+            info = zipfile.ZipInfo(name, time.localtime(self._mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            self._zip.writestr(info, data)
+        elif self._tar is not None:
+            tar_info = tarfile.TarInfo(name)
+            tar_info.size = len(data)
+            tar_info.mtime = int(self._mtime)
+            tar_info.mode = 0o644
+            self._tar.addfile(tar_info, io.BytesIO(data))
+        else:
+            raise ValueError("The archive is closed.")
+
+    def add(self, name: str, badge: Badge) -> str:
+        """Render a badge into the archive.
+
+        Args:
+            name(str): Name of the badge.  The badge is written to ``<name>.svg``.
+            badge(Badge): The badge.
+
+        Returns:
+            str: The archive member the badge was written to.
+
+        Raises:
+            ValueError: When the name is not valid, or is already in the archive.
+        """
+        member = member_name(name)
+        if member in self._members:
+            raise ValueError(f"Badge '{name}' is already in the archive.")
+        self._write_member(member, badge.badge_svg_text.encode("utf-8"))
+        self._members.add(member)
+        self.index[name] = {
+            "file": member,
+            "label": badge.label,
+            "value": badge.value_text,
+            "color": badge.badge_color_code,
+        }
+        return member
+
+    def close(self) -> None:
+        """Write the index and close the archive."""
+        if self._zip is None and self._tar is None:
+            return
+        try:
+            index = {"badges": self.index}
+            self._write_member(INDEX_MEMBER, json.dumps(index).encode())
+        finally:
+            self._close_files()
+
+    def _close_files(self) -> None:
+        try:
+            if self._zip is not None:
+                self._zip.close()
+            if self._tar is not None:
+                self._tar.close()
+        finally:
+            self._zip = self._tar = None
+            self._file.close()
+
+    def __enter__(self) -> "BadgeArchive":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        self._close_files()
+        os.remove(self.path)
+
+
+def write_archive(
+    path: Union[str, Path],
+    badges: Union[Mapping[str, Badge], Iterable[Tuple[str, Badge]]],
+    overwrite: bool = False,
+) -> Dict[str, Dict[str, str]]:
+    """Write badges into a tar or zip archive with an index.
+
+    Args:
+        path: Location of the archive.  The format is taken from the suffix.
+        badges: Badges by name, as a mapping or as pairs.  Badges can be generated,
+            so they do not need to be held in memory at once.
+        overwrite(bool, optional): Overwrite the archive if it already exists.
+
+    Returns:
+        dict: The index of the archive.
+
+    Raises:
+        ValueError: When the file name does not have an archive suffix, or a badge
+            name is not valid.
+        RuntimeError: When the archive already exists and ``overwrite`` is False.
+    """
+    if isinstance(badges, Mapping):
+        badges = badges.items()
+    with BadgeArchive(path, overwrite=overwrite) as archive:
+        for name, badge in badges:
+            archive.add(name, badge)
+    return archive.index
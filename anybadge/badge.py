@@ -1,22 +1,75 @@
+import functools
+import math
 import os
 from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Type, Optional, Union
+from typing import Any, Callable, Dict, Mapping, Type, Optional, Tuple, Union
 import html
 
-from . import config
-from .colors import Color
+from . import config, profiling
+from .colors import get_color_code
 from .exceptions import UnknownBadgeTemplate
+from .gradient import ColorStops, get_gradient
 
-from .helpers import _get_approx_string_width
+from .helpers import text_width_cache
 
 
 # Try and obtain packaging package to support version comparison.
-from .templates import get_template
+from .templates import CompiledTemplate, compile_template, get_template
 
 from packaging.version import Version
 
 
+ThresholdItems = Tuple[Tuple[Any, str], ...]
+
+
+def _sort_thresholds(
+    items: ThresholdItems, value_type: Callable[[Any], Any]
+) -> ThresholdItems:
+    if value_type == Version:
+        converted = [(Version(threshold), color) for threshold, color in items]
+    else:
+        converted = [
+            (value_type(float(threshold)), color) for threshold, color in items
+        ]
+    return tuple(sorted(converted, key=lambda x: x[0]))
+
+
+@functools.lru_cache(maxsize=config.THRESHOLD_CACHE_SIZE)
+def _sorted_threshold_items(
+    items: ThresholdItems, value_type: Callable[[Any], Any]
+) -> ThresholdItems:
+    return _sort_thresholds(items, value_type)
+
+
+def sorted_thresholds(
+    thresholds: Mapping[Any, str], value_type: Callable[[Any], Any]
+) -> ThresholdItems:
+    """Return thresholds converted to the type of a badge value, in ascending order.
+
+    Converting and sorting thresholds takes longer than selecting a color from them,
+    so badges created with the same thresholds and value type share the result.
+
+    Args:
+        thresholds(dict): Threshold values mapped to colors.
+        value_type(type): ``Version``, or a numeric type such as ``float``.
+
+    Raises:
+        ValueError: When a threshold can not be converted to the value type.
+
+    Examples:
+
+        >>> sorted_thresholds({'4': 'orange', '2': 'red'}, float)
+        ((2.0, 'red'), (4.0, 'orange'))
+    """
+    items = tuple(thresholds.items())
+    try:
+        return _sorted_threshold_items(items, value_type)
+    except TypeError:
+        # The thresholds are not hashable, so can not be cached.
+        return _sort_thresholds(items, value_type)
+
+
 class Badge:
     """
     Badge class used to generate badges.
@@ -46,6 +99,12 @@ class Badge:
         value_format(str, optional) String with formatting to be used to format the value text.
         text_color(str, optional): Text color as a name or as an HTML color code.
         semver(bool, optional): Used to indicate that the value is a semantic version number.
+        escape_label(bool, optional): Escape the label text.  Default is True.
+        escape_value(bool, optional): Escape the value text.  Default is True.
+        gradient(dict, optional): Color stops of a gradient used to select the badge
+            color for numeric values, as a dictionary of values to colors, text such as
+            ``50=red 100=green`` or a ``Gradient``.  This can not be used together with
+            thresholds.
 
     Examples:
 
@@ -99,11 +158,42 @@ class Badge:
         ...                           10: 'green'})
         >>> badge.badge_color
         '#4c1'
+
+        A gradient selects a color between its color stops, and values beyond the
+        first or last stop use the color of that stop:
+
+        >>> badge = Badge('coverage', 75, gradient={50: 'red', 100: 'green'})
+        >>> badge.badge_color
+        '#92942B'
     """
 
     #: Singleton variable to track current max mask_id. This is used by _get_next_mask_str class method.
     mask_id: int
 
+    #: Attributes providing the values of the template placeholders for positions and sizes.
+    _WIDTH_PLACEHOLDERS: Dict[str, str] = {
+        "badge width": "badge_width",
+        "value width": "value_width",
+        "color split x": "color_split_position",
+        "label anchor": "label_anchor",
+        "value anchor": "value_anchor",
+        "label anchor shadow": "label_anchor_shadow",
+        "value anchor shadow": "value_anchor_shadow",
+        "value box width": "value_box_width",
+        "arc start": "arc_start",
+    }
+
+    #: Attributes providing the values of the other template placeholders, except color.
+    _TEXT_PLACEHOLDERS: Dict[str, str] = {
+        "font name": "font_name",
+        "font size": "font_size",
+        "label": "encoded_label",
+        "value": "encoded_value",
+        "label text color": "label_text_color",
+        "value text color": "value_text_color",
+        "mask id": "mask_str",
+    }
+
     def __init__(
         self,
         label,
@@ -125,6 +215,7 @@ class Badge:
         semver: Optional[bool] = False,
         escape_label: Optional[bool] = True,
         escape_value: Optional[bool] = True,
+        gradient: Optional[ColorStops] = None,
     ):
         """Constructor for Badge class."""
         # Set defaults if values were not passed
@@ -167,10 +258,11 @@ class Badge:
         self.value_is_version = semver
 
         self.value_format = value_format
-        if value_format:
-            value_text = str(value_format % self.value_type(value))
-        else:
-            value_text = str(self.value_type(value))
+        with profiling.phase("value parsing"):
+            if value_format:
+                value_text = str(value_format % self.value_type(value))
+            else:
+                value_text = str(self.value_type(value))
         self.value_prefix = value_prefix
         self.value_suffix = value_suffix
 
@@ -201,6 +293,12 @@ class Badge:
         self.thresholds = thresholds
         self.default_color = default_color
 
+        if thresholds and gradient:
+            raise ValueError(
+                "A badge can use either thresholds or a gradient, not both."
+            )
+        self.gradient = get_gradient(gradient) if gradient else None
+
         # text_color can be passed as a single value or a pair of comma delimited values
         self.text_color = text_color
         text_colors = text_color.split(",")
@@ -215,6 +313,11 @@ class Badge:
         self.escape_label = escape_label
         self.escape_value = escape_value
 
+        # The compiled template, and the style and template it was compiled for.
+        self._compiled_template: Optional[Tuple[Tuple[str, str], CompiledTemplate]] = (
+            None
+        )
+
     def __repr__(self) -> str:
         """Return a representation of the Badge object instance.
 
@@ -288,6 +391,8 @@ class Badge:
             optional_args += ", value_format=%s" % repr(self.value_format)
         if self.text_color != config.DEFAULT_TEXT_COLOR:
             optional_args += ", text_color=%s" % repr(self.text_color)
+        if self.gradient:
+            optional_args += ", gradient=%s" % repr(self.gradient.stops)
 
         return "%s(%s, %s%s)" % (
             self.__class__.__name__,
@@ -317,6 +422,20 @@ class Badge:
 
         return config.MASK_ID_PREFIX + str(cls.mask_id)
 
+    def _get_compiled_template(self) -> CompiledTemplate:
+        """Return the compiled SVG template for the style and template that have been set.
+
+        The template is loaded and checked the first time it is needed, and again if
+        the style or template is changed.
+
+        Raises:
+            UnknownTemplatePlaceholder: When the template uses an unknown placeholder.
+        """
+        key = (self.style, self.template)
+        if self._compiled_template is None or self._compiled_template[0] != key:
+            self._compiled_template = (key, compile_template(self._get_svg_template()))
+        return self._compiled_template[1]
+
     def _get_svg_template(self) -> str:
         """Return the correct SVG template to render, based on the style and template
         that have been set
@@ -652,27 +771,25 @@ class Badge:
         Returns: str
         """
 
-        badge_text = self._get_svg_template()
-
-        return (
-            badge_text.replace("{{ badge width }}", str(self.badge_width))
-            .replace("{{ font name }}", self.font_name)
-            .replace("{{ font size }}", str(self.font_size))
-            .replace("{{ label }}", self.encoded_label)
-            .replace("{{ value }}", self.encoded_value)
-            .replace("{{ label anchor }}", str(self.label_anchor))
-            .replace("{{ label anchor shadow }}", str(self.label_anchor_shadow))
-            .replace("{{ value anchor }}", str(self.value_anchor))
-            .replace("{{ value anchor shadow }}", str(self.value_anchor_shadow))
-            .replace("{{ color }}", self.badge_color_code)
-            .replace("{{ label text color }}", self.label_text_color)
-            .replace("{{ value text color }}", self.value_text_color)
-            .replace("{{ color split x }}", str(self.color_split_position))
-            .replace("{{ value width }}", str(self.value_width))
-            .replace("{{ mask id }}", self.mask_str)
-            .replace("{{ value box width }}", str(self.value_box_width))
-            .replace("{{ arc start }}", str(self.arc_start))
-        )
+        with profiling.phase("template"):
+            template = self._get_compiled_template()
+            placeholders = template.placeholders
+
+        values: Dict[str, str] = {}
+
+        with profiling.phase("thresholds"):
+            if "color" in placeholders:
+                values["color"] = self.badge_color_code
+
+        # Only the values of the placeholders used by the template are computed.
+        with profiling.phase("width"):
+            for name in placeholders & self._WIDTH_PLACEHOLDERS.keys():
+                values[name] = str(getattr(self, self._WIDTH_PLACEHOLDERS[name]))
+
+        with profiling.phase("substitution"):
+            for name in placeholders & self._TEXT_PLACEHOLDERS.keys():
+                values[name] = str(getattr(self, self._TEXT_PLACEHOLDERS[name]))
+            return template.render(values)
 
     def __str__(self) -> str:
         """Return string representation of badge.
@@ -704,14 +821,22 @@ class Badge:
         >>> badge = Badge('x', 1, font_name='DejaVu Sans,Verdana,Geneva,sans-serif', font_size=11)
         >>> badge.get_text_width('pylint')
         34
+
+        Widths are kept in ``anybadge.helpers.text_width_cache``, which is shared by all
+        badges.
         """
-        return _get_approx_string_width(text, self.font_width)
+        return text_width_cache.get_width(text, self.font_name, self.font_size)
 
     @property
     def badge_color(self) -> str:
-        """Badge color based on the configured thresholds.
+        """Badge color based on the configured thresholds or gradient.
 
         Returns: str"""
+        if self.gradient:
+            if self.value_type in (int, float) and not math.isnan(float(self.value)):
+                return self.gradient.color(float(self.value))
+            return self.default_color
+
         # If no thresholds were passed then return the default color
         if not self.thresholds:
             return self.default_color
@@ -722,28 +847,18 @@ class Badge:
             else:
                 return self.default_color
 
-        thresholds: Optional[Union[Dict[float, str], OrderedDict[float, str]]]
-
-        # Set value and thresholds based on the value type. This will result in either
-        # value and thresholds as floats or value and thresholds as semantic versions.
+        # Compare the value and thresholds either as numbers or as semantic versions.
+        # The thresholds are converted and sorted once, and shared between badges.
         if self.value_type == Version:
             value = self.semver_version
-            thresholds = self.semver_thresholds
         else:
             value = float(self.value)
-            thresholds = self.float_thresholds
 
         color = None
 
-        if thresholds:
-
-            # Convert the threshold dictionary into a sorted list of lists
-            threshold_list = [[self.value_type(i[0]), i[1]] for i in thresholds.items()]
-            threshold_list.sort(key=lambda x: x[0])
-
-            for threshold, color in threshold_list:
-                if value < threshold:
-                    return color
+        for threshold, color in sorted_thresholds(self.thresholds, self.value_type):
+            if value < threshold:
+                return color
 
         # If we drop out the top of the range then return the last max color
         if color and self.use_max_when_value_exceeds:
@@ -759,37 +874,7 @@ class Badge:
 
         Raises: ValueError when an invalid badge color is set.
         """
-        color = self.badge_color
-
-        if isinstance(color, Color):
-            return color.value
-
-        if color[0] == "#":
-            return color
-
-        color = color.upper()
-
-        prefixes = ["BRIGHT", "YELLOW", "LIGHT"]
-
-        try:
-            return Color[color.upper()].value
-        except KeyError:
-            pass
-
-        # For backward compatibility with old color names (that were lowercase and didn't
-        # contain underscores) we will try to get the same color.
-
-        for prefix in prefixes:
-            if color.startswith(prefix) and color != prefix and "_" not in color:
-                try:
-                    return Color[color.replace(prefix, prefix + "_")].value
-                except KeyError:
-                    pass
-
-        raise ValueError(
-            'Invalid color code "%s". ' "Valid color codes are: %s",
-            (color, ", ".join(list(Color.__members__.keys()))),
-        )
+        return get_color_code(self.badge_color)
 
     def write_badge(self, file_path: Union[str, Path], overwrite=False) -> None:
         """Write badge to file."""
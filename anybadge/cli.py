@@ -1,12 +1,22 @@
 import argparse
+import logging
+import os
+import re
 import sys
 import textwrap
+from pathlib import Path
+from typing import Dict
 
 from anybadge.styles import Style
 from anybadge.templates import get_template
 from anybadge import __version__ as anybadge_version
 from . import config
+from .archive import archive_format, write_archive
 from .badge import Badge
+from .gradient import Gradient
+from .ingest.coverage import _percent_value, read_coverage
+from .ingest.junit import junit_value_format, read_junit
+from .watch import BadgeWatcher, create_badge, read_manifest
 
 
 def parse_args(args):
@@ -45,10 +55,30 @@ examples:
         anybadge.py --label=coverage --value=65 --suffix='%%' --file=coverage.svg \\
           50=red 60=orange 80=yellow 100=green
 
+    Coverage with a color gradient between the color stops
+        anybadge.py --value=65 --file=coverage.svg --gradient coverage
+
+        anybadge.py --label=coverage --value=65 --suffix='%%' --file=coverage.svg \\
+          --gradient 50=red 70=orange 85=yellow 100=green
+
+    Coverage from a Cobertura XML or coverage.py JSON report, with a badge
+    for each package written to a directory
+        anybadge.py --coverage-report=coverage.xml --file=coverage.svg \\
+          --coverage-packages=badges/coverage
+
+    Test results from a JUnit XML report
+        anybadge.py --junit-report=junit.xml --file=tests.svg
+
     CI Pipeline
         anybadge.py --label=pipeline --value=passing --file=pipeline.svg \\
           passing=green failing=red
 
+    Rewrite the badges listed in a manifest when their source files change
+        anybadge.py watch badges.json
+
+    Write the badges listed in a manifest into one archive
+        anybadge.py archive badges.json badges.tar.gz
+
 """
         ),
     )
@@ -132,6 +162,36 @@ examples:
         help="Use the maximum threshold color when the value exceeds the "
         "maximum threshold.",
     )
+    parser.add_argument(
+        "-g",
+        "--gradient",
+        action="store_true",
+        help="Treat the <value>=<color> pairs as the color stops of a gradient, "
+        "so the badge color changes smoothly with the value.  With a built-in "
+        "style, use the style's gradient color stops.",
+    )
+    reports = parser.add_mutually_exclusive_group()
+    reports.add_argument(
+        "--coverage-report",
+        type=str,
+        help="Take the value from a Cobertura XML or coverage.py JSON coverage "
+        "report.  Without thresholds, the coverage style is used.",
+    )
+    parser.add_argument(
+        "--coverage-packages",
+        type=str,
+        metavar="DIRECTORY",
+        help="With --coverage-report, also write a badge for each package of the "
+        "report to this directory, or into this archive if the name ends with "
+        ".tar, .tar.gz, .tgz or .zip.",
+    )
+    reports.add_argument(
+        "--junit-report",
+        type=str,
+        help="Take the value from the number of failed tests in a JUnit XML report, "
+        'shown as "<n> passed, <n> failed".  Without thresholds, the badge is green '
+        "when no tests failed, and red otherwise.",
+    )
     parser.add_argument("-f", "--file", type=str, help="Output file location.")
     parser.add_argument(
         "-o",
@@ -174,9 +234,152 @@ examples:
         "For example 2=red 4=orange 6=yellow 8=good. "
         'Read this as "Less than 2 = red, less than 4 = orange...".',
     )
+    parsed = parser.parse_args(args)
+    if parsed.coverage_packages and not parsed.coverage_report:
+        parser.error("--coverage-packages requires --coverage-report")
+    if parsed.gradient and parsed.args:
+        is_style = len(parsed.args) == 1 and Style.exists(parsed.args[0].upper())
+        if not is_style:
+            try:
+                Gradient.parse(" ".join(parsed.args))
+            except ValueError as e:
+                parser.error(f"invalid --gradient color stops: {e}")
+    return parsed
+
+
+def parse_watch_args(args):
+    """Parse the command line arguments of ``anybadge watch``."""
+    parser = argparse.ArgumentParser(
+        prog="anybadge watch",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=textwrap.dedent(
+            """\
+Write the badges listed in a manifest, then rewrite them whenever the files
+they are created from change.
+
+The manifest is a JSON file with a list of badges, each with the badge "file"
+to write and the "source" file to read the value from.  Sources of "type"
+"coverage" and "junit" are coverage and JUnit XML reports.  Other sources
+hold the value as text, or as JSON with the value under "key".
+
+example manifest:
+
+    {"badges": [
+        {"file": "badges/coverage.svg", "source": "coverage.xml", "type": "coverage"},
+        {"file": "badges/tests.svg", "source": "junit.xml", "type": "junit"},
+        {"file": "badges/pylint.svg", "source": "metrics.json", "key": "pylint",
+         "style": "pylint"}
+    ]}
+"""
+        ),
+    )
+    parser.add_argument("manifest", type=str, help="Location of the manifest.")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=config.WATCH_INTERVAL,
+        help="Seconds between checks of the source files when polling.",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=config.WATCH_DEBOUNCE,
+        help="Seconds the source files must be unchanged before badges are written.",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Poll the source files for changes, even where inotify is available.",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Write the badges once and exit, without watching for changes.",
+    )
     return parser.parse_args(args)
 
 
+def parse_archive_args(args):
+    """Parse the command line arguments of ``anybadge archive``."""
+    parser = argparse.ArgumentParser(
+        prog="anybadge archive",
+        description="Write the badges listed in a manifest into a single .tar, "
+        ".tar.gz, .tgz or .zip archive, with an index.json mapping badge names to "
+        "archive members.  The manifest is the same as for anybadge watch, and badges "
+        "are named after their file, relative to the manifest.",
+    )
+    parser.add_argument("manifest", type=str, help="Location of the manifest.")
+    parser.add_argument("archive", type=str, help="Location of the archive.")
+    parser.add_argument(
+        "-o",
+        "--overwrite",
+        action="store_true",
+        help="Overwrite the archive if it already exists.",
+    )
+    return parser.parse_args(args)
+
+
+def archive_main(args) -> int:
+    """Write the badges of a manifest into an archive based on command line arguments.
+
+    Returns:
+        int: 0 if successful, 1 otherwise.
+    """
+    args = parse_archive_args(args)
+    manifest = Path(args.manifest)
+    try:
+        specs = read_manifest(manifest)
+        index = write_archive(
+            args.archive,
+            (
+                (
+                    os.path.splitext(os.path.relpath(spec.file, manifest.parent))[0],
+                    create_badge(spec),
+                )
+                for spec in specs
+            ),
+            overwrite=args.overwrite,
+        )
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"ERROR: Failed to write archive: {e}")
+        return 1
+    print(f"Wrote {len(index)} badges to {args.archive}")
+    return 0
+
+
+def watch_main(args) -> int:
+    """Write and rewrite the badges of a manifest based on command line arguments.
+
+    Returns:
+        int: 0 if successful, 1 otherwise.
+    """
+    args = parse_watch_args(args)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    try:
+        specs = read_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: Failed to read manifest: {e}")
+        return 1
+
+    watcher = BadgeWatcher(
+        specs,
+        interval=args.interval,
+        debounce=args.debounce,
+        use_inotify=False if args.poll else None,
+    )
+    try:
+        if args.once:
+            watcher.start()
+        else:
+            watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
 def main(args=None) -> int:
     """Generate a badge based on command line arguments.
 
@@ -192,9 +395,42 @@ def main(args=None) -> int:
         print(anybadge_version)
         return 0
 
+    if args and args[0] == "watch":
+        return watch_main(args[1:])
+
+    if args and args[0] == "archive":
+        return archive_main(args[1:])
+
     # Parse command line arguments
     args = parse_args(args)
 
+    value = args.value
+    report = None
+    if args.coverage_report:
+        try:
+            report = read_coverage(
+                args.coverage_report, packages=bool(args.coverage_packages)
+            )
+        except (OSError, ValueError) as e:
+            print(f"ERROR: Failed to read coverage report: {e}")
+            return 1
+        value = str(_percent_value(report.percent))
+        if not args.args:
+            args.args = ["coverage"]
+    elif args.junit_report:
+        try:
+            results = read_junit(args.junit_report)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: Failed to read JUnit report: {e}")
+            return 1
+        value = str(results.failed)
+        args.label = args.label or "tests"
+        args.value_format = args.value_format or junit_value_format(results)
+        if not args.args:
+            args.args = ["1=green"]
+            if args.color == config.DEFAULT_COLOR:
+                args.color = "red"
+
     label = args.label
     threshold_text = args.args
     suffix = args.suffix
@@ -204,7 +440,9 @@ def main(args=None) -> int:
     if len(args.args) == 1 and Style.exists(args.args[0].upper()):
         style_name = args.args[0].upper()
         style = Style[style_name]
-        threshold_text = style.threshold.split(" ")
+        threshold_text = (
+            style.gradient if args.gradient and style.gradient else style.threshold
+        ).split(" ")
         if not args.label and style.label:
             label = style.label
         if not args.suffix and style.suffix:
@@ -219,10 +457,7 @@ def main(args=None) -> int:
         print(f"ERROR: Thresholds should be in the form '<value>=color'")
         return 1
 
-    # Create badge object
-    badge = Badge(
-        label,
-        args.value,
+    badge_kwargs = dict(
         value_prefix=args.prefix,
         value_suffix=suffix,
         default_color=args.color,
@@ -234,7 +469,8 @@ def main(args=None) -> int:
         template=args.template,
         style=args.style,
         use_max_when_value_exceeds=args.use_max,
-        thresholds=threshold_dict,
+        thresholds=None if args.gradient else threshold_dict,
+        gradient=threshold_dict if args.gradient else None,
         value_format=args.value_format,
         text_color=args.text_color,
         semver=args.semver,
@@ -242,6 +478,48 @@ def main(args=None) -> int:
         escape_value=not args.no_escape_value,
     )
 
+    # Create badge object
+    badge = Badge(label, value, **badge_kwargs)
+
+    if report is not None and args.coverage_packages:
+        # Package names are made safe for file names, so different packages can end
+        # up with the same name.
+        packages: Dict[str, str] = {}
+        for package in report.packages:
+            name = re.sub(r"[^A-Za-z0-9._-]+", "_", package)
+            if name in packages:
+                print(
+                    f"ERROR: Packages '{packages[name]}' and '{package}' would both be "
+                    f"written to '{name}.svg'."
+                )
+                return 1
+            packages[name] = package
+
+        package_badges = (
+            (
+                name,
+                Badge(
+                    package,
+                    str(_percent_value(report.packages[package])),
+                    **badge_kwargs,
+                ),
+            )
+            for name, package in packages.items()
+        )
+        try:
+            if archive_format(args.coverage_packages):
+                write_archive(args.coverage_packages, package_badges, args.overwrite)
+            else:
+                os.makedirs(args.coverage_packages, exist_ok=True)
+                for name, package_badge in package_badges:
+                    package_badge.write_badge(
+                        os.path.join(args.coverage_packages, name + ".svg"),
+                        overwrite=args.overwrite,
+                    )
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"ERROR: Failed to write package badges: {e}")
+            return 1
+
     if args.file:
         # Write badge SVG to file
         badge.write_badge(args.file, overwrite=args.overwrite)
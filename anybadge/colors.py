@@ -1,6 +1,7 @@
 # Create a dictionary of colors to make selections
 # easier.
 from enum import Enum
+from typing import Union
 
 
 class Color(Enum):
@@ -163,3 +164,55 @@ class Color(Enum):
 
     def __lt__(self, other):
         return self.name < other.name
+
+
+def get_color_code(color: Union[Color, str]) -> str:
+    """Return the HTML color code for a color.
+
+    Args:
+        color(Color or str): A ``Color``, a color name or an HTML color code.
+
+    Returns:
+        str: The HTML color code.
+
+    Raises:
+        ValueError: When the color is not valid.
+
+    Examples:
+
+        >>> get_color_code('green')
+        '#4C1'
+        >>> get_color_code('brightred')
+        '#FF0000'
+        >>> get_color_code('#123456')
+        '#123456'
+    """
+    if isinstance(color, Color):
+        return color.value
+
+    if color.startswith("#"):
+        return color
+
+    color = color.upper()
+
+    prefixes = ["BRIGHT", "YELLOW", "LIGHT"]
+
+    try:
+        return Color[color.upper()].value
+    except KeyError:
+        pass
+
+    # For backward compatibility with old color names (that were lowercase and didn't
+    # contain underscores) we will try to get the same color.
+
+    for prefix in prefixes:
+        if color.startswith(prefix) and color != prefix and "_" not in color:
+            try:
+                return Color[color.replace(prefix, prefix + "_")].value
+            except KeyError:
+                pass
+
+    raise ValueError(
+        'Invalid color code "%s". Valid color codes are: %s'
+        % (color, ", ".join(Color.__members__.keys()))
+    )
@@ -8,6 +8,27 @@ DEFAULT_COLOR: str = "#4c1"
 DEFAULT_TEXT_COLOR: str = "#fff"
 MASK_ID_PREFIX: str = "anybadge_"
 
+# Number of colors in the lookup table of a color gradient.
+GRADIENT_SIZE: int = 256
+
+# Maximum number of measured text widths kept by ``helpers.text_width_cache``.
+TEXT_WIDTH_CACHE_SIZE: int = 4096
+
+# Maximum number of threshold dictionaries kept converted and sorted for badges.
+THRESHOLD_CACHE_SIZE: int = 256
+
+# Seconds between checks of the source files of ``anybadge watch`` when polling.
+WATCH_INTERVAL: float = 1.0
+
+# Seconds the source files of ``anybadge watch`` must be unchanged before their
+# badges are rendered, and the longest a burst of changes can delay rendering.
+WATCH_DEBOUNCE: float = 0.2
+WATCH_MAX_DELAY: float = 5.0
+
+# Bytes buffered when writing badge archives, so an archive is written in few large
+# writes.
+ARCHIVE_BUFFER_SIZE: int = 1024 * 1024
+
 # Dictionary for looking up approx pixel widths of
 # supported fonts and font sizes.
 FONT_WIDTHS: Dict[str, Dict[int, int]] = {
@@ -1,2 +1,6 @@
 class UnknownBadgeTemplate(Exception):
     """The badge template is unknown."""
+
+
+class UnknownTemplatePlaceholder(ValueError):
+    """A badge template uses a placeholder that is not known."""
@@ -0,0 +1,208 @@
+"""Continuous color gradients for badge values.
+
+A gradient interpolates between color stops, so that the badge color changes
+smoothly with the value instead of in steps, like it does with thresholds.  The
+colors are computed once into a lookup table, so selecting the color for a value is
+a single index into the table.
+"""
+
+import functools
+import math
+from typing import Dict, List, Mapping, Tuple, Union
+
+from . import config
+from .colors import Color, get_color_code
+
+ColorStops = Union["Gradient", Mapping[Union[float, str], Union[Color, str]], str]
+
+
+def hex_to_rgb(color_code: str) -> Tuple[int, int, int]:
+    """Return the red, green and blue components of an HTML color code.
+
+    Raises:
+        ValueError: When the color code is not valid.
+
+    Examples:
+
+        >>> hex_to_rgb('#FF8000')
+        (255, 128, 0)
+        >>> hex_to_rgb('#4C1')
+        (68, 204, 17)
+    """
+    digits = color_code.lstrip("#")
+    if len(digits) == 3:
+        digits = "".join(digit * 2 for digit in digits)
+    if len(digits) != 6:
+        raise ValueError(f'Invalid color code "{color_code}".')
+    return int(digits[0:2], 16), int(digits[2:4], 16), int(digits[4:6], 16)
+
+
+def rgb_to_hex(rgb: Tuple[int, int, int]) -> str:
+    """Return the HTML color code for red, green and blue components.
+
+    Examples:
+
+        >>> rgb_to_hex((255, 128, 0))
+        '#FF8000'
+    """
+    return "#%02X%02X%02X" % rgb
+
+
+class Gradient:
+    """A color gradient between color stops, precomputed into a lookup table.
+
+    Values below the first stop have the color of the first stop, and values above
+    the last stop have the color of the last stop.
+
+    Args:
+        stops(dict): Values mapped to colors.  Colors can be a ``Color``, a color name
+            or an HTML color code.  At least two different values are needed.
+        size(int, optional): Number of colors in the lookup table.
+
+    Raises:
+        ValueError: When the stops are not valid.
+
+    Examples:
+
+        >>> gradient = Gradient({0: 'red', 100: 'green'})
+        >>> gradient.color(0)
+        '#E05D44'
+        >>> gradient.color(50)
+        '#92942B'
+        >>> gradient.color(150)
+        '#44CC11'
+    """
+
+    def __init__(
+        self,
+        stops: Mapping[Union[float, str], Union[Color, str]],
+        size: int = config.GRADIENT_SIZE,
+    ):
+        try:
+            points = sorted(
+                (float(value), hex_to_rgb(get_color_code(color)))
+                for value, color in stops.items()
+            )
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid gradient color stops {dict(stops)!r}: {e}")
+        if len(points) < 2 or points[0][0] == points[-1][0]:
+            raise ValueError(
+                "A gradient needs color stops for at least two different values."
+            )
+        if size < 2:
+            raise ValueError("A gradient needs a lookup table of at least 2 colors.")
+
+        self.stops: Dict[Union[float, str], Union[Color, str]] = dict(stops)
+        self.minimum = points[0][0]
+        self.maximum = points[-1][0]
+        self._scale = (size - 1) / (self.maximum - self.minimum)
+        self.table: List[str] = [
+            self._interpolate(points, self.minimum + index / self._scale)
+            for index in range(size)
+        ]
+
+    @staticmethod
+    def _interpolate(
+        points: List[Tuple[float, Tuple[int, int, int]]], value: float
+    ) -> str:
+        for (low, low_rgb), (high, high_rgb) in zip(points, points[1:]):
+            if value <= high:
+                break
+        if high == low:
+            return rgb_to_hex(high_rgb)
+        fraction = min(max((value - low) / (high - low), 0.0), 1.0)
+        return rgb_to_hex(
+            tuple(  # type: ignore
+                round(a + (b - a) * fraction) for a, b in zip(low_rgb, high_rgb)
+            )
+        )
+
+    def color(self, value: float) -> str:
+        """Return the color code for a value.
+
+        Raises:
+            ValueError: When the value is NaN.
+
+        Examples:
+
+            >>> gradient = Gradient({0: 'red', 100: 'green'})
+            >>> gradient.color(float('-inf')), gradient.color(1e400)
+            ('#E05D44', '#44CC11')
+        """
+        if math.isnan(value):
+            raise ValueError("A gradient has no color for NaN.")
+        if value <= self.minimum:
+            return self.table[0]
+        if value >= self.maximum:
+            return self.table[-1]
+        return self.table[int((value - self.minimum) * self._scale + 0.5)]
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Gradient) and self.table == other.table
+
+    def __repr__(self) -> str:
+        return "%s(%r)" % (self.__class__.__name__, self.stops)
+
+    @classmethod
+    def parse(cls, text: str) -> "Gradient":
+        """Create a gradient from color stops in the form ``<value>=<color>``.
+
+        Stops are separated by spaces or commas.
+
+        Raises:
+            ValueError: When the text is not valid.
+
+        Examples:
+
+            >>> Gradient.parse('50=red 100=green')
+            Gradient({'50': 'red', '100': 'green'})
+        """
+        stops: Dict[Union[float, str], Union[Color, str]] = {}
+        for pair in text.replace(",", " ").split():
+            value, separator, color = pair.partition("=")
+            if not separator or not value or not color:
+                raise ValueError(
+                    f"Invalid gradient color stop '{pair}'. Color stops should be in "
+                    "the form '<value>=<color>'."
+                )
+            stops[value] = color
+        return cls(stops)
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_gradient(text: str) -> Gradient:
+    return Gradient.parse(text)
+
+
+@functools.lru_cache(maxsize=64)
+def _gradient_from_items(items: Tuple[Tuple[Union[float, str], str], ...]) -> Gradient:
+    return Gradient(dict(items))
+
+
+def get_gradient(stops: ColorStops) -> Gradient:
+    """Return a gradient for color stops, reusing recently created gradients.
+
+    Building the lookup table of a gradient takes much longer than selecting a color,
+    so badges created with the same color stops share one gradient.
+
+    Args:
+        stops: A ``Gradient``, a dictionary of values to colors, or color stops as text
+            such as ``50=red 100=green``.
+
+    Raises:
+        ValueError: When the stops are not valid.
+
+    Examples:
+
+        >>> get_gradient({0: 'red', 100: 'green'}) is get_gradient({0: 'red', 100: 'green'})
+        True
+    """
+    if isinstance(stops, Gradient):
+        return stops
+    if isinstance(stops, str):
+        return _parse_gradient(stops)
+    try:
+        return _gradient_from_items(tuple(stops.items()))
+    except TypeError:
+        # The stops are not hashable, so can not be cached.
+        return Gradient(stops)
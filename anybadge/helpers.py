@@ -1,4 +1,10 @@
+import functools
 import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from . import config
 
 
 EMOJI_REGEX = re.compile(
@@ -13,6 +19,23 @@ EMOJI_REGEX = re.compile(
     flags=re.UNICODE,
 )
 
+# A dictionary containing percentages that relate to how wide
+# each character will be represented in a variable width font.
+# These percentages can be calculated using the ``_get_character_percentage_dict`` function.
+CHAR_WIDTH_PERCENTAGES = {
+    "lij|' ": 40.0,
+    "![]fI.,:;/\\t": 50.0,
+    '`-(){}r"': 60.0,
+    "*^zcsJkvxy": 70.0,
+    "aebdhnopqug#$L+<>=?_~FZT0123456789": 70.0,
+    "BSPEAKVXY&UwNRCHD": 70.0,
+    "QGOMm%W@": 100.0,
+}
+
+# Code points at and above this have the default width percentage.
+_PERCENTAGE_TABLE_SIZE = 0x20000
+_percentage_table = None
+
 
 def is_emoji(character):
     """Return True if character is an emoji.
@@ -69,28 +92,227 @@ def _get_approx_string_width(text, font_width, fixed_width=False) -> int:
 
     size = 0.0
 
-    # A dictionary containing percentages that relate to how wide
-    # each character will be represented in a variable width font.
-    # These percentages can be calculated using the ``_get_character_percentage_dict`` function.
-    char_width_percentages = {
-        "lij|' ": 40.0,
-        "![]fI.,:;/\\t": 50.0,
-        '`-(){}r"': 60.0,
-        "*^zcsJkvxy": 70.0,
-        "aebdhnopqug#$L+<>=?_~FZT0123456789": 70.0,
-        "BSPEAKVXY&UwNRCHD": 70.0,
-        "QGOMm%W@": 100.0,
-    }
-
     for s in text:
         percentage = 50.0
         if is_emoji(s):
             percentage = 75.0
         else:
-            for k in char_width_percentages.keys():
+            for k in CHAR_WIDTH_PERCENTAGES.keys():
                 if s in k:
-                    percentage = char_width_percentages[k]
+                    percentage = CHAR_WIDTH_PERCENTAGES[k]
                     break
         size += (percentage / 100.0) * float(font_width)
 
     return int(size)
+
+
+@functools.lru_cache(maxsize=None)
+def _import_numpy():
+    """Return the NumPy module, or None if it is not installed.
+
+    NumPy is imported on first use rather than with anybadge, as importing it takes
+    several times longer than creating a single badge.
+    """
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover
+        return None
+    return numpy
+
+
+def _get_percentage_table():
+    """Return an array of the width percentage of each code point below
+    ``_PERCENTAGE_TABLE_SIZE``, followed by the default percentage.
+
+    The table is built once, using the same rules as ``_get_approx_string_width``.
+    """
+    global _percentage_table
+    if _percentage_table is None:
+        numpy = _import_numpy()
+        table = numpy.full(_PERCENTAGE_TABLE_SIZE + 1, 50.0)
+        characters = "".join(map(chr, range(_PERCENTAGE_TABLE_SIZE)))
+        # The first group containing a character wins, so fill in reverse order.
+        for group, percentage in reversed(list(CHAR_WIDTH_PERCENTAGES.items())):
+            table[[ord(character) for character in group]] = percentage
+        for match in EMOJI_REGEX.finditer(characters):
+            table[match.start() : match.end()] = 75.0
+        _percentage_table = table
+    return _percentage_table
+
+
+def _get_approx_string_widths_numpy(texts: List[str], font_width) -> List[int]:
+    numpy = _import_numpy()
+    lengths = numpy.fromiter(map(len, texts), dtype=numpy.int64, count=len(texts))
+    if not lengths.any():
+        return [0] * len(texts)
+
+    codes = numpy.frombuffer(
+        "".join(texts).encode("utf-32-le", "surrogatepass"), dtype="<u4"
+    )
+    codes = numpy.minimum(codes, _PERCENTAGE_TABLE_SIZE)
+    # Same operations as the scalar path, so each character width is identical.
+    char_widths = (_get_percentage_table()[codes] / 100.0) * float(font_width)
+
+    # Add up the character widths of each string from left to right, like the scalar
+    # path does.  Summing with ``numpy.add.reduceat`` is faster but uses a different
+    # order of additions, so totals can differ in the last bits and round differently.
+    # Strings are sorted longest first, so that the strings with a character at each
+    # position are always a prefix of the sorted strings.
+    order = numpy.argsort(-lengths, kind="stable")
+    sorted_lengths = lengths[order]
+    starts = (numpy.cumsum(lengths) - lengths)[order]
+    totals = numpy.zeros(len(texts))
+    for position in range(int(sorted_lengths[0])):
+        count = int(numpy.searchsorted(-sorted_lengths, -position, side="left"))
+        totals[:count] += char_widths[starts[:count] + position]
+
+    widths = numpy.empty(len(texts), dtype=numpy.int64)
+    widths[order] = totals.astype(numpy.int64)
+    return widths.tolist()
+
+
+def get_approx_string_widths(
+    texts: Iterable[str],
+    font_width,
+    fixed_width: bool = False,
+    use_numpy: Optional[bool] = None,
+) -> List[int]:
+    """Get the approximate widths of many strings using a specific average font width.
+
+    The widths are identical to calling ``_get_approx_string_width`` for each string.
+    When NumPy is installed, which can be done using ``pip install anybadge[numpy]``,
+    all strings are measured together using array operations, which is much faster
+    for large numbers of strings.
+
+    Args:
+        texts(list): Text strings to calculate the widths of.
+        font_width(int): Average width of font characters.
+        fixed_width(bool): Indicates that the font is fixed width.
+        use_numpy(bool, optional): Whether to use NumPy.  By default NumPy is used if
+            it is installed.
+
+    Returns:
+        list: Width of each string in pixels.
+
+    Raises:
+        ImportError: When ``use_numpy`` is True and NumPy is not installed.
+
+    Examples:
+
+        >>> get_approx_string_widths(['hello', 'GOOGLE|ijkl', ''], 10)
+        [29, 77, 0]
+    """
+    texts = list(texts)
+    if use_numpy is None:
+        # Only import NumPy when it would be used.
+        use_numpy = bool(texts) and not fixed_width and _import_numpy() is not None
+    if use_numpy and _import_numpy() is None:
+        raise ImportError(
+            "NumPy is required to measure text widths using NumPy. "
+            "Install it using: pip install anybadge[numpy]"
+        )
+
+    if fixed_width or not use_numpy or not texts:
+        return [
+            _get_approx_string_width(text, font_width, fixed_width) for text in texts
+        ]
+    return _get_approx_string_widths_numpy(texts, font_width)
+
+
+class TextWidthCache:
+    """Thread safe, size limited LRU cache of approximate text widths.
+
+    Badges often use the same label and value text, so measured widths are kept and
+    reused by all badges.  Widths are keyed by the text, font name and font size.
+
+    Args:
+        maxsize(int): Maximum number of widths to keep.  Zero disables the cache.
+
+    Examples:
+
+        >>> cache = TextWidthCache(maxsize=2)
+        >>> cache.get_width('pylint', 'DejaVu Sans,Verdana,Geneva,sans-serif', 11)
+        34
+        >>> cache.get_width('pylint', 'DejaVu Sans,Verdana,Geneva,sans-serif', 11)
+        34
+        >>> cache.stats['hits'], cache.stats['misses']
+        (1, 1)
+    """
+
+    def __init__(self, maxsize: int = config.TEXT_WIDTH_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._widths: "OrderedDict[Tuple[str, str, int], int]" = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._widths)
+
+    def get_width(self, text: str, font_name: str, font_size: int) -> int:
+        """Return the approximate width of text in a font, measuring it if needed."""
+        key = (text, font_name, font_size)
+        with self._lock:
+            width = self._widths.get(key)
+            if width is not None:
+                self._widths.move_to_end(key)
+                self.hits += 1
+                return width
+            self.misses += 1
+
+        width = _get_approx_string_width(text, config.FONT_WIDTHS[font_name][font_size])
+
+        with self._lock:
+            if self.maxsize > 0:
+                self._widths[key] = width
+                while len(self._widths) > self.maxsize:
+                    self._widths.popitem(last=False)
+        return width
+
+    @property
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Return the number of hits and misses, the hit rate and the cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._widths),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self) -> None:
+        """Remove all widths from the cache and reset the statistics."""
+        with self._lock:
+            self._widths.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def prime(self, texts: Iterable[str], font_name: str, font_size: int) -> None:
+        """Measure many texts at once and add their widths to the cache.
+
+        Texts are measured using ``get_approx_string_widths``, which is much faster
+        than measuring them one at a time when NumPy is installed.
+        """
+        keys = list(dict.fromkeys((text, font_name, font_size) for text in texts))
+        with self._lock:
+            keys = [key for key in keys if key not in self._widths]
+        widths = get_approx_string_widths(
+            [text for text, _, _ in keys], config.FONT_WIDTHS[font_name][font_size]
+        )
+        with self._lock:
+            self._widths.update(zip(keys, widths))
+            while len(self._widths) > max(self.maxsize, 0):
+                self._widths.popitem(last=False)
+
+    def resize(self, maxsize: int) -> None:
+        """Set the maximum number of widths to keep, removing the oldest if needed."""
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._widths) > max(maxsize, 0):
+                self._widths.popitem(last=False)
+
+
+#: Cache of text widths shared by all badges.
+text_width_cache = TextWidthCache()
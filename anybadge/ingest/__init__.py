@@ -0,0 +1,15 @@
+"""Create badges from the reports of other tools.
+
+Reports are read as a stream, so that very large reports can be read using a small,
+constant amount of memory.
+"""
+
+from anybadge.ingest.coverage import (
+    CoverageReport,
+    coverage_badge,
+    coverage_badges,
+    read_cobertura,
+    read_coverage,
+    read_coverage_json,
+)
+from anybadge.ingest.junit import TestResults, junit_badge, read_junit
@@ -0,0 +1,255 @@
+"""Coverage badges from Cobertura XML and coverage.py JSON reports."""
+
+import posixpath
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, Any, Dict, List, NamedTuple, Optional, Union
+
+from anybadge.badge import Badge
+from anybadge.ingest.jsonstream import JsonStream
+from anybadge.ingest.xmlstream import iterparse, local_name
+from anybadge.styles import Style
+
+
+class CoverageReport(NamedTuple):
+    """The coverage percentages read from a coverage report.
+
+    Attributes:
+        percent(float): Overall coverage percentage.
+        packages(dict): Coverage percentage of each package, when requested.
+    """
+
+    percent: float
+    packages: Dict[str, float] = {}
+
+
+class _Counts:
+    """Covered and total numbers of lines, or lines and branches."""
+
+    __slots__ = ("covered", "total")
+
+    def __init__(self):
+        self.covered = 0
+        self.total = 0
+
+    @property
+    def percent(self) -> float:
+        # Like coverage.py, nothing to cover counts as complete coverage.
+        return 100.0 * self.covered / self.total if self.total else 100.0
+
+
+def read_cobertura(
+    source: Union[str, Path, IO[bytes]], packages: bool = False
+) -> CoverageReport:
+    """Read the coverage percentages from a Cobertura XML report.
+
+    The report is parsed as a stream, and elements are discarded once they have been
+    read, so memory use does not grow with the size of the report.
+
+    Args:
+        source: Location of the report, or a binary file to read it from.
+        packages(bool, optional): Also read the coverage of each package.
+
+    Raises:
+        ValueError: When the report is not a valid Cobertura report.
+
+    Examples:
+
+        >>> import io
+        >>> report = io.BytesIO(
+        ...     b'<coverage line-rate="0.75"><packages>'
+        ...     b'<package name="app" line-rate="0.5"/><package name="lib" line-rate="1"/>'
+        ...     b'</packages></coverage>'
+        ... )
+        >>> read_cobertura(report, packages=True)
+        CoverageReport(percent=75.0, packages={'app': 50.0, 'lib': 100.0})
+    """
+    if isinstance(source, Path):
+        source = str(source)
+
+    percent: Optional[float] = None
+    totals = _Counts()
+    package_percents: Dict[str, float] = OrderedDict()
+    package_name: Optional[str] = None
+    package_rate: Optional[str] = None
+    package_counts = _Counts()
+    tags: List[str] = []
+
+    for event, element in iterparse(source):
+        if event == "end":
+            tag = tags.pop()
+            if tag == "package" and packages and package_name is not None:
+                package_percents[package_name] = (
+                    100.0 * float(package_rate)
+                    if package_rate is not None
+                    else package_counts.percent
+                )
+            continue
+
+        tag = local_name(element.tag)
+        tags.append(tag)
+        try:
+            if len(tags) == 1:
+                if tag != "coverage":
+                    raise ValueError("Not a Cobertura report.")
+                covered = element.get("lines-covered")
+                valid = element.get("lines-valid")
+                if covered is not None and valid is not None:
+                    percent = 100.0 * int(covered) / int(valid) if int(valid) else 100.0
+                elif element.get("line-rate") is not None:
+                    percent = 100.0 * float(element.get("line-rate"))  # type: ignore
+            elif tag == "package":
+                package_name = element.get("name", "")
+                package_rate = element.get("line-rate")
+                package_counts = _Counts()
+            elif tags[-3:] == ["class", "lines", "line"]:
+                # Lines are repeated under the methods of a class, so only count the
+                # lines of the class.
+                hit = int(element.get("hits", "0")) > 0
+                for counts in (totals, package_counts):
+                    counts.total += 1
+                    counts.covered += hit
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid Cobertura report: {e}") from e
+
+    return CoverageReport(
+        percent if percent is not None else totals.percent, dict(package_percents)
+    )
+
+
+def _add_summary(counts: _Counts, summary: Dict[str, Any]) -> None:
+    counts.covered += summary.get("covered_lines", 0) + summary.get(
+        "covered_branches", 0
+    )
+    counts.total += summary.get("num_statements", 0) + summary.get("num_branches", 0)
+
+
+def read_coverage_json(
+    source: Union[str, Path, IO[str]], packages: bool = False
+) -> CoverageReport:
+    """Read the coverage percentages from a coverage.py JSON report.
+
+    The report is read incrementally, one file at a time, so memory use does not grow
+    with the number of files in the report.  The packages of a JSON report are the
+    directories containing the measured files.
+
+    Args:
+        source: Location of the report, or a text file to read it from.
+        packages(bool, optional): Also read the coverage of each package.
+
+    Raises:
+        ValueError: When the report is not a valid coverage.py JSON report.
+
+    Examples:
+
+        >>> import io
+        >>> report = io.StringIO(
+        ...     '{"files": {'
+        ...     '"app/a.py": {"summary": {"covered_lines": 1, "num_statements": 4}}, '
+        ...     '"lib/b.py": {"summary": {"covered_lines": 2, "num_statements": 2}}}, '
+        ...     '"totals": {"percent_covered": 50.0}}'
+        ... )
+        >>> read_coverage_json(report, packages=True)
+        CoverageReport(percent=50.0, packages={'app': 25.0, 'lib': 100.0})
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, mode="r", encoding="utf-8") as file_handle:
+            return read_coverage_json(file_handle, packages=packages)
+
+    stream = JsonStream(source)
+    percent: Optional[float] = None
+    totals = _Counts()
+    package_counts: Dict[str, _Counts] = OrderedDict()
+
+    try:
+        for key in stream.items():
+            if key == "files":
+                for path in stream.items():
+                    summary = stream.value().get("summary", {})
+                    _add_summary(totals, summary)
+                    if packages:
+                        package = posixpath.dirname(path.replace("\\", "/")) or "."
+                        _add_summary(
+                            package_counts.setdefault(package, _Counts()), summary
+                        )
+            elif key == "totals":
+                summary = stream.value()
+                if "percent_covered" in summary:
+                    percent = float(summary["percent_covered"])
+            else:
+                stream.value()
+    except (AttributeError, TypeError) as e:
+        raise ValueError(f"Invalid coverage.py JSON report: {e}") from e
+
+    return CoverageReport(
+        percent if percent is not None else totals.percent,
+        {package: counts.percent for package, counts in package_counts.items()},
+    )
+
+
+def read_coverage(path: Union[str, Path], packages: bool = False) -> CoverageReport:
+    """Read the coverage percentages from a Cobertura XML or coverage.py JSON report.
+
+    The format is detected from the start of the file.
+
+    Raises:
+        ValueError: When the report is not valid.
+    """
+    with open(path, mode="rb") as file_handle:
+        start = file_handle.read(64).lstrip()
+    if start.startswith(b"{"):
+        return read_coverage_json(path, packages=packages)
+    return read_cobertura(path, packages=packages)
+
+
+def _percent_value(percent: float) -> Union[int, float]:
+    value = round(percent, 2)
+    return int(value) if value.is_integer() else value
+
+
+def coverage_badge(
+    percent: float, label: Optional[str] = None, gradient: bool = False, **kwargs
+) -> Badge:
+    """Create a coverage badge using the coverage style.
+
+    Args:
+        percent(float): Coverage percentage.
+        label(str, optional): Badge label.  Defaults to the label of the style.
+        gradient(bool, optional): Use the gradient of the style rather than its
+            thresholds.
+        **kwargs: Other arguments for :class:`anybadge.Badge`.
+
+    Examples:
+
+        >>> badge = coverage_badge(65.4321)
+        >>> badge.label, badge.value_text, badge.badge_color
+        ('coverage', '65.43%', 'yellow')
+    """
+    style = Style.COVERAGE
+    stops = dict(pair.split("=") for pair in style.threshold.split(" "))
+    if gradient:
+        kwargs.setdefault("gradient", style.gradient)
+    else:
+        kwargs.setdefault("thresholds", stops)
+    kwargs.setdefault("value_suffix", style.suffix)
+    return Badge(
+        style.label if label is None else label, _percent_value(percent), **kwargs
+    )
+
+
+def coverage_badges(report: CoverageReport, **kwargs) -> Dict[str, Badge]:
+    """Create a coverage badge for each package of a coverage report.
+
+    The badges are labelled with the package names.
+
+    Args:
+        report(CoverageReport): Report read with packages.
+        **kwargs: Other arguments for :func:`coverage_badge`.
+
+    Returns:
+        dict: The badge of each package, by package name.
+    """
+    return {
+        package: coverage_badge(percent, label=package, **kwargs)
+        for package, percent in report.packages.items()
+    }
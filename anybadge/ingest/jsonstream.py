@@ -0,0 +1,119 @@
+"""Incremental reading of large JSON documents."""
+
+import json
+from typing import IO, Any, Iterator
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARACTERS = "0123456789.eE+-"
+
+
+class JsonStream:
+    """Read a JSON document from a text file in chunks, one value at a time.
+
+    Objects can be read item by item using :meth:`items`, so that only one value of a
+    large object is in memory at a time.  Other values are read whole using
+    :meth:`value`.
+
+    Args:
+        file_handle: Text file to read from.
+        chunk_size(int, optional): Number of characters to read at a time.
+
+    Examples:
+
+        >>> import io
+        >>> stream = JsonStream(io.StringIO('{"a": {"x": 1, "y": [2]}, "b": true}'), chunk_size=4)
+        >>> for key in stream.items():
+        ...     if key == 'a':
+        ...         print(key, [(k, stream.value()) for k in stream.items()])
+        ...     else:
+        ...         print(key, stream.value())
+        a [('x', 1), ('y', [2])]
+        b True
+    """
+
+    def __init__(self, file_handle: IO[str], chunk_size: int = 65536):
+        self._file = file_handle
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _read(self, size: int) -> None:
+        # Drop the part of the buffer that has been read.
+        self._buffer = self._buffer[self._position :]
+        self._position = 0
+        data = self._file.read(size)
+        if not data:
+            self._eof = True
+        self._buffer += data
+
+    def _peek(self) -> str:
+        """Return the next character that is not whitespace, without consuming it."""
+        while True:
+            while (
+                self._position < len(self._buffer)
+                and self._buffer[self._position] in _WHITESPACE
+            ):
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if self._eof:
+                raise ValueError("Invalid JSON: unexpected end of document.")
+            self._read(self._chunk_size)
+
+    def _expect(self, character: str) -> None:
+        found = self._peek()
+        if found != character:
+            raise ValueError(
+                f"Invalid JSON: expected '{character}' but found '{found}'."
+            )
+        self._position += 1
+
+    def value(self) -> Any:
+        """Read and return the next value."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise ValueError(f"Invalid JSON: {e}") from e
+            else:
+                # A number followed only by characters that can be part of a number
+                # may continue in the next chunk, for example "1." of "1.5".
+                is_number = isinstance(value, (int, float)) and not isinstance(
+                    value, bool
+                )
+                if (
+                    self._eof
+                    or not is_number
+                    or self._buffer[end:].lstrip(_NUMBER_CHARACTERS)
+                ):
+                    self._position = end
+                    return value
+            # Read at least as much again as is buffered, so that reading a value
+            # larger than a chunk takes time proportional to its size.
+            self._read(max(self._chunk_size, len(self._buffer)))
+
+    def items(self) -> Iterator[str]:
+        """Read an object, yielding its keys.
+
+        The value of each key must be read, using :meth:`value` or :meth:`items`,
+        before the next key is requested.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._position += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Invalid JSON: object keys must be strings.")
+            self._expect(":")
+            yield key
+            if self._peek() == ",":
+                self._position += 1
+                continue
+            self._expect("}")
+            return
@@ -0,0 +1,124 @@
+"""Test result badges from JUnit XML reports."""
+
+from pathlib import Path
+from typing import IO, List, NamedTuple, Union
+
+from anybadge.badge import Badge
+from anybadge.ingest.xmlstream import iterparse, local_name
+
+#: Outcomes of a test case, from the elements inside a ``<testcase>`` element.
+_OUTCOMES = {"failure": "failed", "error": "failed", "skipped": "skipped"}
+
+
+class TestResults(NamedTuple):
+    """The numbers of test cases read from a JUnit report.
+
+    Attributes:
+        tests(int): Number of test cases.
+        failed(int): Number of test cases that failed or had an error.
+        skipped(int): Number of test cases that were skipped.
+    """
+
+    tests: int
+    failed: int
+    skipped: int
+
+    @property
+    def passed(self) -> int:
+        """Number of test cases that passed."""
+        return self.tests - self.failed - self.skipped
+
+
+def read_junit(source: Union[str, Path, IO[bytes]]) -> TestResults:
+    """Count the test cases in a JUnit XML report.
+
+    The test cases are counted from the ``<testcase>`` elements, rather than from the
+    totals of the test suites, which some tools leave out or count differently.  The
+    report is parsed as a stream, and elements are discarded once they have been
+    counted, so memory use does not grow with the size of the report.
+
+    Args:
+        source: Location of the report, or a binary file to read it from.
+
+    Raises:
+        ValueError: When the report is not a valid JUnit report.
+
+    Examples:
+
+        >>> import io
+        >>> report = io.BytesIO(
+        ...     b'<testsuite><testcase name="a"/><testcase name="b"><failure/></testcase>'
+        ...     b'<testcase name="c"><skipped/></testcase></testsuite>'
+        ... )
+        >>> results = read_junit(report)
+        >>> results, results.passed
+        (TestResults(tests=3, failed=1, skipped=1), 1)
+    """
+    if isinstance(source, Path):
+        source = str(source)
+
+    tests = failed = skipped = 0
+    outcome = None
+    tags: List[str] = []
+
+    for event, element in iterparse(source):
+        if event == "end":
+            if tags.pop() == "testcase":
+                tests += 1
+                failed += outcome == "failed"
+                skipped += outcome == "skipped"
+            continue
+
+        tag = local_name(element.tag)
+        if not tags and tag not in ("testsuites", "testsuite"):
+            raise ValueError("Not a JUnit report.")
+        if tag == "testcase":
+            outcome = None
+        elif tags and tags[-1] == "testcase" and tag in _OUTCOMES:
+            # A failure outweighs a skip, whatever order they are reported in.
+            if outcome != "failed":
+                outcome = _OUTCOMES[tag]
+        tags.append(tag)
+
+    return TestResults(tests, failed, skipped)
+
+
+def junit_value_format(results: TestResults) -> str:
+    """Return the value format of a test results badge, for the number of failures.
+
+    Examples:
+
+        >>> junit_value_format(TestResults(10, 2, 1)) % 2
+        '7 passed, 2 failed, 1 skipped'
+    """
+    value_format = f"{results.passed} passed, %d failed"
+    if results.skipped:
+        value_format += f", {results.skipped} skipped"
+    return value_format
+
+
+def junit_badge(results: TestResults, label: str = "tests", **kwargs) -> Badge:
+    """Create a test results badge.
+
+    The value of the badge is the number of failed tests, so the badge is green when
+    no tests failed and red otherwise.  Pass ``thresholds`` to color the badge by the
+    number of failures instead.
+
+    Args:
+        results(TestResults): Test results read from a JUnit report.
+        label(str, optional): Badge label.
+        **kwargs: Other arguments for :class:`anybadge.Badge`.
+
+    Examples:
+
+        >>> badge = junit_badge(TestResults(1234, 2, 0))
+        >>> badge.value_text, badge.badge_color
+        ('1232 passed, 2 failed', 'red')
+        >>> junit_badge(TestResults(1234, 0, 0)).badge_color
+        'green'
+    """
+    kwargs.setdefault("value_format", junit_value_format(results))
+    kwargs.setdefault("thresholds", {1: "green"})
+    kwargs.setdefault("default_color", "red")
+    kwargs.setdefault("use_max_when_value_exceeds", False)
+    return Badge(label, results.failed, **kwargs)
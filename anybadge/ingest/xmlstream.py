@@ -0,0 +1,49 @@
+"""Streaming XML parsing with constant memory use."""
+
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, List, Tuple, Union
+
+
+def iterparse(source: Union[str, IO]) -> Iterator[Tuple[str, ET.Element]]:
+    """Parse an XML document, yielding ``start`` and ``end`` events for its elements.
+
+    Elements are removed from their parent after their ``end`` event, so the
+    document is never held in memory.  The attributes of an element can be read at
+    its ``start`` event, and its text and children at its ``end`` event.
+
+    Raises:
+        ValueError: When the document is not valid XML.
+
+    Examples:
+
+        >>> import io
+        >>> document = io.BytesIO(b'<a><b x="1"/><b x="2"/></a>')
+        >>> [(event, element.tag) for event, element in iterparse(document)]
+        [('start', 'a'), ('start', 'b'), ('end', 'b'), ('start', 'b'), ('end', 'b'), ('end', 'a')]
+    """
+    parents: List[ET.Element] = []
+    try:
+        for event, element in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                parents.append(element)
+                yield event, element
+                continue
+
+            parents.pop()
+            yield event, element
+            # All earlier children have ended too, so the parent can drop them all.
+            if parents:
+                del parents[-1][:]
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid XML: {e}") from e
+
+
+def local_name(tag: str) -> str:
+    """Return an element tag without its namespace.
+
+    Examples:
+
+        >>> local_name('{http://example.com/ns}testcase')
+        'testcase'
+    """
+    return tag.rsplit("}", 1)[-1]
@@ -0,0 +1,197 @@
+"""Optional instrumentation of the badge rendering phases.
+
+Rendering a badge is split into a number of phases:
+
+* ``value parsing`` - detecting the value type and formatting the value text.
+* ``thresholds`` - evaluating the thresholds to select the badge color.
+* ``width`` - measuring the label and value text and calculating positions.
+* ``template`` - loading the SVG template.
+* ``substitution`` - populating the template placeholders.
+
+Callbacks can be registered to receive the time spent in each phase.  When no
+callbacks are registered the phases are not timed at all.
+
+Examples:
+
+    Collect timings for a block of code and print a per-phase breakdown:
+
+    >>> from anybadge import Badge
+    >>> with profile() as aggregator:
+    ...     _ = Badge('pylint', 2.22).badge_svg_text
+    >>> aggregator.count('substitution')
+    1
+    >>> is_enabled()
+    False
+
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO
+
+#: Type of a profiling callback.  Callbacks receive the phase name and the time
+#: spent in the phase in seconds.
+ProfilingCallback = Callable[[str, float], None]
+
+PHASES = ("value parsing", "thresholds", "width", "template", "substitution")
+
+_callbacks: List[ProfilingCallback] = []
+
+
+class _NullPhase:
+    """Context manager used for phases when profiling is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+class _Phase:
+    """Context manager that times a phase and reports it to the registered callbacks."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        duration = time.perf_counter() - self.start
+        for callback in list(_callbacks):
+            callback(self.name, duration)
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def phase(name: str):
+    """Return a context manager that times the named phase.
+
+    When no callbacks are registered a shared no-op context manager is returned, so
+    instrumented code pays nothing beyond the function call.
+    """
+    if not _callbacks:
+        return _NULL_PHASE
+    return _Phase(name)
+
+
+def is_enabled() -> bool:
+    """Return True if any profiling callbacks are registered."""
+    return bool(_callbacks)
+
+
+def register(callback: ProfilingCallback) -> None:
+    """Register a callback to receive phase timings."""
+    _callbacks.append(callback)
+
+
+def unregister(callback: ProfilingCallback) -> None:
+    """Remove a previously registered callback."""
+    try:
+        _callbacks.remove(callback)
+    except ValueError:
+        pass
+
+
+class PhaseAggregator:
+    """Profiling callback that aggregates timings per phase.
+
+    Examples:
+
+        >>> aggregator = PhaseAggregator()
+        >>> aggregator('width', 0.5)
+        >>> aggregator('width', 1.5)
+        >>> aggregator.count('width')
+        2
+        >>> aggregator.total('width')
+        2.0
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._totals: Dict[str, float] = {}
+        self._maximums: Dict[str, float] = {}
+
+    def __call__(self, phase_name: str, duration: float) -> None:
+        self._counts[phase_name] = self._counts.get(phase_name, 0) + 1
+        self._totals[phase_name] = self._totals.get(phase_name, 0.0) + duration
+        if duration > self._maximums.get(phase_name, 0.0):
+            self._maximums[phase_name] = duration
+
+    @property
+    def phases(self) -> List[str]:
+        """Names of the phases that have been recorded, in rendering order."""
+        known = [name for name in PHASES if name in self._counts]
+        return known + sorted(name for name in self._counts if name not in PHASES)
+
+    def count(self, phase_name: str) -> int:
+        """Number of times a phase was recorded."""
+        return self._counts.get(phase_name, 0)
+
+    def total(self, phase_name: str) -> float:
+        """Total time in seconds spent in a phase."""
+        return self._totals.get(phase_name, 0.0)
+
+    def reset(self) -> None:
+        """Discard all recorded timings."""
+        self._counts.clear()
+        self._totals.clear()
+        self._maximums.clear()
+
+    def report(self) -> str:
+        """Return a per-phase breakdown as a text table."""
+        grand_total = sum(self._totals.values())
+        lines = [
+            "%-14s %10s %12s %12s %12s %7s"
+            % ("phase", "calls", "total (ms)", "mean (us)", "max (us)", "share")
+        ]
+        for name in self.phases:
+            count = self._counts[name]
+            total = self._totals[name]
+            share = (total / grand_total * 100.0) if grand_total else 0.0
+            lines.append(
+                "%-14s %10d %12.3f %12.3f %12.3f %6.1f%%"
+                % (
+                    name,
+                    count,
+                    total * 1000.0,
+                    total / count * 1000000.0,
+                    self._maximums[name] * 1000000.0,
+                    share,
+                )
+            )
+        return "\n".join(lines)
+
+    def print_report(self, file: Optional[TextIO] = None) -> None:
+        """Print the per-phase breakdown."""
+        print(self.report(), file=file or sys.stdout)
+
+
+@contextmanager
+def profile(
+    callback: Optional[ProfilingCallback] = None,
+) -> Iterator[Any]:
+    """Context manager that enables profiling for the duration of the block.
+
+    Args:
+        callback(callable, optional): Callback to register.  A new ``PhaseAggregator``
+            is used if no callback is given.
+
+    Yields:
+        The registered callback.
+    """
+    if callback is None:
+        callback = PhaseAggregator()
+    register(callback)
+    try:
+        yield callback
+    finally:
+        unregister(callback)
@@ -0,0 +1,493 @@
+"""Request handling core of the anybadge server.
+
+The core takes a :class:`Request` and returns a :class:`Response`, and knows
+nothing about the server it runs in.  The stdlib HTTP server, WSGI and ASGI front
+ends translate between their own request formats and this one.
+"""
+
+import html
+import json
+import logging
+import re
+import threading
+import urllib.parse as urlparse
+from collections import Counter
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from anybadge.helpers import text_width_cache
+from anybadge.server import config
+from anybadge.server.batch import parse_batch_json, parse_batch_query, sprite_svg
+from anybadge.server.cache import RenderCache
+from anybadge.server.render import (
+    BadgeParams,
+    LimitExceeded,
+    get_style,
+    named_error,
+    resolve_thresholds,
+)
+from anybadge.server.routes import ROUTES, Router, badge_path, split_spec
+from anybadge.server.static import StaticFile, StaticFiles
+from anybadge.server.store import BadgeStore
+
+logger = logging.getLogger(__name__)
+
+
+class Request(NamedTuple):
+    """A request received from a client.
+
+    Header names are lower case.  The body is read on demand using ``read_body``,
+    so that the size of the body can be checked before it is read.
+    """
+
+    method: str
+    path: str
+    query_string: str = ""
+    headers: Mapping[str, str] = {}
+    read_body: Callable[[int], bytes] = lambda size: b""
+
+
+class Response(NamedTuple):
+    """A response to be sent to the client.
+
+    A response to a request for a static file has an empty body and the open
+    ``file``, so that front ends can send the file without reading it into Python.
+    """
+
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    file: Optional[StaticFile] = None
+
+    @property
+    def content_length(self) -> int:
+        return self.file.size if self.file is not None else len(self.body)
+
+    def read_body(self) -> bytes:
+        """Return the body, reading it from the static file if there is one."""
+        return self.file.read() if self.file is not None else self.body
+
+
+#: A host name, IPv4 address or bracketed IPv6 address, and an optional port.
+_HOST_PATTERN = re.compile(r"(?:[A-Za-z0-9._-]+|\[[0-9A-Fa-f:.]+\])(?::[0-9]{1,5})?")
+
+
+class BadRequest(Exception):
+    """The request is not valid."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def text_response(status: int, message: str) -> Response:
+    """Return a plain text response."""
+    return Response(
+        status, {"Content-Type": "text/plain; charset=utf-8"}, message.encode("utf-8")
+    )
+
+
+def json_response(status: int, data: Any) -> Response:
+    """Return a JSON response."""
+    return Response(
+        status, {"Content-Type": "application/json"}, json.dumps(data).encode("utf-8")
+    )
+
+
+def svg_response(svg: bytes, cache: bool = True) -> Response:
+    """Return a badge response."""
+    cache_control = f"public, max-age={config.CACHE_MAX_AGE}" if cache else "no-cache"
+    return Response(
+        200, {"Content-Type": "image/svg+xml", "Cache-Control": cache_control}, svg
+    )
+
+
+def static_response(static_file: StaticFile) -> Response:
+    """Return a response that sends a static badge file."""
+    headers = {
+        "Content-Type": "image/svg+xml",
+        "Cache-Control": f"public, max-age={config.CACHE_MAX_AGE}",
+        "Last-Modified": static_file.last_modified,
+        "Vary": "Accept-Encoding",
+    }
+    if static_file.content_encoding:
+        headers["Content-Encoding"] = static_file.content_encoding
+    return Response(200, headers, b"", static_file)
+
+
+def split_badge_spec(spec: str, min_fields: int, max_fields: int) -> List[str]:
+    """Split a badge path spec, checking the number of fields."""
+    fields = split_spec(spec)
+    if not min_fields <= len(fields) <= max_fields:
+        raise ValueError(f"Invalid badge specification: {urlparse.unquote(spec)}")
+    return fields
+
+
+class AnyBadgeApp:
+    """The anybadge server application.
+
+    Requests are dispatched to methods named after the HTTP method and the matched
+    route, for example a GET request matching the ``badge`` route is handled by
+    ``get_badge``.  Route methods raise ``ValueError`` for invalid input.
+
+    Args:
+        store(BadgeStore, optional): Store of named badges updated by clients.
+        host(str, optional): Host used in links on the help page when the request
+            has no ``Host`` header.
+        static(StaticFiles, optional): Pre-rendered badge files, which are served in
+            place of rendering a badge when a file exists for the request path.
+        cache(RenderCache, optional): Cache of rendered badges.  An in-memory cache is
+            used by default.
+
+    Examples:
+
+        >>> app = AnyBadgeApp()
+        >>> response = app.handle(Request('GET', '/badge/build-passing.svg'))
+        >>> response.status, response.headers['Content-Type']
+        (200, 'image/svg+xml')
+        >>> app.handle(Request('GET', '/missing')).status
+        404
+    """
+
+    router = Router(ROUTES)
+
+    def __init__(
+        self,
+        store: Optional[BadgeStore] = None,
+        host: str = "localhost",
+        static: Optional[StaticFiles] = None,
+        cache: Optional[RenderCache] = None,
+    ):
+        self.store: BadgeStore = store if store is not None else BadgeStore()
+        self.host = host
+        self.static = static
+        self.cache: RenderCache = cache if cache is not None else RenderCache()
+        self.counters: "Counter[str]" = Counter()
+        #: Cleared while the application is not ready to serve traffic.
+        self.ready = threading.Event()
+        self.ready.set()
+        self._counters_lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        """Increment a request counter reported by the stats endpoint."""
+        with self._counters_lock:
+            self.counters[name] += 1
+
+    def handle(self, request: Request) -> Response:
+        """Dispatch a request to its route and return the response.
+
+        HEAD requests are handled as GET requests.  The front end is responsible for
+        not sending the body of a response to a HEAD request.
+        """
+        method = "GET" if request.method == "HEAD" else request.method
+
+        if len(request.path) + len(request.query_string) > config.MAX_URL_LENGTH:
+            self.count("rejected_url_length")
+            return text_response(414, "Request URL is too long.")
+
+        if self.static is not None and method == "GET":
+            accept_gzip = "gzip" in request.headers.get("accept-encoding", "")
+            static_file = self.static.lookup(request.path, accept_gzip)
+            if static_file is not None:
+                return static_response(static_file)
+
+        match = self.router.match(request.path)
+
+        if match is None:
+            logger.debug("No route for path: %s", request.path)
+            return text_response(404, "Not found.")
+
+        route_name, params = match
+        logger.debug("Route: %s Params: %s", route_name, params)
+        route_method = getattr(self, f"{method.lower()}_{route_name}", None)
+        if route_method is None:
+            return text_response(405, "Method not allowed.")
+
+        query = urlparse.parse_qs(request.query_string)
+        try:
+            return route_method(request, params, query)
+        except BadRequest as e:
+            return text_response(e.status, str(e))
+        except LimitExceeded as e:
+            self.count(f"rejected_{e.limit}")
+            return text_response(e.status, str(e))
+        except ValueError as e:
+            return text_response(400, str(e))
+
+    def read_json(self, request: Request) -> Any:
+        """Read and decode the JSON request body."""
+        if "content-length" not in request.headers:
+            raise BadRequest("Content-Length is required.", 411)
+        try:
+            length = int(request.headers["content-length"])
+        except ValueError:
+            raise BadRequest("Invalid Content-Length.")
+        if length > config.MAX_REQUEST_BODY_SIZE:
+            raise BadRequest("Request body is too large.", 413)
+
+        try:
+            return json.loads(request.read_body(length))
+        except ValueError as e:
+            raise BadRequest(f"Invalid JSON: {e}")
+
+    def get_index(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Redirect query string badge requests to their path, or show help."""
+        label = query.get("label", [""])[0]
+        value = query.get("value", [""])[0]
+        color = query.get("color", [""])[0]
+        style_name = query.get("style", [""])[0]
+        threshold_text = query.get("thresholds", [""])[0]
+
+        suffix = ""
+        if style_name:
+            style = get_style(style_name)
+            if not label and style.label:
+                label = style.label
+            if style.suffix:
+                suffix = style.suffix
+            if not threshold_text:
+                threshold_text = style.threshold
+
+        if not (label and value):
+            logger.debug("Not all parameters present.")
+            return self.help_response(request)
+
+        thresholds = resolve_thresholds(threshold_text)
+
+        # A style combined with explicit thresholds has no path form, so render it here.
+        if style_name and query.get("thresholds"):
+            badge_params = BadgeParams(
+                label=label,
+                value=value,
+                color=color or None,
+                suffix=suffix,
+                thresholds=thresholds,
+            )
+            return svg_response(self.cache.render(badge_params))
+
+        if style_name:
+            explicit_label = query.get("label", [""])[0]
+            location = badge_path(explicit_label, value, style=style_name.lower())
+            in_path = {"label", "value", "style"}
+        else:
+            location = badge_path(label, value, color, thresholds=thresholds)
+            in_path = {"label", "value", "color", "thresholds"}
+
+        # Keep the parameters that the path can not hold in the query string.
+        remaining = [
+            (name, item)
+            for name, items in query.items()
+            if name not in in_path
+            for item in items
+        ]
+        if remaining:
+            location += "?" + urlparse.urlencode(remaining)
+
+        logger.debug("Redirecting to: %s", location)
+        return Response(
+            301,
+            {
+                "Location": location,
+                "Cache-Control": f"public, max-age={config.CACHE_MAX_AGE}",
+            },
+            b"",
+        )
+
+    def get_favicon(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Respond to favicon requests."""
+        return text_response(404, "Not found.")
+
+    def get_badge(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Render a badge from a ``/badge/<label>-<value>[-<color>].svg`` path."""
+        fields = split_badge_spec(params["spec"], 2, 3)
+        color = fields[2] if len(fields) == 3 else None
+        return svg_response(
+            self.cache.render(
+                BadgeParams(label=fields[0], value=fields[1], color=color)
+            )
+        )
+
+    def get_style_badge(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Render a badge from a ``/style/<style>/[<label>-]<value>.svg`` path.
+
+        The ``color`` query parameter sets the color used when no threshold matches.
+        """
+        style = get_style(urlparse.unquote(params["style"]))
+        fields = split_badge_spec(params["spec"], 1, 2)
+        value = fields[-1]
+        label = fields[0] if len(fields) == 2 else style.label
+        thresholds = resolve_thresholds(style.threshold)
+        color = query.get("color", [None])[0]
+        return svg_response(
+            self.cache.render(
+                BadgeParams(label, value, color, style.suffix or "", thresholds)
+            )
+        )
+
+    def get_thresholds_badge(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Render a badge from a ``/thresholds/<thresholds>/<label>-<value>[-<color>].svg`` path."""
+        thresholds = resolve_thresholds(urlparse.unquote(params["thresholds"]))
+        fields = split_badge_spec(params["spec"], 2, 3)
+        label, value = fields[0], fields[1]
+        color = fields[2] if len(fields) == 3 else None
+        return svg_response(
+            self.cache.render(BadgeParams(label, value, color, "", thresholds))
+        )
+
+    def get_store(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """List the specifications of the stored badges."""
+        return json_response(200, self.store.specs())
+
+    def post_store(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Set many stored badges from a JSON object of names to specifications."""
+        specs = self.read_json(request)
+        if not isinstance(specs, dict):
+            raise ValueError(
+                "Request body must be an object of badge names to specifications."
+            )
+        if len(specs) > config.MAX_BATCH_SIZE:
+            raise LimitExceeded(
+                f"Too many badges in update. The maximum is {config.MAX_BATCH_SIZE}.",
+                "batch_size",
+                413,
+            )
+        self.store.update(specs)
+        return json_response(200, {"updated": sorted(specs)})
+
+    def get_stored_badge(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Serve a stored badge from its pre-rendered SVG."""
+        svg = self.store.get(params["name"])
+        if svg is None:
+            return text_response(404, f"Badge '{params['name']}' not found.")
+        return svg_response(svg, cache=False)
+
+    def put_stored_badge_spec(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Set a stored badge from a JSON specification."""
+        self.store.set(params["name"], self.read_json(request))
+        return json_response(
+            200, {"name": params["name"], "path": f"/badges/{params['name']}.svg"}
+        )
+
+    post_stored_badge_spec = put_stored_badge_spec
+
+    def get_batch(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Render the badges given by ``badge`` query parameters in one response."""
+        return self.batch_response(parse_batch_query(query), params.get("format"))
+
+    def post_batch(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Render the badges given in a JSON request body in one response."""
+        return self.batch_response(
+            parse_batch_json(self.read_json(request)), params.get("format")
+        )
+
+    def batch_response(
+        self, badges: List[Tuple[str, BadgeParams]], response_format: Optional[str]
+    ) -> Response:
+        """Return a JSON object of names to SVGs, or an SVG sprite for ``.svg``."""
+        rendered = []
+        for name, badge_params in badges:
+            try:
+                rendered.append((name, self.cache.render(badge_params)))
+            except ValueError as e:
+                raise named_error(name, e) from e
+
+        if response_format == ".svg":
+            return svg_response(sprite_svg(rendered))
+        return Response(
+            200,
+            {
+                "Content-Type": "application/json",
+                "Cache-Control": f"public, max-age={config.CACHE_MAX_AGE}",
+            },
+            json.dumps({name: svg.decode("utf-8") for name, svg in rendered}).encode(
+                "utf-8"
+            ),
+        )
+
+    def get_ready(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Report whether the server is ready to serve traffic."""
+        if not self.ready.is_set():
+            response = text_response(503, "Warming up.")
+            response.headers["Retry-After"] = str(config.RETRY_AFTER)
+            return response
+        return text_response(200, "Ready.")
+
+    def get_stats(
+        self, request: Request, params: Dict[str, str], query: Dict[str, List[str]]
+    ):
+        """Report server statistics."""
+        return Response(
+            200,
+            {"Content-Type": "application/json", "Cache-Control": "no-cache"},
+            json.dumps(self.stats()).encode("utf-8"),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return server statistics."""
+        return {
+            "render_cache": dict(self.cache.stats, size=len(self.cache.memory)),
+            "requests": dict(self.counters),
+            "stored_badges": len(self.store),
+            "text_width_cache": text_width_cache.stats,
+        }
+
+    def help_response(self, request: Request) -> Response:
+        """Return the help page.
+
+        Raises:
+            BadRequest: When the ``Host`` header is not a host and optional port.
+        """
+        host = request.headers.get("host") or self.host
+        if not _HOST_PATTERN.fullmatch(host):
+            raise BadRequest("Invalid Host header.")
+        host = html.escape(host)
+
+        help_text = f"""
+                    <h1>Welcome to the Anybadge Web Server.</h1>
+
+                    You are seeing this message because you haven't passed all the query parameters
+                    to display a badge.
+
+                    You need to pass at least a <b>label</b> and <b>value</b> parameter.
+
+                    Here is an example:
+
+                    <a href="http://{host}/?label=Project%20Awesomeness&value=110%">\
+                    http://{host}/?label=Project%20Awesomeness&value=110%</a>
+
+                    Badges can also be requested using a path, for example:
+
+                    <a href="http://{host}/badge/Project_Awesomeness-110%25-green.svg">\
+                    http://{host}/badge/Project_Awesomeness-110%25-green.svg</a>
+                    """
+
+        body = b"<html><head><title>Anybadge Web Server.</title></head>"
+        body += b"<body>"
+        for line in help_text.splitlines():
+            body += str.encode("<p>%s</p>" % line)
+        body += b"</body></html>"
+
+        return Response(200, {"Content-type": "text/html"}, body)
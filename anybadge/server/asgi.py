@@ -0,0 +1,131 @@
+"""ASGI front end for the anybadge server.
+
+Run the server under an ASGI server such as uvicorn::
+
+    uvicorn anybadge.server.asgi:application
+"""
+
+import io
+import urllib.parse as urlparse
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+
+from anybadge.server import config
+from anybadge.server.app import AnyBadgeApp, Request
+
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+async def read_body(receive: Receive, headers: Mapping[str, str]) -> bytes:
+    """Receive the request body.
+
+    The body is only received when it has a valid Content-Length that is within the
+    size limit.  Otherwise the application rejects the request without reading it.
+    """
+    try:
+        length = int(headers.get("content-length", ""))
+    except ValueError:
+        return b""
+    if length > config.MAX_REQUEST_BODY_SIZE:
+        return b""
+
+    body = b""
+    more_body = True
+    while more_body and len(body) < length:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+
+def request_path(scope: Dict[str, Any]) -> str:
+    """Return the quoted request path, as routes match it.
+
+    The decoded ``path`` can not tell percent-encoded characters, such as ``%2D``,
+    apart from plain ones, so the undecoded ``raw_path`` is used when it is given.
+
+    Examples:
+
+        >>> request_path({'path': '/badge/a--5.svg', 'raw_path': b'/badge/a-%2D5.svg'})
+        '/badge/a-%2D5.svg'
+        >>> request_path({'path': '/badge/a b.svg'})
+        '/badge/a%20b.svg'
+    """
+    raw_path = scope.get("raw_path")
+    if raw_path and not scope.get("root_path"):
+        return raw_path.decode("latin-1")
+    return urlparse.quote(scope["path"])
+
+
+class ASGIApplication:
+    """ASGI application that passes requests to an anybadge application.
+
+    Badges are rendered on the event loop, which is fast enough not to need a
+    thread pool.
+
+    Args:
+        app(AnyBadgeApp, optional): The application that handles requests.
+    """
+
+    def __init__(self, app: Optional[AnyBadgeApp] = None):
+        self.app = app if app is not None else AnyBadgeApp()
+
+    async def __call__(
+        self, scope: Dict[str, Any], receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+        }
+        body = await read_body(receive, headers)
+        request = Request(
+            scope["method"],
+            request_path(scope),
+            scope.get("query_string", b"").decode("latin-1"),
+            headers,
+            io.BytesIO(body).read,
+        )
+        response = self.app.handle(request)
+
+        response_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in response.headers.items()
+        ]
+        response_headers.append(
+            (b"content-length", str(response.content_length).encode())
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status,
+                "headers": response_headers,
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"" if request.method == "HEAD" else response.read_body(),
+            }
+        )
+
+    @staticmethod
+    async def lifespan(receive: Receive, send: Send) -> None:
+        """Acknowledge server startup and shutdown."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = ASGIApplication()
@@ -0,0 +1,165 @@
+"""Requests for many badges in one response."""
+
+import html
+import re
+from typing import Any, Dict, List, Tuple
+
+from anybadge.server import config
+from anybadge.server.render import (
+    BadgeParams,
+    LimitExceeded,
+    named_error,
+    params_from_spec,
+)
+from anybadge.server.routes import split_spec
+
+ID_REGEX = re.compile(r'\bid="([^"]+)"')
+SVG_TAG_REGEX = re.compile(r"<svg\b[^>]*>")
+SIZE_REGEX = re.compile(r'\b(width|height)="([0-9.]+)"')
+
+#: Vertical space between badges in a sprite.
+SPRITE_GAP = 2
+
+
+def _check_batch_size(count: int) -> None:
+    if count > config.MAX_BATCH_SIZE:
+        raise LimitExceeded(
+            f"Too many badges in batch. The maximum is {config.MAX_BATCH_SIZE}.",
+            "batch_size",
+        )
+
+
+def _named_params(name: str, spec: Any) -> Tuple[str, BadgeParams]:
+    try:
+        return name, params_from_spec(spec)
+    except ValueError as e:
+        raise named_error(name, e) from e
+
+
+def parse_batch_json(data: Any) -> List[Tuple[str, BadgeParams]]:
+    """Return the names and parameters of the badges in a JSON batch request.
+
+    A batch is either an object of names to badge specifications, or a list of
+    badge specifications with an optional ``name``.  Badges in a list without a name
+    are named by their position.
+
+    Raises:
+        ValueError: When the batch is not valid.
+
+    Examples:
+
+        >>> [name for name, _ in parse_batch_json([{'value': 1}, {'name': 'b', 'value': 2}])]
+        ['0', 'b']
+    """
+    if isinstance(data, dict):
+        _check_batch_size(len(data))
+        return [_named_params(str(name), spec) for name, spec in data.items()]
+
+    if isinstance(data, list):
+        _check_batch_size(len(data))
+        badges = []
+        for index, spec in enumerate(data):
+            if isinstance(spec, dict) and "name" in spec:
+                spec = dict(spec)
+                name = str(spec.pop("name"))
+            else:
+                name = str(index)
+            badges.append(_named_params(name, spec))
+        return badges
+
+    raise ValueError(
+        "Request body must be an object of names to badge specifications, or a list "
+        "of badge specifications."
+    )
+
+
+def parse_batch_query(query: Dict[str, List[str]]) -> List[Tuple[str, BadgeParams]]:
+    """Return the names and parameters of the badges in a batch query string.
+
+    Each ``badge`` parameter is a ``<label>-<value>[-<color>]`` specification, in the
+    same form as a ``/badge/`` path, and the badge is named by its specification.
+
+    Raises:
+        ValueError: When the batch is not valid.
+
+    Examples:
+
+        >>> parse_batch_query({'badge': ['build-passing-green']})
+        [('build-passing-green', BadgeParams(label='build', value='passing', color='green', suffix='', thresholds=None))]
+    """
+    specs = query.get("badge", [])
+    if not specs:
+        raise ValueError("Batch requests need at least one 'badge' parameter.")
+    _check_batch_size(len(specs))
+
+    badges = []
+    for spec in specs:
+        fields = split_spec(spec)
+        if not 2 <= len(fields) <= 3:
+            raise ValueError(f"Invalid badge specification: {spec}")
+        badges.append(
+            (
+                spec,
+                BadgeParams(
+                    label=fields[0],
+                    value=fields[1],
+                    color=fields[2] if len(fields) == 3 else None,
+                ),
+            )
+        )
+    return badges
+
+
+def prefix_ids(svg: str, prefix: str) -> str:
+    """Prefix the element ids in an SVG document, and the references to them.
+
+    Badges rendered separately can use the same ids, so ids are made unique before
+    badges are combined in one document.
+
+    Examples:
+
+        >>> prefix_ids('<mask id="m"/><g mask="url(#m)"/>', 'b1_')
+        '<mask id="b1_m"/><g mask="url(#b1_m)"/>'
+    """
+    for element_id in set(ID_REGEX.findall(svg)):
+        svg = svg.replace(f'id="{element_id}"', f'id="{prefix}{element_id}"')
+        svg = svg.replace(f"url(#{element_id})", f"url(#{prefix}{element_id})")
+        svg = svg.replace(f'href="#{element_id}"', f'href="#{prefix}{element_id}"')
+    return svg
+
+
+def sprite_svg(badges: List[Tuple[str, bytes]]) -> bytes:
+    """Combine badges into one SVG sprite.
+
+    The badges are stacked vertically.  Each badge has a ``view`` with the badge name
+    as its id, so a single badge can be shown using a fragment, for example
+    ``sprite.svg#build``.
+    """
+    parts = []
+    width = 0.0
+    y = 0.0
+    for index, (name, svg_bytes) in enumerate(badges):
+        svg = svg_bytes.decode("utf-8")
+        svg = svg[svg.index("<svg") :]
+        svg = prefix_ids(svg, f"sprite{index}_")
+
+        root = SVG_TAG_REGEX.search(svg).group(0)  # type: ignore
+        sizes = {key: float(value) for key, value in SIZE_REGEX.findall(root)}
+        badge_width, badge_height = sizes.get("width", 0.0), sizes.get("height", 20.0)
+
+        nested = root.replace("<svg ", f'<svg x="0" y="{y:g}" ', 1)
+        parts.append(
+            f'<view id="{html.escape(name)}" '
+            f'viewBox="0 {y:g} {badge_width:g} {badge_height:g}"/>'
+        )
+        parts.append(svg.replace(root, nested, 1))
+
+        width = max(width, badge_width)
+        y += badge_height + SPRITE_GAP
+
+    height = max(y - SPRITE_GAP, 0)
+    header = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:g}" height="{height:g}">\n'
+    )
+    return (header + "\n".join(parts) + "\n</svg>\n").encode("utf-8")
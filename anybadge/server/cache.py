@@ -0,0 +1,311 @@
+"""Caches of rendered badges for the anybadge server."""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from anybadge.server import config
+from anybadge.server.render import BadgeParams, check_limits, render_svg
+
+logger = logging.getLogger(__name__)
+
+
+def render_key(params: BadgeParams) -> str:
+    """Return the canonical cache key for badge parameters.
+
+    Parameters that render the same badge have the same key.
+
+    Examples:
+
+        >>> render_key(BadgeParams('build', 'passing'))
+        '["build", "passing", "green", "", null]'
+        >>> render_key(BadgeParams('build', 'passing', 'green'))
+        '["build", "passing", "green", "", null]'
+    """
+    thresholds = list(params.thresholds.items()) if params.thresholds else None
+    return json.dumps(
+        [
+            params.label,
+            params.value,
+            params.color or config.DEFAULT_BADGE_COLOR,
+            params.suffix,
+            thresholds,
+        ]
+    )
+
+
+def thread_connection(local: threading.local, path: str) -> sqlite3.Connection:
+    """Return the connection to an SQLite database for the current thread.
+
+    Connections can not be shared between threads, or with forked processes, so each
+    thread of each process opens its own connection, kept in ``local``.
+    """
+    if getattr(local, "pid", None) != os.getpid():
+        connection = sqlite3.connect(
+            path, timeout=config.PERSISTENT_CACHE_TIMEOUT, isolation_level=None
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        local.connection = connection
+        local.pid = os.getpid()
+    return local.connection
+
+
+class MemoryCache:
+    """Thread safe, size limited in-memory LRU cache of rendered badges.
+
+    Args:
+        max_entries(int): Maximum number of badges to keep.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            svg = self._entries.get(key)
+            if svg is not None:
+                self._entries.move_to_end(key)
+            return svg
+
+    def set(self, key: str, svg: bytes) -> None:
+        with self._lock:
+            self._entries[key] = svg
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """Size limited LRU cache of rendered badges, stored in an SQLite database.
+
+    The database can be shared by every server process on a host, and is kept when
+    the server restarts.  Each thread of each process uses its own connection.
+
+    The least recently used badges are evicted every ``evict_interval`` writes, so
+    the cache can briefly hold a few more than ``max_entries`` badges.
+
+    Args:
+        path(str): Location of the database file.
+        max_entries(int, optional): Maximum number of badges to keep.
+        evict_interval(int, optional): Number of writes between evictions.
+
+    Examples:
+
+        >>> import tempfile
+        >>> cache = SQLiteCache(Path(tempfile.mkdtemp()) / 'cache.db')
+        >>> cache.set('key', b'<svg/>')
+        >>> cache.get('key')
+        b'<svg/>'
+        >>> cache.get('missing') is None
+        True
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_entries: Optional[int] = None,
+        evict_interval: int = 64,
+    ):
+        self.path = str(path)
+        self.max_entries = (
+            config.PERSISTENT_CACHE_SIZE if max_entries is None else max_entries
+        )
+        self.evict_interval = evict_interval
+        self._local = threading.local()
+        self._writes = 0
+
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS badges "
+            "(key TEXT PRIMARY KEY, svg BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS badges_last_used ON badges (last_used)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        return thread_connection(self._local, self.path)
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM badges").fetchone()[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT svg FROM badges WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        connection.execute(
+            "UPDATE badges SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        return row[0]
+
+    def set(self, key: str, svg: bytes) -> None:
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO badges (key, svg, last_used) VALUES (?, ?, ?)",
+            (key, svg, time.time()),
+        )
+        self._writes += 1
+        if self._writes % self.evict_interval == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used badges above the size limit."""
+        self._connection().execute(
+            "DELETE FROM badges WHERE key IN "
+            "(SELECT key FROM badges ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM badges")
+
+
+class _Flight:
+    """A render in progress, which concurrent requests for the same badge wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.svg: Optional[bytes] = None
+        self.error: Optional[Exception] = None
+
+    def wait(self) -> bytes:
+        """Wait for the render to finish, and return the result or raise its error."""
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.svg  # type: ignore
+
+
+class RenderCache:
+    """Cache of rendered badges, with an optional persistent cache behind it.
+
+    Badges are looked up in memory, then in the persistent cache, and are only
+    rendered when neither has them.
+
+    Concurrent requests for a badge that is not in memory are coalesced: the first
+    request looks up or renders the badge, and the others wait for it and share the
+    result.  The number of coalesced requests is counted in ``stats``.
+
+    Args:
+        max_entries(int, optional): Maximum number of badges to keep in memory.
+        persistent(SQLiteCache, optional): Persistent cache shared between processes.
+
+    Examples:
+
+        >>> cache = RenderCache()
+        >>> params = BadgeParams('build', 'passing')
+        >>> cache.render(params) is cache.render(params)
+        True
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        persistent: Optional[SQLiteCache] = None,
+    ):
+        self.memory = MemoryCache(
+            config.RENDER_CACHE_SIZE if max_entries is None else max_entries
+        )
+        self.persistent = persistent
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "persistent_hits": 0,
+            "renders": 0,
+            "coalesced": 0,
+        }
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    def render(self, params: BadgeParams) -> bytes:
+        """Return the rendered badge, from the cache if possible.
+
+        Raises:
+            LimitExceeded: When a parameter exceeds its limit.
+            ValueError: When the badge can not be rendered from the parameters.
+        """
+        check_limits(params)
+        key = render_key(params)
+        svg = self.memory.get(key)
+        if svg is not None:
+            self._count("hits")
+            return svg
+
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                leader = True
+            else:
+                self.stats["coalesced"] += 1
+                leader = False
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            flight.svg = self._lookup_or_render(key, params)
+            return flight.svg
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _lookup_or_render(self, key: str, params: BadgeParams) -> bytes:
+        if self.persistent is not None:
+            svg = self._persistent_get(key)
+            if svg is not None:
+                self._count("persistent_hits")
+                self.memory.set(key, svg)
+                return svg
+
+        self._count("renders")
+        svg = render_svg(params)
+        self.memory.set(key, svg)
+        if self.persistent is not None:
+            self._persistent_set(key, svg)
+        return svg
+
+    def _persistent_get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.persistent.get(key)  # type: ignore
+        except sqlite3.Error as e:
+            logger.warning("Unable to read from persistent cache: %s", e)
+            return None
+
+    def _persistent_set(self, key: str, svg: bytes) -> None:
+        try:
+            self.persistent.set(key, svg)  # type: ignore
+        except sqlite3.Error as e:
+            logger.warning("Unable to write to persistent cache: %s", e)
+
+    def clear(self) -> None:
+        """Remove all badges from the caches."""
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
@@ -1,17 +1,72 @@
 import argparse
+import atexit
 import logging
-from http.server import HTTPServer
+import shutil
+import tempfile
 from os import environ
+from pathlib import Path
 from typing import Optional, Tuple
 
-from anybadge.server.request_handler import AnyBadgeHTTPRequestHandler
-from anybadge.server import config
+from anybadge.server.app import AnyBadgeApp
+from anybadge.server.cache import RenderCache, SQLiteCache
+from anybadge.server.request_handler import (
+    AnyBadgeHTTPRequestHandler,
+    AnyBadgeHTTPServer,
+)
+from anybadge.server import config, logs
+from anybadge.server.prewarm import PrewarmThread, prewarm
+from anybadge.server.static import StaticFiles
+from anybadge.server.store import BadgeStore, SnapshotThread, SQLiteBadgeStore
+from anybadge.server.workers import Supervisor, serve
 
 logger = logging.getLogger(__name__)
 
 
-def run(listen_address: Optional[str] = None, port: Optional[int] = None):
-    """Run a persistent webserver."""
+def run(
+    listen_address: Optional[str] = None,
+    port: Optional[int] = None,
+    store_file: Optional[str] = None,
+    snapshot_interval: Optional[float] = None,
+    workers: int = 1,
+    reuse_port: bool = False,
+    static_dir: Optional[str] = None,
+    cache_file: Optional[str] = None,
+    cache_size: Optional[int] = None,
+    threads: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    header_timeout: Optional[float] = None,
+    body_timeout: Optional[float] = None,
+    prewarm_file: Optional[str] = None,
+    prewarm_background: bool = False,
+):
+    """Run a persistent webserver.
+
+    Args:
+        listen_address(str, optional): Address to listen on.
+        port(int, optional): Port to listen on.
+        store_file(str, optional): File used to snapshot pushed badges.
+        snapshot_interval(float, optional): Seconds between snapshots of pushed badges.
+        workers(int, optional): Number of worker processes.  When more than one worker is
+            used, pushed badges are kept in an SQLite database shared by the workers.
+        reuse_port(bool, optional): Have each worker bind its own socket using
+            ``SO_REUSEPORT`` instead of sharing one inherited socket.
+        static_dir(str, optional): Directory of pre-rendered badge files to serve.
+        cache_file(str, optional): SQLite database used as a persistent cache of
+            rendered badges, shared by all workers.
+        cache_size(int, optional): Maximum number of badges in the persistent cache.
+        threads(int, optional): Number of request handling threads in each process.
+        queue_size(int, optional): Number of connections that can wait for a thread
+            before the server responds with 503 Service Unavailable.
+        header_timeout(float, optional): Seconds allowed for receiving the request line
+            and headers of each request.
+        body_timeout(float, optional): Seconds to wait for data while reading a
+            request body.
+        prewarm_file(str, optional): File listing badges to render into the cache
+            before serving traffic.
+        prewarm_background(bool, optional): Prewarm the cache in a background thread
+            of each process while serving traffic.  ``/ready`` reports 503 until the
+            cache is warm.
+    """
     if not listen_address:
         listen_address = config.DEFAULT_SERVER_LISTEN_ADDRESS
 
@@ -20,13 +75,81 @@ def run(listen_address: Optional[str] = None, port: Optional[int] = None):
 
     server_address: Tuple[str, int] = (listen_address, port)  # type: ignore
 
-    httpd = HTTPServer(server_address, AnyBadgeHTTPRequestHandler)
+    if not snapshot_interval:
+        snapshot_interval = config.DEFAULT_SNAPSHOT_INTERVAL
+
+    store_dir = None
+    if workers > 1:
+        # Each worker is a separate process, so pushed badges are kept in a database
+        # that every worker reads and writes, rather than in the memory of one worker.
+        store_dir = tempfile.mkdtemp(prefix="anybadge-store-")
+        store: BadgeStore = SQLiteBadgeStore(Path(store_dir) / "store.db", store_file)
+    else:
+        store = BadgeStore(store_file)
+    store.load()
+
+    static = StaticFiles(static_dir) if static_dir else None
+    persistent_cache = SQLiteCache(cache_file, cache_size) if cache_file else None
+    app = AnyBadgeApp(
+        store,
+        host="%s:%s" % server_address,
+        static=static,
+        cache=RenderCache(persistent=persistent_cache),
+    )
+
+    def create_server() -> AnyBadgeHTTPServer:
+        return AnyBadgeHTTPServer(
+            server_address,
+            AnyBadgeHTTPRequestHandler,
+            reuse_port=reuse_port,
+            app=app,
+            threads=threads,
+            queue_size=queue_size,
+            header_timeout=header_timeout,
+            body_timeout=body_timeout,
+        )
+
+    def start_prewarm() -> None:
+        if prewarm_file and prewarm_background:
+            PrewarmThread(app, prewarm_file).start()
+
+    # Prewarm before listening, and before forking so that workers share the cache.
+    if prewarm_file and not prewarm_background:
+        prewarm(app, prewarm_file)
+
+    snapshot_thread = None
+    if store_file:
+        snapshot_thread = SnapshotThread(store, snapshot_interval)
+
+    if workers > 1:
+        logger.info(
+            "Serving at: http://%s:%s with %s workers" % (server_address + (workers,))
+        )
+        # The supervisor snapshots the shared store, so only one process writes it.
+        if snapshot_thread:
+            snapshot_thread.start()
+        try:
+            Supervisor(
+                create_server,
+                workers,
+                share_socket=not reuse_port,
+                worker_init=start_prewarm,
+            ).run()
+            if snapshot_thread:
+                snapshot_thread.stop()
+        finally:
+            if store_dir:
+                shutil.rmtree(store_dir, ignore_errors=True)
+        return
+
+    if snapshot_thread:
+        snapshot_thread.start()
+
+    httpd = create_server()
     logger.info("Serving at: http://%s:%s" % server_address)
+    start_prewarm()
 
-    try:
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        logger.info("Received keyboard interrupt. Shutting down...")
+    serve(httpd, on_shutdown=snapshot_thread.stop if snapshot_thread else None)
 
 
 def parse_args() -> argparse.Namespace:
@@ -49,6 +172,131 @@ def parse_args() -> argparse.Namespace:
         help=f"Server listen address.  Default is {config.DEFAULT_SERVER_LISTEN_ADDRESS}. This can also be set via an "
         f"environment variable called ``ANYBADGE_LISTEN_ADDRESS``.",
     )
+    parser.add_argument(
+        "-s",
+        "--store-file",
+        type=str,
+        default=None,
+        help="File used to save badges pushed to the server, so that they are kept when the server restarts.",
+    )
+    parser.add_argument(
+        "--snapshot-interval",
+        type=float,
+        default=config.DEFAULT_SNAPSHOT_INTERVAL,
+        help=f"Number of seconds between saves of pushed badges to the store file.  Default is "
+        f"{config.DEFAULT_SNAPSHOT_INTERVAL}.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=config.DEFAULT_WORKERS,
+        help=f"Number of worker processes to serve requests.  Default is {config.DEFAULT_WORKERS}.",
+    )
+    parser.add_argument(
+        "--reuse-port",
+        action="store_true",
+        help="Have each worker listen on its own socket using SO_REUSEPORT, instead of "
+        "sharing one socket.",
+    )
+    parser.add_argument(
+        "--static-dir",
+        type=str,
+        default=None,
+        help="Directory of pre-rendered .svg and .svgz badge files to serve.  Badges that do not have a "
+        "file are rendered.",
+    )
+    parser.add_argument(
+        "--cache-file",
+        type=str,
+        default=None,
+        help="SQLite database used to cache rendered badges, so that the cache is kept when the server restarts, "
+        "and is shared by all workers.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=config.PERSISTENT_CACHE_SIZE,
+        help=f"Maximum number of badges in the cache file.  Default is {config.PERSISTENT_CACHE_SIZE}.",
+    )
+    parser.add_argument(
+        "-t",
+        "--threads",
+        type=int,
+        default=config.DEFAULT_THREADS,
+        help=f"Number of threads handling requests in each process.  Default is {config.DEFAULT_THREADS}.",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=config.DEFAULT_QUEUE_SIZE,
+        help="Number of connections that can wait for a thread.  When the queue is full the server responds "
+        f"with 503 Service Unavailable.  Default is {config.DEFAULT_QUEUE_SIZE}.",
+    )
+    parser.add_argument(
+        "--header-timeout",
+        type=float,
+        default=config.DEFAULT_HEADER_TIMEOUT,
+        help=f"Seconds allowed for receiving the request line and headers.  Default is "
+        f"{config.DEFAULT_HEADER_TIMEOUT}.",
+    )
+    parser.add_argument(
+        "--body-timeout",
+        type=float,
+        default=config.DEFAULT_BODY_TIMEOUT,
+        help=f"Seconds to wait for data while reading a request body.  Default is {config.DEFAULT_BODY_TIMEOUT}.",
+    )
+    parser.add_argument(
+        "--max-url-length",
+        type=int,
+        default=config.MAX_URL_LENGTH,
+        help=f"Maximum length of a request URL.  Default is {config.MAX_URL_LENGTH}.",
+    )
+    parser.add_argument(
+        "--max-label-length",
+        type=int,
+        default=config.MAX_LABEL_LENGTH,
+        help=f"Maximum length of a badge label.  Default is {config.MAX_LABEL_LENGTH}.",
+    )
+    parser.add_argument(
+        "--max-value-length",
+        type=int,
+        default=config.MAX_VALUE_LENGTH,
+        help=f"Maximum length of a badge value.  Default is {config.MAX_VALUE_LENGTH}.",
+    )
+    parser.add_argument(
+        "--max-thresholds",
+        type=int,
+        default=config.MAX_THRESHOLDS,
+        help=f"Maximum number of thresholds for a badge.  Default is {config.MAX_THRESHOLDS}.",
+    )
+    parser.add_argument(
+        "--prewarm",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="File listing badges to render into the cache before serving traffic, one per line.  Lines can be "
+        "request paths or URLs, badge specifications, or lines of the access log.",
+    )
+    parser.add_argument(
+        "--prewarm-background",
+        action="store_true",
+        help="Prewarm the cache in the background while serving traffic.  /ready responds with 503 until the "
+        "cache is warm.",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=["text", "json"],
+        default="text",
+        help="Format of log messages.  Default is text.",
+    )
+    parser.add_argument(
+        "--access-log-sample",
+        type=float,
+        default=config.ACCESS_LOG_SAMPLE_RATE,
+        help="Fraction of requests to write to the access log, between 0 and 1.  Server errors are always "
+        f"logged.  Default is {config.ACCESS_LOG_SAMPLE_RATE}.",
+    )
     parser.add_argument(
         "-d", "--debug", action="store_true", help="Enable debug logging."
     )
@@ -86,13 +334,33 @@ def main() -> None:
     if args.debug:
         logging_level = logging.DEBUG
 
-    logging.basicConfig(
-        format="%(asctime)-15s %(levelname)s:%(filename)s(%(lineno)d):%(funcName)s: %(message)s",
-        level=logging_level,
-    )
+    config.ACCESS_LOG_SAMPLE_RATE = args.access_log_sample
+    logs.setup_logging(logging_level, json_format=args.log_format == "json")
+    atexit.register(logs.stop_logging)
     logger.info("Starting up anybadge server.")
 
-    run(listen_address=args.listen_address, port=args.port)
+    config.MAX_URL_LENGTH = args.max_url_length
+    config.MAX_LABEL_LENGTH = args.max_label_length
+    config.MAX_VALUE_LENGTH = args.max_value_length
+    config.MAX_THRESHOLDS = args.max_thresholds
+
+    run(
+        listen_address=args.listen_address,
+        port=args.port,
+        store_file=args.store_file,
+        snapshot_interval=args.snapshot_interval,
+        workers=args.workers,
+        reuse_port=args.reuse_port,
+        static_dir=args.static_dir,
+        cache_file=args.cache_file,
+        cache_size=args.cache_size,
+        threads=args.threads,
+        queue_size=args.queue_size,
+        header_timeout=args.header_timeout,
+        body_timeout=args.body_timeout,
+        prewarm_file=args.prewarm,
+        prewarm_background=args.prewarm_background,
+    )
 
 
 if __name__ == "__main__":
@@ -7,3 +7,82 @@ DEFAULT_LOGGING_LEVEL = logging.INFO
 
 SERVER_PORT: int = DEFAULT_SERVER_PORT
 SERVER_LISTEN_ADDRESS: str = DEFAULT_SERVER_LISTEN_ADDRESS
+
+#: Number of distinct threshold strings to keep parsed in memory.
+THRESHOLD_CACHE_SIZE: int = 256
+
+#: Badge color used when no color is requested and no threshold matches.
+DEFAULT_BADGE_COLOR: str = "green"
+
+#: Number of seconds that clients and caches may cache badge responses for.
+CACHE_MAX_AGE: int = 300
+
+#: Maximum size in bytes of a request body.
+MAX_REQUEST_BODY_SIZE: int = 1024 * 1024
+
+#: Number of seconds between snapshots of the badge store.
+DEFAULT_SNAPSHOT_INTERVAL: float = 30.0
+
+#: Number of worker processes used to serve requests.
+DEFAULT_WORKERS: int = 1
+
+#: Minimum number of seconds between restarts of a worker process that exits.
+WORKER_RESTART_DELAY: float = 1.0
+
+#: Number of seconds to wait for worker processes to exit on shutdown.
+WORKER_SHUTDOWN_TIMEOUT: float = 10.0
+
+#: Number of seconds to cache the stat result of a static badge file for.
+STATIC_STAT_TTL: float = 1.0
+
+#: Maximum number of static badge files kept open.
+STATIC_MAX_OPEN_FILES: int = 1024
+
+#: Number of rendered badges to keep in memory.
+RENDER_CACHE_SIZE: int = 1024
+
+#: Number of rendered badges to keep in the persistent cache.
+PERSISTENT_CACHE_SIZE: int = 100000
+
+#: Number of seconds to wait for the persistent cache when another process is writing.
+PERSISTENT_CACHE_TIMEOUT: float = 5.0
+
+#: Number of threads used to handle requests in each server process.
+DEFAULT_THREADS: int = 16
+
+#: Number of accepted connections that can wait for a thread.  Connections accepted
+#: when the queue is full are answered with 503 Service Unavailable.
+DEFAULT_QUEUE_SIZE: int = 64
+
+#: Number of seconds allowed for receiving the request line and headers.
+DEFAULT_HEADER_TIMEOUT: float = 10.0
+
+#: Number of seconds to wait for data while reading a request body.
+DEFAULT_BODY_TIMEOUT: float = 30.0
+
+#: Number of seconds clients are asked to wait before retrying when the server is busy.
+RETRY_AFTER: int = 1
+
+#: Maximum length of a request URL, including the query string.
+MAX_URL_LENGTH: int = 2048
+
+#: Maximum length of a badge label.
+MAX_LABEL_LENGTH: int = 256
+
+#: Maximum length of a badge value.
+MAX_VALUE_LENGTH: int = 256
+
+#: Maximum number of thresholds for a badge.
+MAX_THRESHOLDS: int = 32
+
+#: Fraction of requests written to the access log.  Server errors are always logged.
+ACCESS_LOG_SAMPLE_RATE: float = 1.0
+
+#: Maximum number of badges in a batch request, or in one update of stored badges.
+MAX_BATCH_SIZE: int = 100
+
+#: Maximum number of badges in the store of badges updated by clients.
+MAX_STORED_BADGES: int = 10000
+
+#: Number of connections the operating system queues before the server accepts them.
+LISTEN_BACKLOG: int = 128
@@ -0,0 +1,175 @@
+"""Logging for the anybadge server.
+
+Log records are put on a queue by the thread that logs them, and are formatted and
+written by a background listener thread, so that log I/O is not done while
+handling requests.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from typing import List, Optional
+
+from anybadge.server import config
+
+#: Logger used for the access log.
+access_logger = logging.getLogger("anybadge.server.access")
+
+TEXT_FORMAT = (
+    "%(asctime)-15s %(levelname)s:%(filename)s(%(lineno)d):%(funcName)s: %(message)s"
+)
+
+_queue_handler: Optional["DeferredQueueHandler"] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_handlers: List[logging.Handler] = []
+_fork_hook_registered = False
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the listener thread.
+
+    The standard ``QueueHandler`` formats the message before putting the record on
+    the queue, which would do the formatting on the request path.  The records stay
+    in this process, so they do not need to be prepared for pickling.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as JSON objects, one per line.
+
+    Fields passed in a ``http`` mapping using ``extra`` are included in the object.
+
+    Examples:
+
+        >>> record = logging.makeLogRecord(
+        ...     {'name': 'anybadge', 'levelname': 'INFO', 'msg': 'Hello %s', 'args': ('world',), 'created': 0, 'msecs': 0}
+        ... )
+        >>> JsonFormatter().format(record)
+        '{"time": "1970-01-01T00:00:00.000Z", "level": "INFO", "logger": "anybadge", "message": "Hello world"}'
+    """
+
+    def formatTime(self, record, datefmt=None):
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+        return "%s.%03dZ" % (timestamp, record.msecs)
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        http = getattr(record, "http", None)
+        if http:
+            data.update(http)
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data)
+
+
+def log_access(
+    client: str, method: str, path: str, status: int, size: int, duration: float
+) -> None:
+    """Log a request to the access log.
+
+    Requests are sampled at ``config.ACCESS_LOG_SAMPLE_RATE``, except for server
+    errors, which are always logged.  Nothing is done when the access log is not
+    enabled.
+
+    Args:
+        client(str): Client address.
+        method(str): Request method.
+        path(str): Request path, including the query string.
+        status(int): Response status code.
+        size(int): Size of the response body in bytes.
+        duration(float): Seconds taken to handle the request.
+    """
+    if not access_logger.isEnabledFor(logging.INFO):
+        return
+    sample_rate = config.ACCESS_LOG_SAMPLE_RATE
+    if status < 500 and sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+
+    duration_ms = round(duration * 1000, 3)
+    access_logger.info(
+        '%s "%s %s" %s %s %sms',
+        client,
+        method,
+        path,
+        status,
+        size,
+        duration_ms,
+        extra={
+            "http": {
+                "client": client,
+                "method": method,
+                "path": path,
+                "status": status,
+                "size": size,
+                "duration_ms": duration_ms,
+            }
+        },
+    )
+
+
+def setup_logging(level: int = logging.INFO, json_format: bool = False) -> None:
+    """Send log records through a queue to a background thread that writes them.
+
+    Args:
+        level(int): Logging level of the root logger.
+        json_format(bool): Write JSON objects rather than text.
+    """
+    global _queue_handler, _handlers, _fork_hook_registered
+
+    stop_logging()
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(
+        JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    )
+    _handlers = [stream_handler]
+
+    _queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(level)
+
+    _start_listener()
+    if hasattr(os, "register_at_fork") and not _fork_hook_registered:
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+        _fork_hook_registered = True
+
+
+def _start_listener() -> None:
+    global _listener
+    _listener = logging.handlers.QueueListener(
+        _queue_handler.queue, *_handlers, respect_handler_level=True  # type: ignore
+    )
+    _listener.start()
+
+
+def _after_fork_in_child() -> None:
+    # The listener thread does not exist in a forked process, so start a new one
+    # with a new queue.
+    global _listener
+    if _queue_handler is None or _listener is None:
+        return
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = None
+    _start_listener()
+
+
+def stop_logging() -> None:
+    """Write the queued log records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,158 @@
+"""Rendering badges into the cache before serving traffic."""
+
+import json
+import logging
+import re
+import threading
+import time
+import urllib.parse as urlparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from anybadge.server.app import AnyBadgeApp, Request
+from anybadge.server.render import params_from_spec
+
+logger = logging.getLogger(__name__)
+
+ACCESS_LOG_REGEX = re.compile(r'"(?:GET|HEAD) (/[^\s"]*)')
+
+#: Maximum number of redirects followed for one prewarm entry.
+MAX_REDIRECTS = 2
+
+Entry = Union[str, Dict[str, Any]]
+
+
+def parse_entry(line: str) -> Optional[Entry]:
+    """Return the request path or badge specification for a line of a prewarm file.
+
+    A line can be:
+
+    * a request path or URL, such as ``/badge/build-passing.svg``,
+    * a badge path specification, such as ``build-passing-green``,
+    * a JSON badge specification, such as ``{"label": "build", "value": "passing"}``,
+    * a line of the server's text or JSON access log.
+
+    Blank lines and lines starting with ``#`` are ignored.
+
+    Raises:
+        ValueError: When the line is not valid JSON.
+
+    Examples:
+
+        >>> parse_entry('build-passing-green')
+        '/badge/build-passing-green.svg'
+        >>> parse_entry('https://badges.example.com/?label=build&value=passing')
+        '/?label=build&value=passing'
+        >>> parse_entry('127.0.0.1 "GET /badge/a-b.svg" 200 1020 1.2ms')
+        '/badge/a-b.svg'
+        >>> parse_entry('{"value": 65, "style": "coverage"}')
+        {'value': 65, 'style': 'coverage'}
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    if line.startswith("{"):
+        data = json.loads(line)
+        # Lines of the JSON access log have the request path.
+        if isinstance(data, dict) and "path" in data:
+            return str(data["path"])
+        return data
+
+    match = ACCESS_LOG_REGEX.search(line)
+    if match:
+        return match.group(1)
+
+    if "://" in line:
+        url = urlparse.urlsplit(line)
+        return url.path + ("?" + url.query if url.query else "")
+
+    if line.startswith("/"):
+        return line
+
+    return f"/badge/{line}.svg"
+
+
+def read_prewarm_file(path: Union[str, Path]) -> List[Entry]:
+    """Read the distinct entries of a prewarm file, in the order they first appear."""
+    entries: List[Entry] = []
+    seen = set()
+    with open(path, mode="r") as file_handle:
+        for number, line in enumerate(file_handle, start=1):
+            try:
+                entry = parse_entry(line)
+            except ValueError as e:
+                logger.warning("Skipping line %s of %s: %s", number, path, e)
+                continue
+            if entry is None:
+                continue
+            key = entry if isinstance(entry, str) else json.dumps(entry, sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                entries.append(entry)
+    return entries
+
+
+def warm_entry(app: AnyBadgeApp, entry: Entry) -> bool:
+    """Render one prewarm entry into the application's cache.
+
+    Returns:
+        bool: True if the badge was rendered or served.
+    """
+    if not isinstance(entry, str):
+        try:
+            app.cache.render(params_from_spec(entry))
+            return True
+        except ValueError:
+            return False
+
+    path = entry
+    for _ in range(MAX_REDIRECTS + 1):
+        parsed = urlparse.urlsplit(path)
+        response = app.handle(Request("GET", parsed.path, parsed.query))
+        if response.status != 301:
+            return response.status == 200
+        path = response.headers["Location"]
+    return False
+
+
+def prewarm(app: AnyBadgeApp, path: Union[str, Path]) -> int:
+    """Render the badges listed in a prewarm file into the application's cache.
+
+    Returns:
+        int: Number of badges warmed.
+    """
+    start = time.perf_counter()
+    entries = read_prewarm_file(path)
+    warmed = sum(warm_entry(app, entry) for entry in entries)
+    logger.info(
+        "Prewarmed %s of %s badges from %s in %.2fs.",
+        warmed,
+        len(entries),
+        path,
+        time.perf_counter() - start,
+    )
+    return warmed
+
+
+class PrewarmThread(threading.Thread):
+    """Background thread that prewarms the cache, then marks the application ready.
+
+    Args:
+        app(AnyBadgeApp): The application to prewarm.
+        path(str): Location of the prewarm file.
+    """
+
+    def __init__(self, app: AnyBadgeApp, path: Union[str, Path]):
+        super().__init__(name="anybadge-prewarm", daemon=True)
+        self.app = app
+        self.path = path
+        app.ready.clear()
+
+    def run(self) -> None:
+        try:
+            prewarm(self.app, self.path)
+        except Exception:
+            logger.exception("Failed to prewarm the cache from %s.", self.path)
+        finally:
+            self.app.ready.set()
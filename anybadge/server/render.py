@@ -0,0 +1,204 @@
+"""Badge rendering for the anybadge server."""
+
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+
+from anybadge import Badge
+from anybadge.server import config
+from anybadge.server.thresholds import get_thresholds
+from anybadge.styles import Style
+
+#: Parsed thresholds.  The threshold values are text, which ``Badge`` converts to the
+#: type of the badge value once, so they are passed to it as they are.
+Thresholds = Dict[Any, str]
+
+
+class LimitExceeded(ValueError):
+    """A request exceeds one of the configured input limits.
+
+    Args:
+        message(str): Description of the problem.
+        limit(str): Name of the exceeded limit, used to count rejections.
+        status(int, optional): HTTP status of the response rejecting the request.
+    """
+
+    def __init__(self, message: str, limit: str, status: int = 400):
+        super().__init__(message)
+        self.limit = limit
+        self.status = status
+
+
+def named_error(name: str, error: ValueError) -> ValueError:
+    """Return a new error naming the badge that caused an error.
+
+    The original error is not changed, as it can be shared by requests waiting for the
+    same badge to render.  Exceeded limits keep their type, so they are still counted.
+
+    Examples:
+
+        >>> error = named_error('build', LimitExceeded('Label is too long.', 'label_length'))
+        >>> error, error.limit
+        (LimitExceeded("Badge 'build': Label is too long."), 'label_length')
+    """
+    message = f"Badge '{name}': {error}"
+    if isinstance(error, LimitExceeded):
+        return LimitExceeded(message, error.limit, error.status)
+    return ValueError(message)
+
+
+class BadgeParams(NamedTuple):
+    """The parameters needed to render a badge."""
+
+    label: str
+    value: str
+    color: Optional[str] = None
+    suffix: str = ""
+    thresholds: Optional[Thresholds] = None
+
+
+def get_style(name: str) -> Style:
+    """Return a style by name.
+
+    Raises:
+        ValueError: When the style does not exist.
+    """
+    if not Style.exists(name.upper()):
+        raise ValueError(f"Unknown style: {name}")
+    return Style[name.upper()]
+
+
+def resolve_thresholds(threshold_text: str) -> Optional[Thresholds]:
+    """Return the cached, parsed thresholds for threshold text.
+
+    Raises:
+        LimitExceeded: When there are too many thresholds.
+        ValueError: When the threshold text is not valid.
+    """
+    if not threshold_text:
+        return None
+    if threshold_text.count("=") > config.MAX_THRESHOLDS:
+        raise LimitExceeded(
+            f"Too many thresholds. The maximum is {config.MAX_THRESHOLDS}.",
+            "thresholds",
+        )
+    return get_thresholds(threshold_text)
+
+
+def check_limits(params: BadgeParams) -> None:
+    """Check that badge parameters are within the configured input limits.
+
+    This is cheap, and is done before a badge is constructed so that the cost of
+    rendering a badge is bounded.
+
+    Raises:
+        LimitExceeded: When a parameter exceeds its limit.
+
+    Examples:
+
+        >>> check_limits(BadgeParams('build', 'passing'))
+        >>> check_limits(BadgeParams('build', 'x' * 1000))
+        Traceback (most recent call last):
+        ...
+        anybadge.server.render.LimitExceeded: Value is longer than 256 characters.
+    """
+    if len(params.label) > config.MAX_LABEL_LENGTH:
+        raise LimitExceeded(
+            f"Label is longer than {config.MAX_LABEL_LENGTH} characters.",
+            "label_length",
+        )
+    if len(params.value) + len(params.suffix) > config.MAX_VALUE_LENGTH:
+        raise LimitExceeded(
+            f"Value is longer than {config.MAX_VALUE_LENGTH} characters.",
+            "value_length",
+        )
+    if params.thresholds and len(params.thresholds) > config.MAX_THRESHOLDS:
+        raise LimitExceeded(
+            f"Too many thresholds. The maximum is {config.MAX_THRESHOLDS}.",
+            "thresholds",
+        )
+
+
+def _spec_text(field: str, value: Any) -> str:
+    """Return a field of a badge specification as text.
+
+    Raises:
+        ValueError: When the field is not a string or a number.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(
+            f"Badge specification field '{field}' must be a string or a number."
+        )
+    return str(value)
+
+
+def params_from_spec(spec: Mapping[str, Any]) -> BadgeParams:
+    """Create badge parameters from a badge specification.
+
+    A specification is a mapping with a ``value`` and optional ``label``, ``color``,
+    ``style`` and ``thresholds`` keys.  Thresholds can be given as text such as
+    ``2=red 4=orange`` or as a mapping of threshold values to colors.
+
+    Raises:
+        ValueError: When the specification is not valid.
+
+    Examples:
+
+        >>> params_from_spec({'value': 65, 'style': 'coverage'})
+        BadgeParams(label='coverage', value='65', color=None, suffix='%', thresholds=OrderedDict([('50', 'red'), ('60', 'orange'), ('80', 'yellow'), ('100', 'green')]))
+    """
+    if not isinstance(spec, Mapping):
+        raise ValueError("Badge specification must be an object.")
+
+    unknown = set(spec) - {"label", "value", "color", "style", "thresholds"}
+    if unknown:
+        raise ValueError(
+            "Unknown badge specification fields: %s" % ", ".join(sorted(unknown))
+        )
+
+    if "value" not in spec:
+        raise ValueError("Badge specification must include a value.")
+
+    label = _spec_text("label", spec.get("label"))
+    value = _spec_text("value", spec["value"])
+    color = _spec_text("color", spec.get("color")) or None
+    style_name = _spec_text("style", spec.get("style"))
+    suffix = ""
+    threshold_text = ""
+
+    if style_name:
+        style = get_style(style_name)
+        threshold_text = style.threshold
+        if not label and style.label:
+            label = style.label
+        if style.suffix:
+            suffix = style.suffix
+
+    thresholds = spec.get("thresholds")
+    if isinstance(thresholds, Mapping):
+        threshold_text = " ".join(
+            f"{_spec_text('thresholds', k)}={_spec_text('thresholds', v)}"
+            for k, v in thresholds.items()
+        )
+    elif thresholds:
+        threshold_text = _spec_text("thresholds", thresholds)
+
+    return BadgeParams(label, value, color, suffix, resolve_thresholds(threshold_text))
+
+
+def render_svg(params: BadgeParams) -> bytes:
+    """Render a badge to SVG bytes.
+
+    Raises:
+        LimitExceeded: When a parameter exceeds its limit.
+        ValueError: When the badge can not be rendered from the parameters.
+    """
+    check_limits(params)
+    badge = Badge(
+        label=params.label,
+        value=params.value,
+        default_color=params.color or config.DEFAULT_BADGE_COLOR,
+        value_suffix=params.suffix,
+        thresholds=params.thresholds,
+    )
+    return badge.badge_svg_text.encode("utf-8")
@@ -1,75 +1,310 @@
+"""Stdlib HTTP server front end for the anybadge server."""
+
+import io
 import logging
+import os
+import queue
+import socket
+import threading
+import time
 import urllib.parse as urlparse
-from http.server import BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, List, Optional, Tuple
 
-from anybadge import Badge
+from anybadge.server import config
+from anybadge.server.logs import log_access
+from anybadge.server.app import (  # noqa: F401
+    AnyBadgeApp,
+    BadRequest,
+    Request,
+    Response,
+    json_response,
+    split_badge_spec,
+    svg_response,
+    text_response,
+)
+from anybadge.server.store import BadgeStore
 
 logger = logging.getLogger(__name__)
 
 
-class AnyBadgeHTTPRequestHandler(BaseHTTPRequestHandler):
-    """Request handler for anybadge HTTP server."""
+def busy_response() -> bytes:
+    """Return the raw response sent to clients when the server is busy."""
+    body = b"Server is busy.  Please retry later."
+    return (
+        b"HTTP/1.0 503 Service Unavailable\r\n"
+        b"Content-Type: text/plain; charset=utf-8\r\n"
+        b"Retry-After: %d\r\n"
+        b"Connection: close\r\n"
+        b"Content-Length: %d\r\n"
+        b"\r\n%s" % (config.RETRY_AFTER, len(body), body)
+    )
 
-    def do_HEAD(self):
-        logging.debug("Sending head.")
-        self.send_response(200)
-        self.send_header("Content-type", "text/html")
-        self.end_headers()
 
-    def do_GET(self):
-        logging.debug("Handling get request.")
-        self.do_HEAD()
+def header_timeout_response() -> bytes:
+    """Return the raw response sent to clients that are too slow to send headers."""
+    body = b"Timed out reading the request headers."
+    return (
+        b"HTTP/1.0 408 Request Timeout\r\n"
+        b"Content-Type: text/plain; charset=utf-8\r\n"
+        b"Connection: close\r\n"
+        b"Content-Length: %d\r\n"
+        b"\r\n%s" % (len(body), body)
+    )
 
-        # Ignore request for favicon
-        if self.path == "/favicon.ico":
-            logging.debug("Ignoring favicon request.")
-            return
 
-        # Parse the URL query string
-        parsed = urlparse.urlparse(self.path)
-        url_query = urlparse.parse_qs(parsed.query)
+class DeadlineReader(io.RawIOBase):
+    """Reads from a socket, giving up when a deadline passes.
+
+    A socket timeout only limits the wait for each piece of data, so a client that
+    sends a byte at a time could take as long as it liked.  Before each read, the
+    socket timeout is set to the time left until the deadline instead.
+
+    Attributes:
+        deadline(float): ``time.monotonic()`` time after which reads time out, or
+            None to use the socket timeout as it is.
+        bytes_read(int): Number of bytes read since the deadline was set.
+        timed_out(bool): Whether a read timed out since the deadline was set.
+    """
+
+    def __init__(self, connection: socket.socket):
+        super().__init__()
+        self._connection = connection
+        self.deadline: Optional[float] = None
+        self.bytes_read = 0
+        self.timed_out = False
+
+    def set_deadline(self, deadline: Optional[float]) -> None:
+        self.deadline = deadline
+        self.bytes_read = 0
+        self.timed_out = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        try:
+            if self.deadline is not None:
+                remaining = self.deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout("Deadline passed.")
+                self._connection.settimeout(remaining)
+            size = self._connection.recv_into(buffer)
+        except socket.timeout:
+            self.timed_out = True
+            raise
+        self.bytes_read += size
+        return size
+
+
+class AnyBadgeHTTPServer(HTTPServer):
+    """HTTP server that runs an anybadge application.
+
+    Requests are handled by a fixed pool of threads.  Accepted connections wait for
+    a thread in a bounded queue, and when the queue is full new connections are
+    answered straight away with 503 Service Unavailable and a ``Retry-After``
+    header, so that overload does not make every request slower.  On shutdown the
+    threads finish the requests in progress and those already queued.
+
+    Args:
+        server_address(tuple): Address and port to listen on.
+        handler_class: Request handler class.
+        store(BadgeStore, optional): Store of named badges updated by clients.  Ignored
+            when an application is given.
+        reuse_port(bool, optional): Bind with ``SO_REUSEPORT`` so that several
+            processes can listen on the same port.
+        app(AnyBadgeApp, optional): The application that handles requests.
+        threads(int, optional): Number of request handling threads.
+        queue_size(int, optional): Number of connections that can wait for a thread.
+        header_timeout(float, optional): Seconds allowed for receiving the request line
+            and headers of each request.
+        body_timeout(float, optional): Seconds to wait for data while reading a
+            request body.
+    """
 
-        label = ""
-        value = ""
-        color = "green"
+    def __init__(
+        self,
+        server_address,
+        handler_class,
+        store=None,
+        reuse_port=False,
+        app=None,
+        threads=None,
+        queue_size=None,
+        header_timeout=None,
+        body_timeout=None,
+    ):
+        self.reuse_port = reuse_port
+        self.request_queue_size = config.LISTEN_BACKLOG
+        super().__init__(server_address, handler_class)
+        if app is None:
+            host, port = self.server_address[:2]
+            app = AnyBadgeApp(store, host=f"{host}:{port}")
+        self.app: AnyBadgeApp = app
 
-        # Extract the label and value portions
-        if "label" in url_query:
-            label = url_query["label"][0]
+        self.threads = threads or config.DEFAULT_THREADS
+        self.header_timeout = header_timeout or config.DEFAULT_HEADER_TIMEOUT
+        self.body_timeout = body_timeout or config.DEFAULT_BODY_TIMEOUT
+        self._queue: "queue.Queue[Optional[Tuple[socket.socket, Any]]]" = queue.Queue(
+            queue_size or config.DEFAULT_QUEUE_SIZE
+        )
+        self._workers: List[threading.Thread] = []
 
-        if "value" in url_query:
-            value = url_query["value"][0]
+    def serve_forever(self, poll_interval=0.5):
+        # Threads are started here rather than in __init__, so that they are started
+        # in worker processes forked after the server is created.
+        if not self._workers:
+            for number in range(self.threads):
+                thread = threading.Thread(
+                    target=self._work, name=f"anybadge-request-{number}", daemon=True
+                )
+                thread.start()
+                self._workers.append(thread)
+        super().serve_forever(poll_interval)
 
-        logging.debug("Label: %s Value: %s", label, value)
+    def process_request(self, request, client_address):
+        try:
+            self._queue.put_nowait((request, client_address))
+        except queue.Full:
+            self.reject(request)
+            self.shutdown_request(request)
 
-        if label and value and color:
-            logging.debug("All parameters present.")
-            badge = Badge(label=label, value=value, default_color=color)
-            for line in badge.badge_svg_text:
-                self.wfile.write(str.encode(line))
+    def reject(self, request: socket.socket) -> None:
+        """Tell the client that the server is busy, without waiting for a thread."""
+        self.app.count("rejected_busy")
+        try:
+            # Read what the client has already sent, so that closing does not reset
+            # the connection before the client reads the response.
+            request.setblocking(False)
+            try:
+                request.recv(65536)
+            except BlockingIOError:
+                pass
+            request.sendall(busy_response())
+        except OSError:
+            pass
 
-        else:
-            logging.debug("Not all parameters present.")
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
 
-            self.wfile.write(b"<html><head><title>Anybadge Web Server.</title></head>")
-            self.wfile.write(b"<body>")
+    def server_close(self):
+        super().server_close()
+        for _ in self._workers:
+            self._queue.put(None)
+        for thread in self._workers:
+            thread.join()
+        self._workers = []
 
-            listen_host, listen_port = self.server.server_address
+    @property
+    def store(self) -> BadgeStore:
+        return self.app.store
 
-            help_text = f"""
-                        <h1>Welcome to the Anybadge Web Server.</h1>
+    def server_bind(self):
+        if self.reuse_port:
+            if not hasattr(socket, "SO_REUSEPORT"):
+                raise RuntimeError("SO_REUSEPORT is not supported on this platform.")
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
 
-                        You are seeing this message because you haven't passed all the query parameters
-                        to display a badge.
 
-                        You need to pass at least a <b>label</b> and <b>value</b> parameter.
+class AnyBadgeHTTPRequestHandler(BaseHTTPRequestHandler):
+    """Request handler that passes requests to the server's anybadge application."""
+
+    server: AnyBadgeHTTPServer
+
+    def setup(self):
+        self.timeout = self.server.header_timeout
+        super().setup()
+        self._reader = DeadlineReader(self.connection)
+        self.rfile = io.BufferedReader(self._reader)
+
+    def handle_one_request(self):
+        # The whole request line and headers must arrive within the header timeout,
+        # so slow clients can not hold a thread by sending them a little at a time.
+        self._reader.set_deadline(time.monotonic() + self.server.header_timeout)
+        super().handle_one_request()
+        if self._reader.timed_out and self._reader.deadline is not None:
+            self.close_connection = True
+            # Connections that are idle between requests are closed quietly.
+            if self._reader.bytes_read:
+                self.server.app.count("header_timeouts")
+                try:
+                    self.wfile.write(header_timeout_response())
+                except OSError:
+                    pass
+
+    def read_body(self, size: int) -> bytes:
+        """Read the request body, waiting for data for at most the body timeout."""
+        self._reader.set_deadline(None)
+        self.connection.settimeout(self.server.body_timeout)
+        try:
+            return self.rfile.read(size)
+        except socket.timeout:
+            self.server.app.count("body_timeouts")
+            self.close_connection = True
+            raise BadRequest("Timed out reading the request body.", 408)
+
+    def do_HEAD(self):
+        self.handle_request()
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_PUT(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def handle_request(self) -> None:
+        """Pass the request to the application and send the response."""
+        start = time.perf_counter()
+        parsed = urlparse.urlparse(self.path)
+        request = Request(
+            self.command,
+            parsed.path,
+            parsed.query,
+            {name.lower(): value for name, value in self.headers.items()},
+            self.read_body,
+        )
+        response = self.server.app.handle(request)
+
+        self.send_response(response.status)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(response.content_length))
+        self.end_headers()
+
+        if self.command != "HEAD":
+            if response.file is not None and hasattr(os, "sendfile"):
+                # Send the file from the kernel without copying it into Python.
+                self.wfile.flush()
+                self.connection.sendfile(response.file, 0, response.file.size)  # type: ignore
+            else:
+                self.wfile.write(response.read_body())
 
-                        Here is an example:
+        log_access(
+            self.client_address[0],
+            self.command,
+            self.path,
+            response.status,
+            response.content_length,
+            time.perf_counter() - start,
+        )
 
-                        <a href="http://{listen_host}:{listen_port}/?label=Project%20Awesomeness&value=110%">\
-                        http://{listen_host}:{listen_port}/?label=Project%20Awesomeness&value=110%</a>
-                        """
+    def log_request(self, code="-", size="-"):
+        # Requests are written to the access log by handle_request.
+        pass
 
-            for line in help_text.splitlines():
-                self.wfile.write(str.encode("<p>%s</p>" % line))
-            self.wfile.write(b"</body></html>")
+    def log_message(self, format, *args):
+        logger.warning("%s - %s", self.address_string(), format % args)
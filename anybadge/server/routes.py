@@ -0,0 +1,198 @@
+"""URL routing for the anybadge server.
+
+Badges can be requested using paths that do not need a query string, which allows
+CDNs and proxies to cache them:
+
+* ``/badge/<label>-<value>.svg``
+* ``/badge/<label>-<value>-<color>.svg``
+* ``/style/<style>/<value>.svg``
+* ``/style/<style>/<label>-<value>.svg``
+* ``/thresholds/<thresholds>/<label>-<value>.svg``
+* ``/thresholds/<thresholds>/<label>-<value>-<color>.svg``
+
+Named badges that are pushed to the server are served from ``/badges/<name>.svg``,
+and updated using ``PUT`` or ``POST`` requests to ``/badges/<name>``, or ``POST``
+requests to ``/badges`` to update many badges at once.
+
+Within the ``<label>-<value>-<color>`` part a dash separates the fields, so a literal
+dash is written as ``--``.  An underscore is a space, and a literal underscore is
+written as ``__``.  Thresholds are written as comma separated ``<value>=<color>``
+pairs.
+"""
+
+import re
+import urllib.parse as urlparse
+from typing import Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+_PLACEHOLDER = "\x00"
+
+
+class Route(NamedTuple):
+    """A named route.
+
+    Attributes:
+        name(str): Name of the route.
+        prefix(str): The first segment of the paths matched by the route.
+        pattern(str): Regular expression matching the full path.
+    """
+
+    name: str
+    prefix: str
+    pattern: str
+
+
+class Router:
+    """Dispatch request paths to named routes.
+
+    The route patterns are compiled and grouped by their first path segment when the
+    router is created, so matching a path only tries the patterns that can match it.
+
+    Examples:
+
+        >>> router = Router(ROUTES)
+        >>> router.match('/style/coverage/65.svg')
+        ('style_badge', {'style': 'coverage', 'spec': '65'})
+
+        >>> router.match('/unknown') is None
+        True
+    """
+
+    def __init__(self, routes: List[Route]):
+        self._table: Dict[str, List[Tuple[str, Pattern]]] = {}
+        for route in routes:
+            self._table.setdefault(route.prefix, []).append(
+                (route.name, re.compile(route.pattern))
+            )
+
+    def match(self, path: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """Return the route name and path parameters for a path, or None."""
+        prefix = path[1:].split("/", 1)[0]
+        for name, pattern in self._table.get(prefix, []):
+            match = pattern.match(path)
+            if match:
+                return name, match.groupdict()
+        return None
+
+
+#: Routes served by the anybadge server.
+ROUTES: List[Route] = [
+    Route("index", "", r"^/$"),
+    Route("favicon", "favicon.ico", r"^/favicon\.ico$"),
+    Route("badge", "badge", r"^/badge/(?P<spec>[^/]+)\.svg$"),
+    Route("style_badge", "style", r"^/style/(?P<style>[^/]+)/(?P<spec>[^/]+)\.svg$"),
+    Route(
+        "thresholds_badge",
+        "thresholds",
+        r"^/thresholds/(?P<thresholds>[^/]+)/(?P<spec>[^/]+)\.svg$",
+    ),
+    Route("store", "badges", r"^/badges/?$"),
+    Route("stored_badge", "badges", r"^/badges/(?P<name>[^/]+)\.svg$"),
+    Route("stored_badge_spec", "badges", r"^/badges/(?P<name>[^/]+)$"),
+    Route("stats", "stats", r"^/stats/?$"),
+    Route("ready", "ready", r"^/ready/?$"),
+    Route("batch", "batch", r"^/batch$"),
+    Route("batch", "batch.json", r"^/batch(?P<format>\.json)$"),
+    Route("batch", "batch.svg", r"^/batch(?P<format>\.svg)$"),
+]
+
+
+def split_spec(spec: str) -> List[str]:
+    """Split a badge path spec into its decoded fields.
+
+    Examples:
+
+        >>> split_spec('build_status-passing-green')
+        ['build status', 'passing', 'green']
+
+        >>> split_spec('coverage-97.5%25')
+        ['coverage', '97.5%']
+
+        >>> split_spec('my--project-snake__case')
+        ['my-project', 'snake_case']
+
+        >>> split_spec('temp-%2D5')
+        ['temp', '-5']
+    """
+    fields = spec.replace("--", _PLACEHOLDER).split("-")
+    return [
+        urlparse.unquote(
+            field.replace(_PLACEHOLDER, "-")
+            .replace("__", _PLACEHOLDER)
+            .replace("_", " ")
+            .replace(_PLACEHOLDER, "_")
+        )
+        for field in fields
+    ]
+
+
+def encode_field(text: str) -> str:
+    """Encode text so it can be used as a field of a badge path spec.
+
+    Examples:
+
+        >>> encode_field('build status')
+        'build_status'
+
+        >>> encode_field('my-project_name 110%')
+        'my--project__name_110%25'
+
+        >>> encode_field('-5')
+        '%2D5'
+    """
+    # A doubled dash next to the separator between fields can not be told apart
+    # from the separator, so leading and trailing dashes are percent-encoded.
+    stripped = text.strip("-")
+    if not stripped:
+        return "%2D" * len(text)
+    leading = len(text) - len(text.lstrip("-"))
+    trailing = len(text) - len(text.rstrip("-"))
+    stripped = stripped.replace("-", "--").replace("_", "__").replace(" ", "_")
+    return "%2D" * leading + urlparse.quote(stripped, safe="") + "%2D" * trailing
+
+
+def encode_thresholds(thresholds: Dict[str, str]) -> str:
+    """Encode parsed thresholds for use in a badge path.
+
+    Examples:
+
+        >>> encode_thresholds({'2': 'red', '4': 'orange'})
+        '2=red,4=orange'
+    """
+    return ",".join(
+        "%s=%s" % (urlparse.quote(threshold, safe=""), urlparse.quote(color, safe=""))
+        for threshold, color in thresholds.items()
+    )
+
+
+def badge_path(
+    label: str,
+    value: str,
+    color: Optional[str] = None,
+    style: Optional[str] = None,
+    thresholds: Optional[Dict[str, str]] = None,
+) -> str:
+    """Return the canonical path for a badge.
+
+    Examples:
+
+        >>> badge_path('build', 'passing', color='green')
+        '/badge/build-passing-green.svg'
+
+        >>> badge_path('', '65', style='coverage')
+        '/style/coverage/65.svg'
+
+        >>> badge_path('pylint', '2.22', thresholds={'2': 'red', '4': 'orange'})
+        '/thresholds/2=red,4=orange/pylint-2.22.svg'
+    """
+    fields = [encode_field(value)]
+    if label or not style:
+        fields.insert(0, encode_field(label))
+    if color and not style:
+        fields.append(encode_field(color))
+    spec = "-".join(fields)
+
+    if style:
+        return f"/style/{urlparse.quote(style, safe='')}/{spec}.svg"
+    if thresholds:
+        return f"/thresholds/{encode_thresholds(thresholds)}/{spec}.svg"
+    return f"/badge/{spec}.svg"
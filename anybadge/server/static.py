@@ -0,0 +1,165 @@
+"""Serving pre-rendered badge files from a directory."""
+
+import io
+import logging
+import os
+import threading
+import time
+import urllib.parse as urlparse
+from collections import OrderedDict
+from email.utils import formatdate
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple, Union
+
+from anybadge.server import config
+
+logger = logging.getLogger(__name__)
+
+STATIC_SUFFIXES = (".svg", ".svgz")
+
+
+class StaticFile(NamedTuple):
+    """An open badge file.
+
+    The file is kept open while it is cached, and is closed when the last reference
+    to it is dropped, so a file that is being sent is never closed from under the
+    sender.
+    """
+
+    file: io.FileIO
+    size: int
+    mtime: float
+    content_encoding: Optional[str]
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def read(self) -> bytes:
+        """Read the whole file without changing the shared file position."""
+        if hasattr(os, "pread"):
+            return os.pread(self.fileno(), self.size, 0)
+        with open(self.file.name, mode="rb") as file_handle:
+            return file_handle.read()
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.mtime, usegmt=True)
+
+
+class StaticFiles:
+    """Cache of open files and stat results for a directory of badge files.
+
+    Request paths map to files relative to the directory, so a request for
+    ``/badge/build-passing.svg`` is served from ``<directory>/badge/build-passing.svg``.
+    Only ``.svg`` and ``.svgz`` files are served.  A ``.svgz`` file is served in place
+    of the ``.svg`` file when the client accepts gzip encoding.
+
+    Results are cached for ``stat_ttl`` seconds, after which the file is checked
+    again and reopened if it has changed.  Files that do not exist are cached too,
+    so that requests for badges that are rendered dynamically do not stat the disk
+    on every request.
+
+    Args:
+        directory(str): Directory of badge files.
+        stat_ttl(float, optional): Seconds to cache stat results for.
+        max_open(int, optional): Maximum number of cached paths.
+
+    Examples:
+
+        >>> import tempfile
+        >>> directory = tempfile.mkdtemp()
+        >>> _ = Path(directory, 'build.svg').write_text('<svg/>')
+        >>> static = StaticFiles(directory)
+        >>> static.lookup('/build.svg').read()
+        b'<svg/>'
+        >>> static.lookup('/missing.svg') is None
+        True
+        >>> static.lookup('/../build.svg') is None
+        True
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        stat_ttl: Optional[float] = None,
+        max_open: Optional[int] = None,
+    ):
+        self.directory = os.path.realpath(directory)
+        if not os.path.isdir(self.directory):
+            raise ValueError(f"Static directory does not exist: {directory}")
+
+        self.stat_ttl = config.STATIC_STAT_TTL if stat_ttl is None else stat_ttl
+        self.max_open = config.STATIC_MAX_OPEN_FILES if max_open is None else max_open
+        self._lock = threading.Lock()
+        # Relative path -> (time checked, stat key, open file or None if missing)
+        self._cache: (
+            "OrderedDict[str, Tuple[float, Optional[tuple], Optional[StaticFile]]]"
+        ) = OrderedDict()
+
+    def lookup(self, path: str, accept_gzip: bool = False) -> Optional[StaticFile]:
+        """Return the file for a request path, or None if there is no file."""
+        relative = self.relative_path(path)
+        if relative is None:
+            return None
+
+        if accept_gzip and relative.endswith(".svg"):
+            static_file = self._get(relative + "z")
+            if static_file is not None:
+                return static_file
+
+        return self._get(relative)
+
+    @staticmethod
+    def relative_path(path: str) -> Optional[str]:
+        """Return the file path relative to the directory, or None if not allowed."""
+        relative = urlparse.unquote(path).lstrip("/")
+        if not relative.endswith(STATIC_SUFFIXES) or "\\" in relative:
+            return None
+        if any(part in ("", ".", "..") for part in relative.split("/")):
+            return None
+        return relative
+
+    def _get(self, relative: str) -> Optional[StaticFile]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(relative)
+            if cached is not None:
+                self._cache.move_to_end(relative)
+                if now - cached[0] < self.stat_ttl:
+                    return cached[2]
+
+        full_path = os.path.join(self.directory, relative)
+        try:
+            stat = os.stat(full_path)
+            stat_key: Optional[tuple] = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            stat_key = None
+
+        if cached is not None and cached[1] == stat_key:
+            static_file = cached[2]
+        else:
+            static_file = self._open(full_path) if stat_key else None
+
+        with self._lock:
+            self._cache[relative] = (now, stat_key, static_file)
+            self._cache.move_to_end(relative)
+            while len(self._cache) > self.max_open:
+                self._cache.popitem(last=False)
+
+        return static_file
+
+    def _open(self, full_path: str) -> Optional[StaticFile]:
+        # Do not follow symbolic links out of the directory.
+        if not os.path.realpath(full_path).startswith(self.directory + os.sep):
+            logger.warning("Not serving file outside static directory: %s", full_path)
+            return None
+
+        try:
+            file = io.FileIO(full_path, mode="r")
+        except OSError as e:
+            logger.warning("Unable to open static file %s: %s", full_path, e)
+            return None
+
+        stat = os.fstat(file.fileno())
+        content_encoding = "gzip" if full_path.endswith(".svgz") else None
+        return StaticFile(file, stat.st_size, stat.st_mtime, content_encoding)
@@ -0,0 +1,333 @@
+"""Stores of named badges that are updated by clients."""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from anybadge.server import config
+from anybadge.server.cache import thread_connection
+from anybadge.server.render import (
+    LimitExceeded,
+    named_error,
+    params_from_spec,
+    render_svg,
+)
+
+logger = logging.getLogger(__name__)
+
+BADGE_NAME_REGEX = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def validate_name(name: str) -> None:
+    """Check that a badge name is valid.
+
+    Raises:
+        ValueError: When the name is not valid.
+    """
+    if not BADGE_NAME_REGEX.match(name) or name.endswith(".svg"):
+        raise ValueError(
+            f"Invalid badge name '{name}'. Names may contain letters, numbers, '_', '.' "
+            "and '-', and must not end with '.svg'."
+        )
+
+
+class BadgeStore:
+    """Thread safe store of named badges.
+
+    Badges are rendered when they are set, and the rendered SVG is kept so that it
+    can be served without rendering again.  The badge specifications can be saved to
+    a snapshot file, and loaded again when the server restarts.
+
+    Args:
+        snapshot_file(str, optional): Location of the snapshot file.
+        max_badges(int, optional): Maximum number of badges in the store.
+
+    Examples:
+
+        >>> store = BadgeStore()
+        >>> store.set('coverage', {'value': 65, 'style': 'coverage'})
+        >>> store.get('coverage')  # doctest: +ELLIPSIS
+        b'<?xml version="1.0" encoding="UTF-8"?>...
+        >>> store.get('missing') is None
+        True
+    """
+
+    def __init__(
+        self,
+        snapshot_file: Optional[Union[str, Path]] = None,
+        max_badges: Optional[int] = None,
+    ):
+        self.snapshot_file = Path(snapshot_file) if snapshot_file else None
+        self.max_badges = max_badges or config.MAX_STORED_BADGES
+        self._lock = threading.Lock()
+        self._specs: Dict[str, Dict[str, Any]] = {}
+        self._svgs: Dict[str, bytes] = {}
+        self._version = 0
+        self._snapshot_version = 0
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    @staticmethod
+    def _render(name: str, spec: Mapping[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        validate_name(name)
+        try:
+            svg = render_svg(params_from_spec(spec))
+        except ValueError as e:
+            raise named_error(name, e) from e
+        return dict(spec), svg
+
+    def _check_size(self, size: int) -> None:
+        if size > self.max_badges:
+            raise LimitExceeded(
+                f"Too many stored badges. The maximum is {self.max_badges}.",
+                "stored_badges",
+                413,
+            )
+
+    def set(self, name: str, spec: Mapping[str, Any]) -> None:
+        """Render and store a badge.
+
+        Raises:
+            ValueError: When the name or specification is not valid.
+        """
+        self.update({name: spec})
+
+    def update(self, specs: Mapping[str, Mapping[str, Any]]) -> None:
+        """Render and store many badges.
+
+        All badges are rendered before any are stored, so either all badges are
+        updated, or none are.
+
+        Raises:
+            ValueError: When a name or specification is not valid.
+            LimitExceeded: When the store would hold too many badges.
+        """
+        rendered = {name: self._render(name, spec) for name, spec in specs.items()}
+        with self._lock:
+            self._check_size(len(self._specs.keys() | rendered.keys()))
+            for name, (spec, svg) in rendered.items():
+                self._specs[name] = spec
+                self._svgs[name] = svg
+            self._version += 1
+
+    def get(self, name: str) -> Optional[bytes]:
+        """Return the rendered SVG for a badge, or None if it is not in the store."""
+        return self._svgs.get(name)
+
+    def specs(self) -> Dict[str, Dict[str, Any]]:
+        """Return a copy of the specifications of all stored badges."""
+        with self._lock:
+            return dict(self._specs)
+
+    def names(self) -> List[str]:
+        """Return the names of all stored badges."""
+        with self._lock:
+            return sorted(self._specs)
+
+    def _current_version(self) -> int:
+        """Return the number of updates so far."""
+        return self._version
+
+    def _versioned_specs(self) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+        """Return the number of updates so far, and the specifications after them."""
+        with self._lock:
+            return self._version, dict(self._specs)
+
+    def snapshot(self) -> bool:
+        """Write the badge specifications to the snapshot file if they have changed.
+
+        The snapshot is written to a temporary file which then replaces the snapshot
+        file, so a partially written snapshot is never loaded.
+
+        Returns:
+            bool: True if a snapshot was written.
+        """
+        if not self.snapshot_file:
+            return False
+
+        if self._current_version() == self._snapshot_version:
+            return False
+        version, specs = self._versioned_specs()
+        data = json.dumps(specs, indent=2, sort_keys=True)
+
+        temp_file = self.snapshot_file.with_name(self.snapshot_file.name + ".tmp")
+        with open(temp_file, mode="w") as file_handle:
+            file_handle.write(data)
+        os.replace(temp_file, self.snapshot_file)
+
+        self._snapshot_version = version
+
+        logger.debug(
+            "Wrote snapshot of %s badges to %s.", len(self), self.snapshot_file
+        )
+        return True
+
+    def load(self) -> None:
+        """Load badges from the snapshot file, if it exists."""
+        if not self.snapshot_file or not self.snapshot_file.exists():
+            return
+
+        with open(self.snapshot_file, mode="r") as file_handle:
+            specs = json.load(file_handle)
+
+        self.update(specs)
+        self._snapshot_version = self._current_version()
+        logger.info("Loaded %s badges from %s.", len(specs), self.snapshot_file)
+
+
+class SQLiteBadgeStore(BadgeStore):
+    """Store of named badges in an SQLite database, shared by every worker process.
+
+    A badge pushed to one worker is served by all of them.  Like the in-memory store,
+    the badge specifications can be saved to a snapshot file, and loaded again when
+    the server restarts.
+
+    Args:
+        path(str): Location of the database file.
+        snapshot_file(str, optional): Location of the snapshot file.
+        max_badges(int, optional): Maximum number of badges in the store.
+
+    Examples:
+
+        >>> import tempfile
+        >>> store = SQLiteBadgeStore(Path(tempfile.mkdtemp()) / 'store.db')
+        >>> store.set('build', {'label': 'build', 'value': 'passing'})
+        >>> store.names(), b'>passing<' in store.get('build')
+        (['build'], True)
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        snapshot_file: Optional[Union[str, Path]] = None,
+        max_badges: Optional[int] = None,
+    ):
+        super().__init__(snapshot_file, max_badges)
+        self.path = str(path)
+        self._local = threading.local()
+
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS badges "
+            "(name TEXT PRIMARY KEY, spec TEXT NOT NULL, svg BLOB NOT NULL)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS version (id INTEGER PRIMARY KEY, value INTEGER)"
+        )
+        connection.execute("INSERT OR IGNORE INTO version (id, value) VALUES (0, 0)")
+
+    def _connection(self) -> sqlite3.Connection:
+        return thread_connection(self._local, self.path)
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM badges").fetchone()[0]
+
+    def update(self, specs: Mapping[str, Mapping[str, Any]]) -> None:
+        """Render and store many badges.
+
+        All badges are rendered before any are stored, and are stored in one
+        transaction, so either all badges are updated, or none are.
+
+        Raises:
+            ValueError: When a name or specification is not valid.
+            LimitExceeded: When the store would hold too many badges.
+        """
+        rendered = {name: self._render(name, spec) for name, spec in specs.items()}
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            (size,) = connection.execute("SELECT COUNT(*) FROM badges").fetchone()
+            for name in rendered:
+                row = connection.execute(
+                    "SELECT 1 FROM badges WHERE name = ?", (name,)
+                ).fetchone()
+                size += row is None
+            self._check_size(size)
+            connection.executemany(
+                "INSERT OR REPLACE INTO badges (name, spec, svg) VALUES (?, ?, ?)",
+                [
+                    (name, json.dumps(spec), svg)
+                    for name, (spec, svg) in rendered.items()
+                ],
+            )
+            connection.execute("UPDATE version SET value = value + 1 WHERE id = 0")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def get(self, name: str) -> Optional[bytes]:
+        """Return the rendered SVG for a badge, or None if it is not in the store."""
+        row = (
+            self._connection()
+            .execute("SELECT svg FROM badges WHERE name = ?", (name,))
+            .fetchone()
+        )
+        return None if row is None else row[0]
+
+    def specs(self) -> Dict[str, Dict[str, Any]]:
+        """Return the specifications of all stored badges."""
+        return self._versioned_specs()[1]
+
+    def names(self) -> List[str]:
+        """Return the names of all stored badges."""
+        rows = self._connection().execute("SELECT name FROM badges ORDER BY name")
+        return [name for (name,) in rows]
+
+    def _current_version(self) -> int:
+        return (
+            self._connection()
+            .execute("SELECT value FROM version WHERE id = 0")
+            .fetchone()[0]
+        )
+
+    def _versioned_specs(self) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+        connection = self._connection()
+        # Read the version and the badges from the same snapshot of the database.
+        connection.execute("BEGIN")
+        try:
+            version = connection.execute(
+                "SELECT value FROM version WHERE id = 0"
+            ).fetchone()[0]
+            specs = {
+                name: json.loads(spec)
+                for name, spec in connection.execute(
+                    "SELECT name, spec FROM badges ORDER BY name"
+                )
+            }
+        finally:
+            connection.execute("COMMIT")
+        return version, specs
+
+
+class SnapshotThread(threading.Thread):
+    """Background thread that periodically snapshots a badge store.
+
+    Args:
+        store(BadgeStore): The store to snapshot.
+        interval(float): Number of seconds between snapshots.
+    """
+
+    def __init__(self, store: BadgeStore, interval: float):
+        super().__init__(name="anybadge-snapshot", daemon=True)
+        self.store = store
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.store.snapshot()
+            except OSError as e:
+                logger.error("Failed to write badge store snapshot: %s", e)
+
+    def stop(self) -> None:
+        """Stop the thread and write a final snapshot."""
+        self._stopped.set()
+        self.store.snapshot()
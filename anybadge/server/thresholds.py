@@ -0,0 +1,70 @@
+"""Parsing and caching of thresholds passed to the server."""
+
+import functools
+import re
+from collections import OrderedDict
+
+from anybadge.server import config
+
+THRESHOLD_SEPARATOR_REGEX = re.compile(r"[\s,]+")
+
+
+def parse_thresholds(text: str) -> "OrderedDict[str, str]":
+    """Parse threshold text into a dictionary of thresholds.
+
+    Thresholds are given as ``<value>=<color>`` pairs separated by spaces or commas.
+    Numeric thresholds are sorted so that they are ready for evaluation, other
+    thresholds (strings or semantic versions) keep their original order.
+
+    Args:
+        text(str): Threshold text, for example ``2=red 4=orange 8=yellow 10=green``.
+
+    Returns:
+        OrderedDict: Threshold values mapped to colors.
+
+    Raises:
+        ValueError: When the threshold text is not valid.
+
+    Examples:
+
+        >>> parse_thresholds('4=orange,2=red 8=yellow')
+        OrderedDict([('2', 'red'), ('4', 'orange'), ('8', 'yellow')])
+
+        >>> parse_thresholds('passing=green failing=red')
+        OrderedDict([('passing', 'green'), ('failing', 'red')])
+
+    """
+    pairs = [pair for pair in THRESHOLD_SEPARATOR_REGEX.split(text) if pair]
+    if not pairs:
+        raise ValueError("No thresholds provided.")
+
+    thresholds: "OrderedDict[str, str]" = OrderedDict()
+    for pair in pairs:
+        threshold, separator, color = pair.partition("=")
+        if not separator or not threshold or not color:
+            raise ValueError(
+                f"Invalid threshold '{pair}'. Thresholds should be in the form '<value>=<color>'."
+            )
+        thresholds[threshold] = color
+
+    try:
+        ordered_keys = sorted(thresholds, key=float)
+    except ValueError:
+        return thresholds
+
+    return OrderedDict((key, thresholds[key]) for key in ordered_keys)
+
+
+@functools.lru_cache(maxsize=config.THRESHOLD_CACHE_SIZE)
+def get_thresholds(text: str) -> "OrderedDict[str, str]":
+    """Return the parsed thresholds for threshold text, using a cache of recent values.
+
+    Each distinct threshold string is only parsed once while it remains in the cache.
+    The returned dictionary is shared between callers, so it must not be modified.
+
+    Examples:
+
+        >>> get_thresholds('2=red 4=orange') is get_thresholds('2=red 4=orange')
+        True
+    """
+    return parse_thresholds(text)
@@ -0,0 +1,193 @@
+"""Serving requests, optionally from multiple pre-forked worker processes."""
+
+import logging
+import os
+import signal
+import threading
+import time
+from socketserver import BaseServer
+from typing import Callable, Dict, Optional
+
+from anybadge.server import config, logs
+
+logger = logging.getLogger(__name__)
+
+
+def serve(server: BaseServer, on_shutdown: Optional[Callable[[], None]] = None) -> None:
+    """Serve requests until the process receives SIGTERM or SIGINT.
+
+    Requests are served from a background thread.  When a signal is received the
+    server stops accepting requests, finishes the request in progress and closes.
+
+    Args:
+        server: The server to run.
+        on_shutdown: Function called after the server has stopped.
+    """
+    stopping = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info("Received %s. Shutting down...", signal.Signals(signum).name)
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    thread = threading.Thread(
+        target=server.serve_forever, name="anybadge-server", daemon=True
+    )
+    thread.start()
+
+    # Wait with a timeout so that signal handlers get a chance to run.
+    while not stopping.wait(0.5):
+        if not thread.is_alive():
+            break
+
+    server.shutdown()
+    thread.join()
+    server.server_close()
+    if on_shutdown:
+        on_shutdown()
+
+
+class Supervisor:
+    """Run a server in a number of pre-forked worker processes.
+
+    By default the listening socket is created before forking and inherited by the
+    workers, which all accept connections from it.  With ``share_socket=False`` each
+    worker creates its own server instead, which is intended for servers that bind
+    with ``SO_REUSEPORT`` so the kernel balances connections between the workers.
+
+    Workers that exit are restarted.  On SIGTERM or SIGINT the workers are asked to
+    shut down gracefully, and are killed if they do not exit within the shutdown
+    timeout.
+
+    Args:
+        server_factory: Function that returns a new, bound server.
+        num_workers(int): Number of worker processes.
+        share_socket(bool): Create the server once and share its socket with workers.
+        shutdown_timeout(float): Seconds to wait for workers to exit on shutdown.
+        worker_init: Function called in each worker process before it serves
+            requests.
+    """
+
+    def __init__(
+        self,
+        server_factory: Callable[[], BaseServer],
+        num_workers: int,
+        share_socket: bool = True,
+        shutdown_timeout: Optional[float] = None,
+        worker_init: Optional[Callable[[], None]] = None,
+    ):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("Worker processes are not supported on this platform.")
+        if num_workers < 1:
+            raise ValueError("The number of workers must be at least 1.")
+
+        self.server_factory = server_factory
+        self.num_workers = num_workers
+        self.share_socket = share_socket
+        self.shutdown_timeout = (
+            config.WORKER_SHUTDOWN_TIMEOUT
+            if shutdown_timeout is None
+            else shutdown_timeout
+        )
+        self.worker_init = worker_init
+        self.workers: Dict[int, float] = {}
+        self._server: Optional[BaseServer] = None
+        self._stopping = threading.Event()
+
+    def run(self) -> None:
+        """Start the workers and supervise them until shutdown."""
+        if self.share_socket:
+            self._server = self.server_factory()
+
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        for _ in range(self.num_workers):
+            self._spawn()
+
+        while not self._stopping.is_set():
+            self._reap(restart=True)
+            self._stopping.wait(0.2)
+
+        self._shutdown()
+
+    def _request_stop(self, signum, frame) -> None:
+        logger.info("Received %s. Stopping workers...", signal.Signals(signum).name)
+        self._stopping.set()
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            logger.info("Started worker %s.", pid)
+            return
+
+        # Worker process
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            server = self._server or self.server_factory()
+            if self.worker_init:
+                self.worker_init()
+            serve(server)
+        except BaseException:
+            logger.exception("Worker %s failed.", os.getpid())
+            exit_code = 1
+        finally:
+            # os._exit skips exit handlers, so write queued log records first.
+            logs.stop_logging()
+            os._exit(exit_code)
+
+    def _reap(self, restart: bool) -> None:
+        """Collect exited workers, restarting them if requested."""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if pid == 0:
+                return
+
+            started = self.workers.pop(pid, None)
+            if started is None:
+                continue
+
+            if not restart:
+                logger.info("Worker %s stopped.", pid)
+                continue
+
+            logger.warning("Worker %s exited with status %s.", pid, status)
+            if not self._stopping.is_set():
+                # Avoid restarting in a tight loop when workers fail on start up.
+                if time.monotonic() - started < config.WORKER_RESTART_DELAY:
+                    self._stopping.wait(config.WORKER_RESTART_DELAY)
+                if not self._stopping.is_set():
+                    self._spawn()
+
+    def _shutdown(self) -> None:
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self.workers and time.monotonic() < deadline:
+            self._reap(restart=False)
+            time.sleep(0.05)
+
+        for pid in list(self.workers):
+            logger.warning("Worker %s did not stop in time. Killing it.", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.workers.clear()
+
+        if self._server:
+            self._server.server_close()
@@ -0,0 +1,91 @@
+"""WSGI front end for the anybadge server.
+
+Run the server under a WSGI server such as gunicorn::
+
+    gunicorn anybadge.server.wsgi:application
+"""
+
+import urllib.parse as urlparse
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from anybadge.server.app import AnyBadgeApp, Request
+
+
+def request_path(environ: Dict[str, Any]) -> str:
+    """Return the quoted request path, as routes match it.
+
+    PATH_INFO holds the decoded path bytes as latin-1, so characters that were
+    percent-encoded in the request, such as ``%2D``, can not be told apart from
+    plain ones.  The undecoded path is used instead when the server provides it.
+
+    Examples:
+
+        >>> request_path({'PATH_INFO': '/badge/a--5.svg', 'RAW_URI': '/badge/a-%2D5.svg'})
+        '/badge/a-%2D5.svg'
+        >>> request_path({'PATH_INFO': '/badge/a b.svg'})
+        '/badge/a%20b.svg'
+    """
+    path_info = environ.get("PATH_INFO", "/").encode("latin-1")
+    raw_uri = environ.get("RAW_URI") or environ.get("REQUEST_URI") or ""
+    raw_path = raw_uri.split("?", 1)[0]
+    if (
+        raw_path
+        and not environ.get("SCRIPT_NAME")
+        and urlparse.unquote_to_bytes(raw_path) == path_info
+    ):
+        return raw_path
+    return urlparse.quote(path_info)
+
+
+class WSGIApplication:
+    """WSGI application that passes requests to an anybadge application.
+
+    Args:
+        app(AnyBadgeApp, optional): The application that handles requests.
+
+    Examples:
+
+        >>> from wsgiref.util import setup_testing_defaults
+        >>> environ = {'PATH_INFO': '/badge/build-passing.svg'}
+        >>> setup_testing_defaults(environ)
+        >>> body = WSGIApplication()(environ, lambda status, headers: None)
+        >>> body[0][:5]
+        b'<?xml'
+    """
+
+    def __init__(self, app: Optional[AnyBadgeApp] = None):
+        self.app = app if app is not None else AnyBadgeApp()
+
+    def __call__(
+        self, environ: Dict[str, Any], start_response: Callable
+    ) -> Iterable[bytes]:
+        headers = {
+            name[5:].replace("_", "-").lower(): value
+            for name, value in environ.items()
+            if name.startswith("HTTP_")
+        }
+        for name in ("CONTENT_LENGTH", "CONTENT_TYPE"):
+            if environ.get(name):
+                headers[name.replace("_", "-").lower()] = environ[name]
+
+        request = Request(
+            environ["REQUEST_METHOD"],
+            request_path(environ),
+            environ.get("QUERY_STRING", ""),
+            headers,
+            environ["wsgi.input"].read,
+        )
+        response = self.app.handle(request)
+
+        status = f"{response.status} {HTTPStatus(response.status).phrase}"
+        response_headers = list(response.headers.items())
+        response_headers.append(("Content-Length", str(response.content_length)))
+        start_response(status, response_headers)
+
+        if request.method == "HEAD":
+            return [b""]
+        return [response.read_body()]
+
+
+application = WSGIApplication()
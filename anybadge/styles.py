@@ -6,14 +6,28 @@ from enum import Enum
 class Style(Enum):
     """A style that can be used for common badge types."""
 
-    PYLINT = ("default.svg", "2=red 4=orange 8=yellow 10=green", "pylint")
-    COVERAGE = ("default.svg", "50=red 60=orange 80=yellow 100=green", "coverage", "%")
+    PYLINT = (
+        "default.svg",
+        "2=red 4=orange 8=yellow 10=green",
+        "pylint",
+        None,
+        "2=red 5=orange 8=yellow 10=green",
+    )
+    COVERAGE = (
+        "default.svg",
+        "50=red 60=orange 80=yellow 100=green",
+        "coverage",
+        "%",
+        "50=red 70=orange 85=yellow 100=green",
+    )
 
-    def __init__(self, template, threshold, label, suffix=None):
+    def __init__(self, template, threshold, label, suffix=None, gradient=None):
         self.template = template
         self.threshold = threshold
         self.label = label
         self.suffix = suffix
+        # Color stops used instead of the thresholds when a gradient is requested.
+        self.gradient = gradient
 
     @classmethod
     def exists(cls, name: str) -> bool:
@@ -1,10 +1,39 @@
 """Templates package."""
 
+import functools
 import pkgutil
+import re
+from typing import FrozenSet, List, Mapping
 
-from anybadge.exceptions import UnknownBadgeTemplate
+from anybadge.exceptions import UnknownBadgeTemplate, UnknownTemplatePlaceholder
 
+PLACEHOLDER_REGEX = re.compile(r"\{\{ ([^{}]+?) \}\}")
 
+#: Placeholders that can be used in badge templates.
+PLACEHOLDERS: FrozenSet[str] = frozenset(
+    [
+        "badge width",
+        "font name",
+        "font size",
+        "label",
+        "value",
+        "label anchor",
+        "label anchor shadow",
+        "value anchor",
+        "value anchor shadow",
+        "color",
+        "label text color",
+        "value text color",
+        "color split x",
+        "value width",
+        "mask id",
+        "value box width",
+        "arc start",
+    ]
+)
+
+
+@functools.lru_cache(maxsize=None)
 def get_template(name: str) -> str:
     """Get a template by name.
 
@@ -23,3 +52,58 @@ def get_template(name: str) -> str:
         raise UnknownBadgeTemplate
 
     return data.decode("utf-8")
+
+
+class CompiledTemplate:
+    """A badge template split into literal text and placeholders.
+
+    Templates are analyzed once, so that a badge only computes the values of the
+    placeholders its template uses, and renders without searching the template text.
+
+    Args:
+        text(str): The SVG template text.
+
+    Raises:
+        UnknownTemplatePlaceholder: When the template uses an unknown placeholder.
+
+    Examples:
+
+        >>> template = CompiledTemplate('<text x="{{ label anchor }}">{{ label }}</text>')
+        >>> sorted(template.placeholders)
+        ['label', 'label anchor']
+        >>> template.render({'label anchor': '10', 'label': 'build'})
+        '<text x="10">build</text>'
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        #: Literal text, alternating with placeholder names at odd positions.
+        self.parts: List[str] = PLACEHOLDER_REGEX.split(text)
+        self.placeholders: FrozenSet[str] = frozenset(self.parts[1::2])
+
+        unknown = self.placeholders - PLACEHOLDERS
+        if unknown:
+            raise UnknownTemplatePlaceholder(
+                "Unknown template placeholders: %s. Valid placeholders are: %s"
+                % (
+                    ", ".join("{{ %s }}" % name for name in sorted(unknown)),
+                    ", ".join("{{ %s }}" % name for name in sorted(PLACEHOLDERS)),
+                )
+            )
+
+    def render(self, values: Mapping[str, str]) -> str:
+        """Return the template text with the placeholders replaced by their values."""
+        parts = self.parts.copy()
+        for index in range(1, len(parts), 2):
+            parts[index] = values[parts[index]]
+        return "".join(parts)
+
+
+@functools.lru_cache(maxsize=64)
+def compile_template(text: str) -> CompiledTemplate:
+    """Return the compiled template for template text, reusing recent templates.
+
+    Raises:
+        UnknownTemplatePlaceholder: When the template uses an unknown placeholder.
+    """
+    return CompiledTemplate(text)
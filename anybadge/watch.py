@@ -0,0 +1,558 @@
+"""Regenerating badges when the files they are created from change.
+
+A manifest lists badges with the source file each badge is created from.  Watching
+the manifest renders every badge once, then waits for the source files to change and
+rewrites only the badges of the files that changed.
+
+Changes are detected with inotify on Linux, or otherwise by checking the modification
+time and size of every source file at an interval.  Bursts of changes, such as a file
+written in several chunks, are collected until the files have been quiet for a short
+time, so each badge is rendered once per burst.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from . import config
+from .badge import Badge
+from .ingest.coverage import _percent_value, read_coverage
+from .ingest.junit import junit_badge, read_junit
+from .styles import Style
+
+logger = logging.getLogger(__name__)
+
+#: Kinds of source files, and how the badge value is read from them.
+SOURCE_TYPES = ("value", "coverage", "junit")
+
+#: Badge specification fields that are passed to :class:`anybadge.Badge`.
+BADGE_OPTIONS = {
+    "color": "default_color",
+    "prefix": "value_prefix",
+    "suffix": "value_suffix",
+    "value_format": "value_format",
+    "use_max": "use_max_when_value_exceeds",
+    "semver": "semver",
+}
+
+_SPEC_FIELDS = {
+    "file",
+    "source",
+    "type",
+    "key",
+    "label",
+    "style",
+    "thresholds",
+    "gradient",
+    *BADGE_OPTIONS,
+}
+
+
+class BadgeSpec(NamedTuple):
+    """A badge of a watch manifest.
+
+    Attributes:
+        file(Path): Location the badge is written to.
+        source(Path): File the badge value is read from.
+        type(str): Kind of source file, one of ``SOURCE_TYPES``.
+        key(str): For ``value`` sources, the key of the value in a JSON source file.
+        label(str): Badge label, or ``None`` for the default label.
+        options(dict): Other arguments for :class:`anybadge.Badge`.
+    """
+
+    file: Path
+    source: Path
+    type: str = "value"
+    key: Optional[str] = None
+    label: Optional[str] = None
+    options: Dict[str, Any] = {}
+
+
+def _parse_pairs(text: str) -> Dict[str, str]:
+    """Parse ``<value>=<color>`` pairs separated by spaces."""
+    pairs = {}
+    for pair in str(text).split():
+        value, separator, color = pair.partition("=")
+        if not separator or not value or not color:
+            raise ValueError(
+                f"Invalid threshold '{pair}'. Thresholds should be in the form "
+                "'<value>=<color>'."
+            )
+        pairs[value] = color
+    return pairs
+
+
+def parse_spec(data: Any, base_dir: Union[str, Path] = ".") -> BadgeSpec:
+    """Create a badge specification from an entry of a watch manifest.
+
+    Relative file locations are relative to ``base_dir``.  ``thresholds`` and
+    ``gradient`` take a mapping or text such as ``2=red 4=orange``, and a ``gradient``
+    of ``true`` uses the thresholds, or the gradient of the style, as color stops.
+
+    Raises:
+        ValueError: When the entry is not valid.
+
+    Examples:
+
+        >>> spec = parse_spec({'file': 'cov.svg', 'source': 'coverage.xml', 'type': 'coverage'})
+        >>> spec.label, spec.options
+        ('coverage', {'value_suffix': '%', 'thresholds': {'50': 'red', '60': 'orange', '80': 'yellow', '100': 'green'}})
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Badge specification must be an object.")
+    unknown = set(data) - _SPEC_FIELDS
+    if unknown:
+        raise ValueError(
+            "Unknown badge specification fields: %s" % ", ".join(sorted(unknown))
+        )
+    for field in ("file", "source"):
+        if not data.get(field):
+            raise ValueError(f"Badge specification must include a {field}.")
+    source_type = data.get("type", "value")
+    if source_type not in SOURCE_TYPES:
+        raise ValueError(
+            f"Unknown source type '{source_type}'. Valid types are: "
+            + ", ".join(SOURCE_TYPES)
+        )
+
+    options: Dict[str, Any] = {
+        BADGE_OPTIONS[name]: value
+        for name, value in data.items()
+        if name in BADGE_OPTIONS
+    }
+    label = data.get("label")
+    style_name = data.get("style")
+    if not style_name and source_type == "coverage" and "thresholds" not in data:
+        style_name = "coverage"
+
+    thresholds: Optional[Dict[str, str]] = None
+    stops: Optional[Dict[str, str]] = None
+    if style_name:
+        if not Style.exists(str(style_name).upper()):
+            raise ValueError(f"Unknown style '{style_name}'.")
+        style = Style[str(style_name).upper()]
+        thresholds = _parse_pairs(style.threshold)
+        stops = _parse_pairs(style.gradient) if style.gradient else thresholds
+        if label is None and style.label:
+            label = style.label
+        if style.suffix:
+            options.setdefault("value_suffix", style.suffix)
+    if data.get("thresholds"):
+        threshold_data = data["thresholds"]
+        if isinstance(threshold_data, dict):
+            thresholds = threshold_data
+        else:
+            thresholds = _parse_pairs(str(threshold_data))
+        stops = thresholds
+
+    gradient = data.get("gradient")
+    if gradient is True:
+        if not stops:
+            raise ValueError("A gradient needs thresholds or a style.")
+        options["gradient"] = stops
+    elif gradient:
+        options["gradient"] = (
+            gradient if isinstance(gradient, dict) else _parse_pairs(gradient)
+        )
+    elif thresholds:
+        options["thresholds"] = thresholds
+
+    base_dir = Path(base_dir)
+    return BadgeSpec(
+        file=base_dir / data["file"],
+        source=base_dir / data["source"],
+        type=source_type,
+        key=data.get("key"),
+        label=None if label is None else str(label),
+        options=options,
+    )
+
+
+def read_manifest(path: Union[str, Path]) -> List[BadgeSpec]:
+    """Read the badge specifications of a watch manifest.
+
+    A manifest is a JSON file with a list of badge specifications, either at the top
+    level or under a ``badges`` key.  File locations are relative to the manifest.
+
+    Raises:
+        ValueError: When the manifest is not valid.
+    """
+    path = Path(path)
+    with open(path, mode="r", encoding="utf-8") as file_handle:
+        try:
+            data = json.load(file_handle)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid manifest: {e}") from e
+    if isinstance(data, dict):
+        data = data.get("badges")
+    if not isinstance(data, list):
+        raise ValueError("Manifest must have a list of badges.")
+
+    specs = []
+    files = set()
+    for index, entry in enumerate(data):
+        try:
+            spec = parse_spec(entry, path.parent)
+        except ValueError as e:
+            raise ValueError(f"Invalid badge {index + 1} of manifest: {e}") from e
+        if spec.file in files:
+            raise ValueError(f"Badge file {spec.file} is in the manifest twice.")
+        files.add(spec.file)
+        specs.append(spec)
+    return specs
+
+
+def _read_value(spec: BadgeSpec) -> str:
+    with open(spec.source, mode="r", encoding="utf-8") as file_handle:
+        text = file_handle.read()
+    if spec.key is None:
+        return text.strip()
+
+    value: Any = json.loads(text)
+    for key in spec.key.split("."):
+        if not isinstance(value, dict) or key not in value:
+            raise ValueError(f"Key '{spec.key}' not found in {spec.source}.")
+        value = value[key]
+    return str(value)
+
+
+def create_badge(spec: BadgeSpec) -> Badge:
+    """Create the badge of a badge specification from its source file.
+
+    Raises:
+        OSError: When the source file can not be read.
+        ValueError: When the source file is not valid.
+    """
+    if spec.type == "junit":
+        kwargs = dict(spec.options)
+        if spec.label is not None:
+            kwargs["label"] = spec.label
+        return junit_badge(read_junit(spec.source), **kwargs)
+
+    if spec.type == "coverage":
+        value: Union[str, int, float] = _percent_value(
+            read_coverage(spec.source).percent
+        )
+    else:
+        value = _read_value(spec)
+    return Badge(spec.label or "", value, **spec.options)
+
+
+#: A value that changes when a file is modified, replaced or removed.
+Signature = Optional[Tuple[int, int, int]]
+
+
+def file_signature(path: Union[str, Path]) -> Signature:
+    """Return the modification time, size and inode of a file, or None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class PollingWatcher:
+    """Waits for files to change by checking them at an interval.
+
+    Each check only stats the files, so checking many files is cheap.  The files that
+    changed are found by comparing their signatures, so ``wait()`` returns every file
+    as a candidate.
+    """
+
+    def __init__(self, paths: Iterable[Path], interval: float = config.WATCH_INTERVAL):
+        self.paths = set(paths)
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Wait for the next check, and return the files that may have changed.
+
+        Checks are ``interval`` seconds apart, or ``timeout`` seconds if that is less.
+        """
+        self._stop.wait(
+            self.interval if timeout is None else min(timeout, self.interval)
+        )
+        return set() if self._stop.is_set() else set(self.paths)
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+class InotifyWatcher:
+    """Waits for files to change using Linux inotify, through ``ctypes``.
+
+    The directories of the files are watched rather than the files, so that files
+    that are replaced, such as files renamed into place, are still watched.
+
+    Raises:
+        OSError: When inotify is not available.
+    """
+
+    _IN_MODIFY = 0x2
+    _IN_ATTRIB = 0x4
+    _IN_CLOSE_WRITE = 0x8
+    _IN_MOVED_FROM = 0x40
+    _IN_MOVED_TO = 0x80
+    _IN_CREATE = 0x100
+    _IN_DELETE = 0x200
+    _IN_NONBLOCK = 0o4000
+    _IN_CLOEXEC = 0o2000000
+    _MASK = (
+        _IN_MODIFY
+        | _IN_ATTRIB
+        | _IN_CLOSE_WRITE
+        | _IN_MOVED_FROM
+        | _IN_MOVED_TO
+        | _IN_CREATE
+        | _IN_DELETE
+    )
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, paths: Iterable[Path], interval: float = config.WATCH_INTERVAL):
+        self.interval = interval
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(self._IN_NONBLOCK | self._IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # Names of the watched files in each watched directory.
+        self._names: Dict[int, Dict[bytes, Path]] = {}
+        directories: Dict[Path, Dict[bytes, Path]] = {}
+        for path in paths:
+            directory = path.parent
+            directories.setdefault(directory, {})[os.fsencode(path.name)] = path
+        try:
+            for directory, names in directories.items():
+                wd = self._libc.inotify_add_watch(
+                    self._fd, os.fsencode(directory), self._MASK
+                )
+                if wd < 0:
+                    errno = ctypes.get_errno()
+                    raise OSError(errno, os.strerror(errno), str(directory))
+                self._names.setdefault(wd, {}).update(names)
+        except OSError:
+            self.close()
+            raise
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Wait for up to ``timeout`` seconds, and return the files that changed."""
+        if self._fd < 0:
+            return set()
+        timeout = self.interval if timeout is None else timeout
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            path = self._names.get(wd, {}).get(name)
+            if path is not None:
+                changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _load_libc() -> ctypes.CDLL:
+    library = ctypes.util.find_library("c")
+    if not library:
+        raise OSError("The C library was not found.")
+    libc = ctypes.CDLL(library, use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        raise OSError("inotify is not available.")
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+Watcher = Union[PollingWatcher, InotifyWatcher]
+
+
+def get_watcher(
+    paths: Iterable[Path],
+    interval: float = config.WATCH_INTERVAL,
+    use_inotify: Optional[bool] = None,
+) -> Watcher:
+    """Return an inotify watcher where inotify is available, and a polling watcher otherwise.
+
+    Args:
+        paths: Files to watch.
+        interval(float, optional): Seconds between checks when polling.
+        use_inotify(bool, optional): Whether to use inotify.  By default, inotify is
+            used when it is available.
+
+    Raises:
+        OSError: When ``use_inotify`` is True and inotify is not available.
+    """
+    paths = list(paths)
+    if use_inotify is False:
+        return PollingWatcher(paths, interval)
+    try:
+        return InotifyWatcher(paths, interval)
+    except (OSError, AttributeError) as e:
+        if use_inotify:
+            raise OSError(f"inotify is not available: {e}") from e
+        logger.debug("inotify is not available, polling for changes: %s", e)
+        return PollingWatcher(paths, interval)
+
+
+class BadgeWatcher:
+    """Rewrites the badges of a manifest when their source files change.
+
+    Args:
+        specs(list): Badge specifications, as returned by ``read_manifest()``.
+        interval(float, optional): Seconds between checks when polling.
+        debounce(float, optional): Seconds the source files must be unchanged before
+            the badges are rendered.
+        use_inotify(bool, optional): Whether to use inotify.  By default, inotify is
+            used when it is available.
+    """
+
+    def __init__(
+        self,
+        specs: List[BadgeSpec],
+        interval: float = config.WATCH_INTERVAL,
+        debounce: float = config.WATCH_DEBOUNCE,
+        use_inotify: Optional[bool] = None,
+    ):
+        self.specs = specs
+        self.debounce = debounce
+        self._by_source: Dict[Path, List[BadgeSpec]] = {}
+        for spec in specs:
+            self._by_source.setdefault(spec.source, []).append(spec)
+        self._signatures: Dict[Path, Signature] = {}
+        # The arguments of the last badge written to each file, to skip rewriting
+        # badges that have not changed.
+        self._written: Dict[Path, str] = {}
+        self.watcher = get_watcher(self._by_source, interval, use_inotify)
+
+    def render(self, specs: Optional[Iterable[BadgeSpec]] = None) -> List[BadgeSpec]:
+        """Write the badges of specifications, by default all of them.
+
+        Badges whose source file can not be read are left as they are, and badges that
+        can not be written are tried again when their source file next changes.
+
+        Returns:
+            list: The specifications whose badges were written.
+        """
+        written = []
+        for spec in self.specs if specs is None else specs:
+            try:
+                badge = create_badge(spec)
+            except (OSError, ValueError) as e:
+                logger.warning(
+                    "Failed to read %s for %s: %s", spec.source, spec.file, e
+                )
+                continue
+            key = repr(badge)
+            if self._written.get(spec.file) == key:
+                continue
+            try:
+                spec.file.parent.mkdir(parents=True, exist_ok=True)
+                badge.write_badge(spec.file, overwrite=True)
+            except (OSError, ValueError) as e:
+                logger.warning("Failed to write %s: %s", spec.file, e)
+                continue
+            self._written[spec.file] = key
+            logger.info("Wrote %s: %s", spec.file, badge.value_text)
+            written.append(spec)
+        return written
+
+    def _changed(self, candidates: Iterable[Path]) -> Set[Path]:
+        changed = set()
+        for path in candidates:
+            signature = file_signature(path)
+            if signature != self._signatures.get(path):
+                self._signatures[path] = signature
+                changed.add(path)
+        return changed
+
+    def start(self) -> List[BadgeSpec]:
+        """Record the state of the source files and write every badge."""
+        self._changed(self._by_source)
+        return self.render()
+
+    def poll(self, timeout: Optional[float] = None) -> List[BadgeSpec]:
+        """Wait up to ``timeout`` seconds for source files to change, and rewrite the
+        badges of changed files.
+
+        Once a change is seen, changes are collected until the source files have been
+        unchanged for ``debounce`` seconds, or until ``config.WATCH_MAX_DELAY`` seconds
+        have passed.
+
+        Returns:
+            list: The specifications whose badges were written.
+        """
+        deadline = time.monotonic() + (
+            self.watcher.interval if timeout is None else timeout
+        )
+        changed: Set[Path] = set()
+        while not changed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            changed = self._changed(self.watcher.wait(remaining))
+
+        deadline = time.monotonic() + config.WATCH_MAX_DELAY
+        while time.monotonic() < deadline:
+            more = self._changed(self.watcher.wait(self.debounce))
+            if not more:
+                break
+            changed |= more
+        return self.render(
+            spec for path in sorted(changed) for spec in self._by_source[path]
+        )
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """Write every badge, then rewrite badges as their source files change.
+
+        Runs until ``stop`` is set.
+        """
+        stop = stop or threading.Event()
+        self.start()
+        while not stop.is_set():
+            self.poll()
+
+    def close(self) -> None:
+        self.watcher.close()
+
+
+def watch(
+    manifest: Union[str, Path],
+    interval: float = config.WATCH_INTERVAL,
+    debounce: float = config.WATCH_DEBOUNCE,
+    use_inotify: Optional[bool] = None,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """Write the badges of a manifest, and rewrite them when their source files change.
+
+    Runs until ``stop`` is set.
+
+    Raises:
+        ValueError: When the manifest is not valid.
+    """
+    watcher = BadgeWatcher(read_manifest(manifest), interval, debounce, use_inotify)
+    try:
+        watcher.run(stop)
+    finally:
+        watcher.close()
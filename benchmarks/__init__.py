@@ -0,0 +1,5 @@
+"""Performance benchmarks for anybadge.
+
+Benchmarks are registered in the modules of this package and run using the
+``inv bench`` task.
+"""
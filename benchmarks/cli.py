@@ -0,0 +1,18 @@
+"""Benchmarks for the anybadge command line utility."""
+
+import subprocess
+import sys
+
+from benchmarks.core import PROJECT_DIR, Result, benchmark, time_per_call
+
+
+@benchmark("cli.cold_start")
+def cold_start(quick: bool) -> Result:
+    """Time a complete run of the command line utility in a new interpreter."""
+    command = [sys.executable, "-m", "anybadge", "-l", "pylint", "-v", "2.22", "pylint"]
+
+    def run():
+        subprocess.run(command, cwd=PROJECT_DIR, check=True, stdout=subprocess.DEVNULL)
+
+    seconds = time_per_call(run, 1 if quick else 5, repeat=3)
+    return Result("cli.cold_start", seconds * 1e3, "ms/op")
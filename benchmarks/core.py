@@ -0,0 +1,132 @@
+"""Benchmark registry, timing and regression checking."""
+
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Union
+
+PROJECT_DIR = Path(__file__).parent.parent
+
+
+class Result(NamedTuple):
+    """The result of a single benchmark."""
+
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool = False
+
+
+class Regression(NamedTuple):
+    """A benchmark result that is worse than the baseline."""
+
+    name: str
+    baseline: float
+    value: float
+    change_percent: float
+
+
+#: Registered benchmarks, keyed by name.
+BENCHMARKS: Dict[str, Callable[[bool], Result]] = {}
+
+
+def benchmark(name: str):
+    """Decorator used to register a benchmark function.
+
+    Benchmark functions take a single ``quick`` argument, which requests a shorter
+    run, and return a ``Result``.
+    """
+
+    def decorator(fn: Callable[[bool], Result]) -> Callable[[bool], Result]:
+        BENCHMARKS[name] = fn
+        return fn
+
+    return decorator
+
+
+def time_per_call(fn: Callable[[], object], number: int, repeat: int = 5) -> float:
+    """Return the best time per call in seconds over a number of repeats."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def load_benchmarks() -> None:
+    """Import the benchmark modules so that their benchmarks are registered."""
+    from benchmarks import cli, library, server  # noqa: F401
+
+
+def run_benchmarks(names: Optional[Iterable[str]] = None, quick=False) -> List[Result]:
+    """Run benchmarks and return their results.
+
+    Args:
+        names: Names of benchmarks to run.  Names match any benchmark that starts with
+            the given text.  All benchmarks are run when no names are given.
+        quick: Run shorter versions of the benchmarks.
+    """
+    load_benchmarks()
+    selected = [
+        name
+        for name in BENCHMARKS
+        if not names or any(name.startswith(prefix) for prefix in names)
+    ]
+    results = []
+    for name in selected:
+        print(f"  {name}...", end="", flush=True)
+        result = BENCHMARKS[name](quick)
+        print(f" {result.value:.6g} {result.unit}")
+        results.append(result)
+    return results
+
+
+def save_results(results: List[Result], path: Union[str, Path]) -> None:
+    """Save benchmark results to a JSON file."""
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": {result.name: result._asdict() for result in results},
+    }
+    with open(path, mode="w") as file_handle:
+        json.dump(data, file_handle, indent=2)
+
+
+def load_results(path: Union[str, Path]) -> Dict[str, Result]:
+    """Load benchmark results from a JSON file."""
+    with open(path, mode="r") as file_handle:
+        data = json.load(file_handle)
+    return {name: Result(**values) for name, values in data["results"].items()}
+
+
+def compare(
+    results: List[Result], baseline: Dict[str, Result], max_regression: float
+) -> List[Regression]:
+    """Compare results against a baseline.
+
+    Args:
+        results: Results of the current run.
+        baseline: Baseline results keyed by name.
+        max_regression: Maximum allowed regression in percent.
+
+    Returns:
+        Results that regressed by more than ``max_regression`` percent.
+    """
+    regressions = []
+    for result in results:
+        if result.name not in baseline:
+            continue
+        base_value = baseline[result.name].value
+        if not base_value:
+            continue
+        change = (result.value - base_value) / base_value * 100.0
+        worse = -change if result.higher_is_better else change
+        if worse > max_regression:
+            regressions.append(
+                Regression(result.name, base_value, result.value, change)
+            )
+    return regressions
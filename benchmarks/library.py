@@ -0,0 +1,141 @@
+"""Benchmarks for the anybadge library."""
+
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+
+from anybadge import Badge
+from anybadge.archive import write_archive
+from anybadge.helpers import _get_approx_string_width, get_approx_string_widths
+
+from benchmarks.core import Result, benchmark, time_per_call
+
+THRESHOLDS: Dict[float, str] = {2: "red", 4: "orange", 8: "yellow", 10: "green"}
+
+
+def _number(quick: bool, full: int) -> int:
+    return max(full // 10, 1) if quick else full
+
+
+@benchmark("library.construction")
+def construction(quick: bool) -> Result:
+    """Time creating a badge with thresholds."""
+    seconds = time_per_call(
+        lambda: Badge("pylint", 2.22, thresholds=THRESHOLDS), _number(quick, 5000)
+    )
+    return Result("library.construction", seconds * 1e6, "us/op")
+
+
+@benchmark("library.width")
+def width(quick: bool) -> Result:
+    """Time measuring label and value text widths."""
+    badge = Badge("coverage", "97.5%")
+
+    def measure():
+        return badge.label_width + badge.value_width
+
+    seconds = time_per_call(measure, _number(quick, 10000))
+    return Result("library.width", seconds * 1e6, "us/op")
+
+
+@benchmark("library.width_long_text")
+def width_long_text(quick: bool) -> Result:
+    """Time measuring a long string."""
+    text = "err: 2 | warn: 9 | info: 99 | style: 365 " * 10
+    seconds = time_per_call(
+        lambda: _get_approx_string_width(text, 10), _number(quick, 2000)
+    )
+    return Result("library.width_long_text", seconds * 1e6, "us/op")
+
+
+@benchmark("library.thresholds")
+def thresholds(quick: bool) -> Result:
+    """Time evaluating numeric thresholds."""
+    badge = Badge("pylint", 6.5, thresholds=THRESHOLDS)
+    seconds = time_per_call(lambda: badge.badge_color, _number(quick, 10000))
+    return Result("library.thresholds", seconds * 1e6, "us/op")
+
+
+@benchmark("library.thresholds_semver")
+def thresholds_semver(quick: bool) -> Result:
+    """Time evaluating semantic version thresholds."""
+    # Semantic version thresholds are keyed by version strings.
+    semver_thresholds: Dict[Any, str] = {
+        "3.0.0": "red",
+        "3.2.0": "orange",
+        "999.0.0": "green",
+    }
+    badge = Badge("version", "3.1.0", thresholds=semver_thresholds, semver=True)
+    seconds = time_per_call(lambda: badge.badge_color, _number(quick, 5000))
+    return Result("library.thresholds_semver", seconds * 1e6, "us/op")
+
+
+@benchmark("library.gradient")
+def gradient(quick: bool) -> Result:
+    """Time selecting a color from a gradient."""
+    badge = Badge("coverage", 65, gradient={50: "red", 75: "yellow", 100: "green"})
+    seconds = time_per_call(lambda: badge.badge_color, _number(quick, 10000))
+    return Result("library.gradient", seconds * 1e6, "us/op")
+
+
+@benchmark("library.render_default")
+def render_default(quick: bool) -> Result:
+    """Time creating and rendering a badge with the default template."""
+    seconds = time_per_call(
+        lambda: Badge("pylint", 2.22, thresholds=THRESHOLDS).badge_svg_text,
+        _number(quick, 2000),
+    )
+    return Result("library.render_default", seconds * 1e6, "us/op")
+
+
+@benchmark("library.render_gitlab_scoped")
+def render_gitlab_scoped(quick: bool) -> Result:
+    """Time creating and rendering a badge with the gitlab-scoped template."""
+    seconds = time_per_call(
+        lambda: Badge(
+            "Project", "Archimedes", style="gitlab-scoped", default_color="#c1115d"
+        ).badge_svg_text,
+        _number(quick, 2000),
+    )
+    return Result("library.render_gitlab_scoped", seconds * 1e6, "us/op")
+
+
+@benchmark("library.width_batch")
+def width_batch(quick: bool) -> Result:
+    """Time measuring many distinct strings at once, per string."""
+    texts = [f"label {i} | value {i * 7 % 1000}%" for i in range(10000)]
+    seconds = time_per_call(
+        lambda: get_approx_string_widths(texts, 10), 1 if quick else 5
+    )
+    return Result("library.width_batch", seconds / len(texts) * 1e6, "us/op")
+
+
+def _archive_badges(count: int):
+    return [
+        (f"badges/{i}", Badge("build", i, thresholds=THRESHOLDS)) for i in range(count)
+    ]
+
+
+@benchmark("library.write_files")
+def write_files(quick: bool) -> Result:
+    """Time writing badges to separate files, per badge."""
+    badges = _archive_badges(_number(quick, 2000))
+    with tempfile.TemporaryDirectory() as directory:
+        (Path(directory) / "badges").mkdir()
+
+        def write():
+            for name, badge in badges:
+                badge.write_badge(Path(directory) / f"{name}.svg", overwrite=True)
+
+        seconds = time_per_call(write, 1)
+    return Result("library.write_files", seconds / len(badges) * 1e6, "us/op")
+
+
+@benchmark("library.write_archive")
+def write_archive_tar(quick: bool) -> Result:
+    """Time writing badges into one tar archive, per badge."""
+    badges = _archive_badges(_number(quick, 2000))
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "badges.tar"
+        seconds = time_per_call(lambda: write_archive(path, badges, overwrite=True), 1)
+    return Result("library.write_archive", seconds / len(badges) * 1e6, "us/op")
@@ -0,0 +1,163 @@
+"""Load generator for anybadge-server.
+
+Clients are asyncio tasks that each send one request at a time over a new
+connection, so the concurrency is the number of requests in flight.  A fraction of
+requests use a small set of badge paths that are quickly cached, and the rest use
+unique badge paths that must be rendered.
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from benchmarks.server import LISTEN_ADDRESS, running_server
+
+
+class LoadTestConfig(NamedTuple):
+    """Settings for a load test."""
+
+    concurrency: int = 16
+    duration: float = 10.0
+    unique_ratio: float = 0.2
+    hot_badges: int = 50
+    timeout: float = 10.0
+    server_args: Sequence[str] = ()
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Return a percentile of sorted values using the nearest-rank method.
+
+    Examples:
+
+        >>> percentile([1.0, 2.0, 3.0, 4.0], 50)
+        2.0
+        >>> percentile([1.0, 2.0, 3.0, 4.0], 99)
+        4.0
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class _Recorder:
+    """Collects request latencies, statuses and errors."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: "Counter[int]" = Counter()
+        self.errors: "Counter[str]" = Counter()
+
+    def report(self, config: LoadTestConfig, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        total = len(latencies) + sum(self.errors.values())
+        failed = sum(self.errors.values()) + sum(
+            count for status, count in self.statuses.items() if status >= 400
+        )
+        return {
+            "config": {
+                "concurrency": config.concurrency,
+                "duration": config.duration,
+                "unique_ratio": config.unique_ratio,
+                "hot_badges": config.hot_badges,
+                "server_args": list(config.server_args),
+            },
+            "requests": total,
+            "elapsed": round(elapsed, 3),
+            "throughput": round(total / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "mean": (
+                    round(1000 * sum(latencies) / len(latencies), 3)
+                    if latencies
+                    else 0.0
+                ),
+                "p50": round(1000 * percentile(latencies, 50), 3),
+                "p95": round(1000 * percentile(latencies, 95), 3),
+                "p99": round(1000 * percentile(latencies, 99), 3),
+                "max": round(1000 * latencies[-1], 3) if latencies else 0.0,
+            },
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "errors": dict(self.errors),
+            "error_rate": round(failed / total, 6) if total else 0.0,
+        }
+
+
+def badge_path(rng: random.Random, config: LoadTestConfig) -> str:
+    """Return a badge path, either one of the hot badges or a unique one."""
+    if rng.random() < config.unique_ratio:
+        value = rng.getrandbits(48)
+        return f"/badge/unique-{value}-green.svg"
+    number = rng.randrange(config.hot_badges)
+    return f"/badge/hot_{number}-{number}%25.svg"
+
+
+async def _request(port: int, path: str, timeout: float) -> int:
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(LISTEN_ADDRESS, port), timeout
+    )
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.0\r\nHost: {LISTEN_ADDRESS}:{port}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        # The server closes the connection after an HTTP/1.0 response.
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status_line = response.split(b"\r\n", 1)[0].split()
+    if len(status_line) < 2:
+        raise ValueError("Invalid response")
+    return int(status_line[1])
+
+
+async def _client(
+    port: int, config: LoadTestConfig, recorder: _Recorder, end: float, seed: int
+) -> None:
+    rng = random.Random(seed)
+    while time.perf_counter() < end:
+        path = badge_path(rng, config)
+        start = time.perf_counter()
+        try:
+            status = await _request(port, path, config.timeout)
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            recorder.errors[type(e).__name__] += 1
+            continue
+        recorder.latencies.append(time.perf_counter() - start)
+        recorder.statuses[status] += 1
+
+
+async def drive(port: int, config: LoadTestConfig) -> Dict[str, Any]:
+    """Drive load against a server that is already running, and return a report."""
+    recorder = _Recorder()
+    start = time.perf_counter()
+    end = start + config.duration
+    await asyncio.gather(
+        *(
+            _client(port, config, recorder, end, seed)
+            for seed in range(config.concurrency)
+        )
+    )
+    return recorder.report(config, time.perf_counter() - start)
+
+
+def run_load_test(config: LoadTestConfig, port: Optional[int] = None) -> Dict[str, Any]:
+    """Run a load test and return the report.
+
+    A local ``anybadge-server`` is started with ``config.server_args``, unless the
+    port of a running server is given.
+    """
+    if port is not None:
+        return asyncio.run(drive(port, config))
+    with running_server(*config.server_args) as (_, server_port):
+        return asyncio.run(drive(server_port, config))
+
+
+def save_report(report: Dict[str, Any], path: Union[str, Path]) -> None:
+    """Write a load test report to a JSON file."""
+    with open(path, mode="w") as file_handle:
+        json.dump(report, file_handle, indent=2, sort_keys=True)
+        file_handle.write("\n")
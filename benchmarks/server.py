@@ -0,0 +1,164 @@
+"""Benchmarks for the anybadge server."""
+
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+from anybadge import Badge
+from benchmarks.core import PROJECT_DIR, Result, benchmark
+
+LISTEN_ADDRESS = "127.0.0.1"
+
+
+def get_free_port() -> int:
+    """Return a TCP port that is currently free on the listen address."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((LISTEN_ADDRESS, 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 10.0) -> None:
+    """Wait until a server is accepting connections on the given port."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection((LISTEN_ADDRESS, port), timeout=0.5):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server did not start listening on port {port}.")
+            time.sleep(0.05)
+
+
+@contextmanager
+def running_server(*args: str) -> Iterator[Tuple[subprocess.Popen, int]]:
+    """Run an anybadge server in a subprocess for the duration of the block.
+
+    Yields:
+        The server process and the port it is listening on.
+    """
+    port = get_free_port()
+    command: List[str] = [
+        sys.executable,
+        "-m",
+        "anybadge.server",
+        "--port",
+        str(port),
+        "--listen-address",
+        LISTEN_ADDRESS,
+        *args,
+    ]
+    proc = subprocess.Popen(
+        command, cwd=PROJECT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(port)
+        yield proc, port
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def get(port: int, path: str) -> Tuple[int, bytes]:
+    """Send a GET request to a local server and return the status and body."""
+    connection = http.client.HTTPConnection(LISTEN_ADDRESS, port, timeout=10)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def requests_per_second(port: int, paths: List[str], duration: float) -> float:
+    """Send requests sequentially for a duration and return the request rate.
+
+    Raises:
+        RuntimeError: When a request does not succeed, so that error responses are
+            not measured as served requests.
+    """
+    count = 0
+    start = time.perf_counter()
+    end = start + duration
+    while time.perf_counter() < end:
+        path = paths[count % len(paths)]
+        status, _ = get(port, path)
+        if status != 200:
+            raise RuntimeError(f"Request for {path} returned {status}")
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+@benchmark("server.requests_per_second")
+def server_requests_per_second(quick: bool) -> Result:
+    """Measure the rate of badge requests served by a single server."""
+    paths = [f"/badge/build_{i}-{i}.svg" for i in range(100)]
+    with running_server() as (_, port):
+        rate = requests_per_second(port, paths, 1.0 if quick else 5.0)
+    return Result("server.requests_per_second", rate, "req/s", higher_is_better=True)
+
+
+@benchmark("server.static_requests_per_second")
+def server_static_requests_per_second(quick: bool) -> Result:
+    """Measure the rate of requests for pre-rendered badges served from a directory."""
+    paths = [f"/badge/build_{i}-{i}-green.svg" for i in range(100)]
+    with tempfile.TemporaryDirectory() as directory:
+        os.mkdir(os.path.join(directory, "badge"))
+        for i in range(100):
+            badge = Badge(f"build {i}", str(i), default_color="green")
+            badge.write_badge(
+                os.path.join(directory, "badge", f"build_{i}-{i}-green.svg")
+            )
+        with running_server("--static-dir", directory) as (_, port):
+            rate = requests_per_second(port, paths, 1.0 if quick else 5.0)
+    return Result(
+        "server.static_requests_per_second", rate, "req/s", higher_is_better=True
+    )
+
+
+def concurrent_requests_per_second(
+    port: int, paths: List[str], duration: float, clients: int
+) -> float:
+    """Send requests from several client processes and return the total request rate.
+
+    Client processes are used rather than threads so that the load generator is not
+    limited to one CPU core.
+    """
+    with ProcessPoolExecutor(max_workers=clients) as executor:
+        futures = [
+            executor.submit(requests_per_second, port, paths, duration)
+            for _ in range(clients)
+        ]
+        return sum(future.result() for future in futures)
+
+
+def _workers_benchmark(workers: int):
+    name = f"server.workers_{workers}_requests_per_second"
+
+    @benchmark(name)
+    def workers_requests_per_second(quick: bool) -> Result:
+        """Measure the request rate of a server with a number of worker processes."""
+        paths = [f"/badge/build_{i}-{i}-green.svg" for i in range(100)]
+        clients = max(os.cpu_count() or 1, 2 * workers)
+        with running_server("--workers", str(workers)) as (_, port):
+            rate = concurrent_requests_per_second(
+                port, paths, 1.0 if quick else 5.0, clients
+            )
+        return Result(name, rate, "req/s", higher_is_better=True)
+
+    return workers_requests_per_second
+
+
+# Show how the request rate scales with the number of worker processes.
+for _workers in (1, 2, 4):
+    _workers_benchmark(_workers)
@@ -0,0 +1,281 @@
+"""Soak tests that look for memory growth over many badge renders.
+
+Each phase renders badges for a warm up period, so that bounded caches fill up, and
+then measures how much memory grows over the rest of the run.  Memory is measured
+as the resident set size (RSS) of the process and, for the phases that run in this
+process, as the memory traced by ``tracemalloc``.  A phase fails when either grows
+by more than the allowed amount, and reports the allocation sites that grew most.
+
+The phases are:
+
+* ``library``: create badges and render their SVG text.
+* ``app``: request badges from the server application in this process.
+* ``server``: request badges from an ``anybadge-server`` process over HTTP.  Only
+  RSS is measured for this phase.
+"""
+
+import gc
+import json
+import os
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from anybadge import Badge
+from anybadge.server.app import AnyBadgeApp, Request
+from benchmarks.server import get, running_server
+
+MB = 1024 * 1024
+
+#: Names of the soak test phases, in the order they run.
+PHASES = ("library", "app", "server")
+
+
+class SoakConfig(NamedTuple):
+    """Settings for a soak test."""
+
+    iterations: int = 1_000_000
+    server_requests: int = 100_000
+    warmup: int = 20_000
+    samples: int = 20
+    max_growth_mb: float = 10.0
+    hot_badges: int = 50
+    unique_ratio: float = 0.5
+    top: int = 10
+    server_args: Sequence[str] = ()
+
+
+def rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """Return the resident set size of a process and its children, in bytes.
+
+    The RSS is read from ``/proc``, so None is returned on platforms without it.
+    """
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/statm") as file_handle:
+            total = int(file_handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        children: List[int] = []
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as file_handle:
+                children.extend(int(child) for child in file_handle.read().split())
+    except (OSError, ValueError):
+        return None
+    for child in children:
+        child_rss = rss_bytes(child)
+        if child_rss is not None:
+            total += child_rss
+    return total
+
+
+def badge_spec(rng: random.Random, config: SoakConfig) -> Sequence[str]:
+    """Return the label and value of a badge, either a hot badge or a unique one."""
+    if rng.random() < config.unique_ratio:
+        value = rng.getrandbits(48)
+        return f"unique {value}", str(value % 1000)
+    number = rng.randrange(config.hot_badges)
+    return f"hot {number}", f"{number}%"
+
+
+def badge_path(label: str, value: str) -> str:
+    """Return the server path of a green badge.
+
+    Examples:
+
+        >>> badge_path('hot 1', '1%')
+        '/badge/hot_1-1%25-green.svg'
+    """
+    return "/badge/%s-%s-green.svg" % (
+        label.replace(" ", "_"),
+        value.replace("%", "%25"),
+    )
+
+
+def _library_step(rng: random.Random, config: SoakConfig) -> Callable[[], None]:
+    def step():
+        label, value = badge_spec(rng, config)
+        Badge(label, value, default_color="green").badge_svg_text
+
+    return step
+
+
+def _app_step(rng: random.Random, config: SoakConfig) -> Callable[[], None]:
+    app = AnyBadgeApp()
+
+    def step():
+        path = badge_path(*badge_spec(rng, config))
+        response = app.handle(Request("GET", path))
+        if response.status != 200:
+            raise RuntimeError(f"Request for {path} returned {response.status}")
+
+    return step
+
+
+def _server_step(
+    rng: random.Random, config: SoakConfig, port: int
+) -> Callable[[], None]:
+    def step():
+        path = badge_path(*badge_spec(rng, config))
+        status, _ = get(port, path)
+        if status != 200:
+            raise RuntimeError(f"Request for {path} returned {status}")
+
+    return step
+
+
+def _top_growth(
+    baseline: tracemalloc.Snapshot, snapshot: tracemalloc.Snapshot, top: int
+) -> List[Dict[str, Any]]:
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+    stats = snapshot.filter_traces(filters).compare_to(
+        baseline.filter_traces(filters), "lineno"
+    )
+    return [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "count_diff": stat.count_diff,
+        }
+        for stat in stats[:top]
+        if stat.size_diff > 0
+    ]
+
+
+def soak(
+    name: str,
+    step: Callable[[], None],
+    iterations: int,
+    config: SoakConfig,
+    pid: Optional[int] = None,
+    trace: bool = True,
+) -> Dict[str, Any]:
+    """Call a step function many times and report how memory grows.
+
+    Args:
+        name: Name of the phase.
+        step: Function that renders or requests one badge.
+        iterations: Number of times to call the step function.
+        config: Soak test settings.
+        pid: Process to measure the RSS of.  Defaults to this process.
+        trace: Measure memory allocated in this process using ``tracemalloc``.
+
+    Returns:
+        The report for the phase.
+    """
+    warmup = min(config.warmup, iterations // 2)
+    sample_every = max((iterations - warmup) // max(config.samples, 1), 1)
+    samples: List[Dict[str, Any]] = []
+    baseline: Optional[tracemalloc.Snapshot] = None
+
+    def sample(iteration: int) -> Dict[str, Any]:
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0] if trace else None
+        values = {"iteration": iteration, "rss": rss_bytes(pid), "traced": traced}
+        samples.append(values)
+        return values
+
+    if trace:
+        tracemalloc.start()
+    try:
+        if warmup == 0:
+            sample(0)
+            if trace:
+                baseline = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        for iteration in range(1, iterations + 1):
+            step()
+            if warmup and iteration == warmup:
+                sample(iteration)
+                if trace:
+                    baseline = tracemalloc.take_snapshot()
+            elif iteration > warmup and (iteration - warmup) % sample_every == 0:
+                sample(iteration)
+        elapsed = time.perf_counter() - start
+
+        if not samples or samples[-1]["iteration"] != iterations:
+            sample(iterations)
+        top_growth = (
+            _top_growth(baseline, tracemalloc.take_snapshot(), config.top)
+            if baseline is not None
+            else []
+        )
+    finally:
+        if trace:
+            tracemalloc.stop()
+
+    first, last = samples[0], samples[-1]
+    growth = {
+        key: round((last[key] - first[key]) / MB, 3)
+        for key in ("rss", "traced")
+        if first[key] is not None and last[key] is not None
+    }
+    return {
+        "phase": name,
+        "iterations": iterations,
+        "warmup": warmup,
+        "elapsed": round(elapsed, 3),
+        "rate": round(iterations / elapsed, 2) if elapsed else 0.0,
+        "rss_growth_mb": growth.get("rss"),
+        "traced_growth_mb": growth.get("traced"),
+        "max_growth_mb": config.max_growth_mb,
+        "passed": all(value <= config.max_growth_mb for value in growth.values()),
+        "samples": samples,
+        "top_growth": top_growth,
+    }
+
+
+def run_soak_test(
+    config: SoakConfig, phases: Sequence[str] = PHASES, seed: int = 0
+) -> Dict[str, Any]:
+    """Run the soak test phases and return the report."""
+    reports = []
+    for name in phases:
+        rng = random.Random(seed)
+        print(f"  {name}...", flush=True)
+        if name == "library":
+            step = _library_step(rng, config)
+            reports.append(soak(name, step, config.iterations, config))
+        elif name == "app":
+            step = _app_step(rng, config)
+            reports.append(soak(name, step, config.iterations, config))
+        elif name == "server":
+            with running_server(*config.server_args) as (proc, port):
+                step = _server_step(rng, config, port)
+                reports.append(
+                    soak(
+                        name,
+                        step,
+                        config.server_requests,
+                        config,
+                        pid=proc.pid,
+                        trace=False,
+                    )
+                )
+        else:
+            raise ValueError(f"Unknown soak test phase: {name}")
+    return {
+        "config": {
+            "iterations": config.iterations,
+            "server_requests": config.server_requests,
+            "warmup": config.warmup,
+            "max_growth_mb": config.max_growth_mb,
+            "hot_badges": config.hot_badges,
+            "unique_ratio": config.unique_ratio,
+            "server_args": list(config.server_args),
+        },
+        "phases": reports,
+        "passed": all(report["passed"] for report in reports),
+    }
+
+
+def save_report(report: Dict[str, Any], path: Union[str, Path]) -> None:
+    """Write a soak test report to a JSON file."""
+    with open(path, mode="w") as file_handle:
+        json.dump(report, file_handle, indent=2, sort_keys=True)
+        file_handle.write("\n")
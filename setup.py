@@ -36,11 +36,12 @@ setup(
     version=get_version(),
     author="Jon Grace-Cox",
     author_email="30441316+jongracecox@users.noreply.github.com",
-    packages=["anybadge", "anybadge.templates", "anybadge.server"],
+    packages=["anybadge", "anybadge.templates", "anybadge.server", "anybadge.ingest"],
     py_modules=["anybadge_server"],
     setup_requires=["setuptools", "wheel"],
     tests_require=[],
     install_requires=["packaging"],
+    extras_require={"numpy": ["numpy"]},
     package_data={"anybadge": ["templates/*.svg"]},
     options={"bdist_wheel": {"universal": False}},
     python_requires=">=3.7",
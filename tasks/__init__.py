@@ -6,7 +6,7 @@ import subprocess
 from pathlib import Path
 
 from invoke import task, Collection
-from tasks import test, server, housekeeping, colors, package
+from tasks import test, server, housekeeping, colors, package, bench, loadtest, soak
 
 PROJECT_DIR = Path(__file__).parent.parent
 
@@ -22,6 +22,8 @@ def examples(c):
     main()
 
 
-namespace = Collection(test, server, housekeeping, colors, package)
+namespace = Collection(
+    test, server, housekeeping, colors, package, bench, loadtest, soak
+)
 for fn in [examples]:
     namespace.add_task(fn)
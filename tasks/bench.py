@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+from invoke import task
+
+PROJECT_DIR = Path(__file__).parent.parent
+DEFAULT_BASELINE = PROJECT_DIR / Path("benchmarks/baseline.json")
+
+
+@task(
+    default=True,
+    help={
+        "only": "Comma separated benchmark name prefixes to run, e.g. 'library,cli'.",
+        "output": "File to write the JSON results to.",
+        "baseline": "Baseline JSON results to compare against.",
+        "save_baseline": "Save the results as the new baseline.",
+        "max_regression": "Fail when a result is worse than the baseline by more than this percentage.",
+        "quick": "Run shorter versions of the benchmarks.",
+    },
+)
+def run(
+    c,
+    only="",
+    output="bench_results.json",
+    baseline=str(DEFAULT_BASELINE),
+    save_baseline=False,
+    max_regression=10.0,
+    quick=False,
+):
+    """Run performance benchmarks."""
+    if str(PROJECT_DIR) not in sys.path:
+        sys.path.insert(0, str(PROJECT_DIR))
+
+    from benchmarks.core import compare, load_results, run_benchmarks, save_results
+
+    print("Running benchmarks...")
+    names = [name for name in only.split(",") if name]
+    results = run_benchmarks(names, quick=quick)
+
+    print(f"Writing results to {output}")
+    save_results(results, output)
+
+    if save_baseline:
+        print(f"Saving baseline to {baseline}")
+        save_results(results, baseline)
+        return
+
+    if not Path(baseline).exists():
+        print(f"No baseline found at {baseline}. Skipping regression check.")
+        return
+
+    regressions = compare(results, load_results(baseline), float(max_regression))
+    if not regressions:
+        print(f"No regressions over {max_regression}% against {baseline}.")
+        return
+
+    for regression in regressions:
+        print(
+            f"REGRESSION: {regression.name}: {regression.baseline:.6g} -> "
+            f"{regression.value:.6g} ({regression.change_percent:+.1f}%)"
+        )
+    sys.exit(1)
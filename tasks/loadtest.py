@@ -0,0 +1,51 @@
+import json
+import shlex
+import sys
+from pathlib import Path
+
+from invoke import task
+
+PROJECT_DIR = Path(__file__).parent.parent
+
+
+@task(
+    default=True,
+    help={
+        "concurrency": "Number of requests in flight at once.",
+        "duration": "Number of seconds to generate load for.",
+        "unique_ratio": "Fraction of requests for unique badges that are not cached.",
+        "hot_badges": "Number of distinct badges in the cached part of the mix.",
+        "server_args": "Extra anybadge-server arguments, e.g. '--workers 4'.",
+        "port": "Port of a running server to test, instead of starting one.",
+        "output": "File to write the JSON report to.",
+    },
+)
+def run(
+    c,
+    concurrency=16,
+    duration=10.0,
+    unique_ratio=0.2,
+    hot_badges=50,
+    server_args="",
+    port=None,
+    output="loadtest_results.json",
+):
+    """Run a load test against a local anybadge server."""
+    if str(PROJECT_DIR) not in sys.path:
+        sys.path.insert(0, str(PROJECT_DIR))
+
+    from benchmarks.loadtest import LoadTestConfig, run_load_test, save_report
+
+    config = LoadTestConfig(
+        concurrency=int(concurrency),
+        duration=float(duration),
+        unique_ratio=float(unique_ratio),
+        hot_badges=int(hot_badges),
+        server_args=shlex.split(server_args),
+    )
+    print(f"Running load test: {config}")
+    report = run_load_test(config, port=int(port) if port else None)
+
+    print(json.dumps(report, indent=2, sort_keys=True))
+    print(f"Writing report to {output}")
+    save_report(report, output)
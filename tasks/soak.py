@@ -0,0 +1,75 @@
+import json
+import shlex
+import sys
+from pathlib import Path
+
+from invoke import task
+
+PROJECT_DIR = Path(__file__).parent.parent
+
+
+@task(
+    default=True,
+    help={
+        "iterations": "Number of badges rendered in each in-process phase.",
+        "server_requests": "Number of requests sent to the server process.",
+        "warmup": "Number of badges rendered before memory growth is measured.",
+        "max_growth": "Fail when memory grows by more than this many megabytes.",
+        "phases": "Comma separated phases to run: library, app, server.",
+        "server_args": "Extra anybadge-server arguments, e.g. '--workers 4'.",
+        "quick": "Run a much shorter soak test.",
+        "output": "File to write the JSON report to.",
+    },
+)
+def run(
+    c,
+    iterations=1_000_000,
+    server_requests=100_000,
+    warmup=20_000,
+    max_growth=10.0,
+    phases="library,app,server",
+    server_args="",
+    quick=False,
+    output="soak_results.json",
+):
+    """Run a soak test that fails when memory keeps growing."""
+    if str(PROJECT_DIR) not in sys.path:
+        sys.path.insert(0, str(PROJECT_DIR))
+
+    from benchmarks.soak import SoakConfig, run_soak_test, save_report
+
+    iterations, server_requests = int(iterations), int(server_requests)
+    if quick:
+        iterations, server_requests = iterations // 20, server_requests // 20
+    config = SoakConfig(
+        iterations=iterations,
+        server_requests=server_requests,
+        warmup=int(warmup),
+        max_growth_mb=float(max_growth),
+        server_args=shlex.split(server_args),
+    )
+    print(f"Running soak test: {config}")
+    report = run_soak_test(config, [phase for phase in phases.split(",") if phase])
+
+    print(f"Writing report to {output}")
+    save_report(report, output)
+
+    for phase in report["phases"]:
+        print(
+            f"{phase['phase']}: {phase['iterations']} badges at {phase['rate']:.0f}/s, "
+            f"RSS growth {phase['rss_growth_mb']} MB, "
+            f"traced growth {phase['traced_growth_mb']} MB: "
+            f"{'passed' if phase['passed'] else 'FAILED'}"
+        )
+        for site in phase["top_growth"]:
+            print(
+                f"    {site['size_diff_kb']:+.1f} KiB "
+                f"({site['count_diff']:+d} blocks) {site['site']}"
+            )
+
+    if not report["passed"]:
+        print(
+            f"Memory grew by more than {config.max_growth_mb} MB:",
+            json.dumps([p["phase"] for p in report["phases"] if not p["passed"]]),
+        )
+        sys.exit(1)
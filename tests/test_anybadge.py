@@ -1,7 +1,9 @@
+import io
 import subprocess
+from contextlib import redirect_stderr
 from pathlib import Path
 from unittest import TestCase
-from anybadge import Badge
+from anybadge import Badge, Style
 from anybadge.cli import main, parse_args
 import sys
 
@@ -259,6 +261,30 @@ class TestAnybadge(TestCase):
         )
         self.assertEqual("orange", badge.badge_color)
 
+    def test_sorted_thresholds_are_shared(self):
+        """Test that badges with the same thresholds convert and sort them once."""
+        from anybadge.badge import _sorted_threshold_items
+
+        thresholds = {"8": "yellow", "2": "red", "4.5": "orange"}
+        _sorted_threshold_items.cache_clear()
+        self.assertEqual("orange", Badge("label", 3, thresholds=thresholds).badge_color)
+        self.assertEqual("red", Badge("label", 1, thresholds=thresholds).badge_color)
+        self.assertEqual("yellow", Badge("label", 5, thresholds=thresholds).badge_color)
+        self.assertEqual(1, _sorted_threshold_items.cache_info().misses)
+
+        # Thresholds are converted to the type of the value, as integers for integer
+        # values, and as semantic versions for semver badges.
+        self.assertEqual(
+            "orange", Badge("label", 4.2, thresholds=thresholds).badge_color
+        )
+        self.assertEqual("yellow", Badge("label", 4, thresholds=thresholds).badge_color)
+        self.assertEqual(
+            "red",
+            Badge(
+                "version", "1.2.0", thresholds={"2.0.0": "red"}, semver=True
+            ).badge_color,
+        )
+
     def test_invalid_color(self):
         with self.assertRaises(ValueError):
             badge = Badge("label", value="fred", default_color="floberry")
@@ -492,3 +518,745 @@ class TestAnybadge(TestCase):
         )
         self.assertEqual(badge.encoded_label, "My > Label")
         self.assertEqual(badge.encoded_value, "My > Value")
+
+    def test_profiling_reports_render_phases(self):
+        """Test that profiling callbacks receive timings for each render phase."""
+        from anybadge import profiling
+
+        with profiling.profile() as aggregator:
+            _ = Badge("pylint", 2.22, thresholds={2: "red", 4: "orange"}).badge_svg_text
+
+        self.assertFalse(profiling.is_enabled())
+        self.assertEqual(list(profiling.PHASES), aggregator.phases)
+        for phase in profiling.PHASES:
+            self.assertEqual(1, aggregator.count(phase))
+        self.assertIn("substitution", aggregator.report())
+
+    def test_profiling_unregistered_callback_not_called(self):
+        """Test that no timings are reported once a callback is unregistered."""
+        from anybadge import profiling
+
+        calls = []
+
+        def callback(phase, duration):
+            calls.append(phase)
+
+        profiling.register(callback)
+        profiling.unregister(callback)
+
+        self.assertFalse(profiling.is_enabled())
+        _ = Badge("label", "value").badge_svg_text
+        self.assertEqual([], calls)
+
+    def test_text_width_cache_reused_across_badges(self):
+        """Test that text widths measured for one badge are reused by other badges."""
+        from anybadge.helpers import text_width_cache
+
+        text_width_cache.clear()
+        first = Badge("coverage", "65%")
+        _ = first.badge_svg_text
+        self.assertEqual(2, text_width_cache.stats["misses"])
+        hits = text_width_cache.stats["hits"]
+
+        second = Badge("coverage", "65%")
+        _ = second.badge_svg_text
+        self.assertEqual(2, text_width_cache.stats["misses"])
+        self.assertGreater(text_width_cache.stats["hits"], hits)
+        self.assertEqual(first.badge_width, second.badge_width)
+
+        # Widths are cached per font size.
+        Badge("coverage", "65%", font_size=12).badge_svg_text
+        self.assertEqual(4, text_width_cache.stats["misses"])
+
+    def test_text_width_cache_resize_and_clear(self):
+        """Test that the text width cache can be resized and cleared."""
+        from anybadge.helpers import TextWidthCache
+
+        cache = TextWidthCache(maxsize=3)
+        for text in ["a", "b", "c", "d"]:
+            cache.get_width(text, "DejaVu Sans,Verdana,Geneva,sans-serif", 11)
+        self.assertEqual(3, len(cache))
+
+        cache.resize(1)
+        self.assertEqual(
+            {"size": 1, "maxsize": 1},
+            {key: cache.stats[key] for key in ["size", "maxsize"]},
+        )
+        self.assertEqual(
+            7, cache.get_width("d", "DejaVu Sans,Verdana,Geneva,sans-serif", 11)
+        )
+        self.assertEqual(1, cache.stats["hits"])
+
+        cache.resize(0)
+        cache.get_width("d", "DejaVu Sans,Verdana,Geneva,sans-serif", 11)
+        self.assertEqual(0, len(cache))
+
+        cache.clear()
+        self.assertEqual(0, cache.stats["hits"] + cache.stats["misses"])
+
+    def test_batch_widths_match_scalar_widths(self):
+        """Test that batch text width measurement matches measuring each string."""
+        import random
+
+        from anybadge import helpers
+
+        rng = random.Random(0)
+        alphabet = "abcxyzQGOMW0123456789 %@|.-_!\\t\"'👍😀✔中é"
+        texts = ["", "pylint", "coverage", "x" * 500] + [
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            for _ in range(2000)
+        ]
+
+        for font_width in [8, 9, 10, 11]:
+            expected = [
+                helpers._get_approx_string_width(text, font_width) for text in texts
+            ]
+            self.assertEqual(
+                expected,
+                helpers.get_approx_string_widths(texts, font_width, use_numpy=False),
+            )
+            if helpers._import_numpy() is not None:
+                self.assertEqual(
+                    expected,
+                    helpers.get_approx_string_widths(texts, font_width, use_numpy=True),
+                )
+
+    def test_import_does_not_load_numpy(self):
+        """Test that NumPy is only imported when many texts are measured."""
+        code = "import sys, anybadge.cli; print('numpy' in sys.modules)"
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(b"False", output.strip())
+
+    def test_text_width_cache_prime(self):
+        """Test that primed text widths are used by badges."""
+        from anybadge.helpers import text_width_cache
+
+        text_width_cache.clear()
+        text_width_cache.prime(
+            ["coverage", "65%"], "DejaVu Sans,Verdana,Geneva,sans-serif", 11
+        )
+        _ = Badge("coverage", "65%").badge_svg_text
+        self.assertEqual(0, text_width_cache.stats["misses"])
+
+    def test_gradient_interpolates_between_stops(self):
+        """Test that a gradient selects colors between its color stops."""
+        from anybadge import Gradient
+
+        gradient = Gradient({0: "#000000", 50: "#FF0000", 100: "#FFFFFF"}, size=101)
+        self.assertEqual("#000000", gradient.color(-10))
+        self.assertEqual("#800000", gradient.color(25))
+        self.assertEqual("#FF0000", gradient.color(50))
+        self.assertEqual("#FF8080", gradient.color(75))
+        self.assertEqual("#FFFFFF", gradient.color(1000))
+        self.assertEqual(101, len(gradient.table))
+
+    def test_gradient_values_out_of_range(self):
+        """Test that infinite and NaN values do not break gradients."""
+        from anybadge import Gradient
+
+        gradient = Gradient({0: "#000000", 100: "#FFFFFF"})
+        self.assertEqual("#000000", gradient.color(float("-inf")))
+        self.assertEqual("#FFFFFF", gradient.color(float("inf")))
+        self.assertEqual("#FFFFFF", gradient.color(float("1e400")))
+        with self.assertRaises(ValueError):
+            gradient.color(float("nan"))
+
+        badge = Badge("coverage", "nan", gradient={0: "red", 100: "green"})
+        self.assertEqual(badge.default_color, badge.badge_color)
+        badge = Badge("coverage", "inf", gradient={0: "red", 100: "green"})
+        self.assertEqual("#44CC11", badge.badge_color)
+
+    def test_gradient_invalid_stops(self):
+        """Test that invalid gradient color stops raise a ValueError."""
+        from anybadge import Gradient
+
+        for stops in [
+            {50: "red"},
+            {50: "red", "50.0": "green"},
+            {0: "nocolor", 1: "red"},
+        ]:
+            with self.assertRaises(ValueError):
+                Gradient(stops)
+        with self.assertRaisesRegex(ValueError, "form '<value>=<color>'"):
+            Gradient.parse("50=red 100")
+
+    def test_invalid_color_message(self):
+        """Test that invalid colors are named in the error message."""
+        from anybadge import Gradient
+        from anybadge.colors import get_color_code
+
+        for color in ["nocolor", ""]:
+            with self.assertRaises(ValueError) as context:
+                get_color_code(color)
+            message = str(context.exception)
+            self.assertTrue(
+                message.startswith(f'Invalid color code "{color.upper()}". '), message
+            )
+            self.assertIn("Valid color codes are: BLACK, NAVY,", message)
+
+        with self.assertRaisesRegex(ValueError, 'Invalid color code "NOCOLOR"'):
+            Gradient({0: "nocolor", 1: "red"})
+
+    def test_badge_with_gradient(self):
+        """Test that a badge selects its color from a gradient."""
+        badge = Badge("coverage", 128, gradient="0=#000000 255=#FFFFFF")
+        self.assertEqual("#808080", badge.badge_color)
+        self.assertIn('fill="#808080"', badge.badge_svg_text)
+        self.assertEqual(
+            "Badge('coverage', 128, gradient={'0': '#000000', '255': '#FFFFFF'})",
+            repr(badge),
+        )
+
+        # Values that are not numbers use the default color.
+        badge = Badge("coverage", "n/a", gradient={50: "red", 100: "green"})
+        self.assertEqual(badge.default_color, badge.badge_color)
+
+        with self.assertRaises(ValueError):
+            Badge(
+                "coverage",
+                75,
+                thresholds={50: "red"},
+                gradient={50: "red", 100: "green"},
+            )
+
+    def test_main_gradient(self):
+        """Test the command line options for gradients."""
+        from anybadge import Gradient
+
+        output = sh.anybadge("--value=128", "--gradient", "0=#000000", "255=#FFFFFF")
+        self.assertIn('fill="#808080"', output)
+
+        output = sh.anybadge("--value=75", "--gradient", "coverage")
+        color = Gradient.parse(Style.COVERAGE.gradient).color(75)
+        self.assertIn(f'fill="{color}"', output)
+        self.assertIn(">coverage<", output)
+
+        for stops in [["50=red", "100"], ["50=red"]]:
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()) as err:
+                main(["--value=75", "--gradient", *stops])
+            self.assertIn("invalid --gradient color stops", err.getvalue())
+
+    def test_template_only_computes_used_placeholders(self):
+        """Test that values of placeholders not in the template are not computed."""
+
+        class ShadowlessBadge(Badge):
+            @property
+            def label_anchor_shadow(self):
+                raise AssertionError("Shadow position computed.")
+
+        badge = ShadowlessBadge("label", "value", style="gitlab-scoped")
+        self.assertNotIn("{{", badge.badge_svg_text)
+
+        # Templates with one line are file names, so use two lines.
+        badge = ShadowlessBadge("label", "value", template="{{ label }}\n{{ value }}")
+        self.assertEqual("label\nvalue", badge.badge_svg_text)
+
+    def test_template_unknown_placeholder(self):
+        """Test that a template with an unknown placeholder fails to load."""
+        from anybadge.exceptions import UnknownTemplatePlaceholder
+
+        badge = Badge("label", "value", template="<svg>\n{{ label }}{{ colour }}</svg>")
+        with self.assertRaisesRegex(UnknownTemplatePlaceholder, r"\{\{ colour \}\}"):
+            _ = badge.badge_svg_text
+
+    def test_template_placeholders_have_values(self):
+        """Test that every known template placeholder has a value."""
+        from anybadge.templates import PLACEHOLDERS
+
+        self.assertEqual(
+            PLACEHOLDERS,
+            {"color"}
+            | Badge._WIDTH_PLACEHOLDERS.keys()
+            | Badge._TEXT_PLACEHOLDERS.keys(),
+        )
+
+    COBERTURA_REPORT = b"""<?xml version="1.0" ?>
+<coverage version="7.4" xmlns="http://cobertura.sourceforge.net">
+    <packages>
+        <package name="app">
+            <classes>
+                <class name="a.py" filename="app/a.py">
+                    <methods>
+                        <method name="run"><lines><line number="1" hits="0"/></lines></method>
+                    </methods>
+                    <lines>
+                        <line number="1" hits="0"/>
+                        <line number="2" hits="3"/>
+                        <line number="3" hits="1"/>
+                        <line number="4" hits="1"/>
+                    </lines>
+                </class>
+            </classes>
+        </package>
+        <package name="app.lib">
+            <classes>
+                <class name="b.py" filename="app/lib/b.py">
+                    <lines><line number="1" hits="0"/></lines>
+                </class>
+            </classes>
+        </package>
+    </packages>
+</coverage>
+"""
+
+    def test_read_cobertura(self):
+        """Test reading the coverage of a Cobertura report without summary rates."""
+        import io
+
+        from anybadge.ingest import read_cobertura
+
+        report = read_cobertura(io.BytesIO(self.COBERTURA_REPORT), packages=True)
+        self.assertEqual(60.0, report.percent)
+        self.assertEqual({"app": 75.0, "app.lib": 0.0}, report.packages)
+        self.assertEqual({}, read_cobertura(io.BytesIO(self.COBERTURA_REPORT)).packages)
+
+        with self.assertRaises(ValueError):
+            read_cobertura(io.BytesIO(b"<html><body/></html>"))
+        with self.assertRaises(ValueError):
+            read_cobertura(io.BytesIO(b"<coverage><packages>"))
+
+    def test_read_coverage_json(self):
+        """Test reading the coverage of a coverage.py JSON report as a stream."""
+        import io
+        import json
+
+        from anybadge.ingest import read_coverage_json
+        from anybadge.ingest.jsonstream import JsonStream
+
+        files = {
+            f"pkg{i % 3}/module_{i}.py": {
+                "executed_lines": list(range(i % 10)),
+                "summary": {"covered_lines": i % 10, "num_statements": 10},
+            }
+            for i in range(30)
+        }
+        text = json.dumps({"meta": {"version": "7.4"}, "files": files})
+
+        report = read_coverage_json(io.StringIO(text), packages=True)
+        self.assertEqual(45.0, report.percent)
+        self.assertEqual({"pkg0": 45.0, "pkg1": 45.0, "pkg2": 45.0}, report.packages)
+
+        # Values split across reads are put back together.
+        stream = JsonStream(io.StringIO(text), chunk_size=7)
+        values = {key: stream.value() for key in stream.items()}
+        self.assertEqual(json.loads(text), values)
+
+        # Numbers are not cut short at the end of a chunk, whatever the chunk size.
+        text = (
+            '{"a": 1.5, "b": -2e+10, "c": [1e5, 0.25, 100], '
+            '"d": {"x": true, "y": null}, "e": "1.5", "f": 12345}'
+        )
+        for chunk_size in range(1, len(text) + 1):
+            stream = JsonStream(io.StringIO(text), chunk_size=chunk_size)
+            values = {key: stream.value() for key in stream.items()}
+            self.assertEqual(json.loads(text), values, chunk_size)
+
+        with self.assertRaises(ValueError):
+            read_coverage_json(io.StringIO('{"files": [1, 2]}'))
+        with self.assertRaises(ValueError):
+            read_coverage_json(io.StringIO('{"files": {'))
+
+    def test_coverage_badges(self):
+        """Test creating coverage badges from a coverage report."""
+        from anybadge.ingest import CoverageReport, coverage_badge, coverage_badges
+
+        badge = coverage_badge(87.5)
+        self.assertEqual("87.5%", badge.value_text)
+        self.assertEqual("green", badge.badge_color)
+        self.assertEqual(
+            Badge("coverage", 87.5, gradient=Style.COVERAGE.gradient).badge_color,
+            coverage_badge(87.5, gradient=True).badge_color,
+        )
+
+        badges = coverage_badges(CoverageReport(50, {"app": 100.0, "lib": 33.333}))
+        self.assertEqual(["app", "lib"], [badge.label for badge in badges.values()])
+        self.assertEqual("33.33%", badges["lib"].value_text)
+
+    def test_main_coverage_report(self):
+        """Test the command line options for coverage reports."""
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as directory:
+            report = Path(directory) / "coverage.xml"
+            report.write_bytes(self.COBERTURA_REPORT)
+            packages = Path(directory) / "packages"
+
+            output = sh.anybadge(
+                f"--coverage-report={report}", f"--coverage-packages={packages}"
+            )
+            self.assertIn(">coverage<", output)
+            self.assertIn(">60%<", output)
+            self.assertEqual(
+                ["app.lib.svg", "app.svg"], sorted(p.name for p in packages.iterdir())
+            )
+            self.assertIn(">75%<", (packages / "app.svg").read_text())
+
+            output = sh.anybadge(
+                f"--coverage-report={report}", "--label=cov", "50=red", "100=green"
+            )
+            self.assertIn(">cov<", output)
+            self.assertIn('fill="#4C1"', output)
+
+            self.assertEqual(1, main([f"--coverage-report={directory}/missing.xml"]))
+
+            # Existing package badges are not overwritten without --overwrite.
+            self.assertEqual(
+                1,
+                main(
+                    [f"--coverage-report={report}", f"--coverage-packages={packages}"]
+                ),
+            )
+
+            # Packages whose names differ only in unsafe characters are rejected.
+            json_report = Path(directory) / "coverage.json"
+            json_report.write_text(
+                '{"files": {'
+                '"app lib/a.py": {"summary": {"covered_lines": 1, "num_statements": 2}}, '
+                '"app/lib/b.py": {"summary": {"covered_lines": 2, "num_statements": 2}}'
+                "}}"
+            )
+            collisions = Path(directory) / "collisions"
+            self.assertEqual(
+                1,
+                main(
+                    [
+                        f"--coverage-report={json_report}",
+                        f"--coverage-packages={collisions}",
+                    ]
+                ),
+            )
+            self.assertFalse(collisions.exists())
+
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()) as err:
+                main(["--value=75", f"--coverage-packages={packages}"])
+            self.assertIn(
+                "--coverage-packages requires --coverage-report", err.getvalue()
+            )
+
+    JUNIT_REPORT = b"""<?xml version="1.0" encoding="utf-8"?>
+<testsuites>
+    <testsuite name="pytest" tests="5" failures="1" errors="1" skipped="1">
+        <testcase classname="test_a" name="test_pass"/>
+        <testcase classname="test_a" name="test_fail">
+            <failure message="assert 1 == 2">Traceback</failure>
+        </testcase>
+        <testcase classname="test_a" name="test_error"><error message="boom"/></testcase>
+        <testcase classname="test_a" name="test_skip"><skipped message="later"/></testcase>
+        <testcase classname="test_a" name="test_pass_with_output">
+            <system-out>output</system-out>
+        </testcase>
+    </testsuite>
+    <testsuite name="nested">
+        <testsuite name="inner">
+            <testcase classname="test_b" name="test_pass"/>
+        </testsuite>
+    </testsuite>
+</testsuites>
+"""
+
+    def test_read_junit(self):
+        """Test counting the test cases of a JUnit report."""
+        import io
+
+        from anybadge.ingest import read_junit
+
+        results = read_junit(io.BytesIO(self.JUNIT_REPORT))
+        self.assertEqual((6, 2, 1), results)
+        self.assertEqual(3, results.passed)
+
+        with self.assertRaises(ValueError):
+            read_junit(io.BytesIO(b"<coverage/>"))
+        with self.assertRaises(ValueError):
+            read_junit(io.BytesIO(b"<testsuite><testcase>"))
+
+    def test_junit_badge(self):
+        """Test creating test results badges."""
+        from anybadge.ingest import TestResults, junit_badge
+
+        badge = junit_badge(TestResults(6, 2, 1))
+        self.assertEqual("tests", badge.label)
+        self.assertEqual("3 passed, 2 failed, 1 skipped", badge.value_text)
+        self.assertEqual("red", badge.badge_color)
+
+        badge = junit_badge(TestResults(6, 0, 0))
+        self.assertEqual("6 passed, 0 failed", badge.value_text)
+        self.assertEqual("green", badge.badge_color)
+
+        badge = junit_badge(TestResults(6, 2, 0), thresholds={1: "green", 5: "orange"})
+        self.assertEqual("orange", badge.badge_color)
+
+    def test_main_junit_report(self):
+        """Test the command line options for JUnit reports."""
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as directory:
+            report = Path(directory) / "junit.xml"
+            report.write_bytes(self.JUNIT_REPORT)
+
+            output = sh.anybadge(f"--junit-report={report}")
+            self.assertIn(">tests<", output)
+            self.assertIn(">3 passed, 2 failed, 1 skipped<", output)
+            self.assertIn('fill="#E05D44"', output)
+
+            output = sh.anybadge(
+                f"--junit-report={report}", "--label=pytest", "1=green", "3=yellow"
+            )
+            self.assertIn(">pytest<", output)
+            self.assertIn('fill="#DFB317"', output)
+
+            self.assertEqual(1, main([f"--junit-report={directory}"]))
+
+    def _write_watch_manifest(self, directory: Path) -> Path:
+        manifest = directory / "badges.json"
+        manifest.write_text(
+            """{"badges": [
+                {"file": "out/pylint.svg", "source": "metrics.json", "key": "lint.score",
+                 "style": "pylint"},
+                {"file": "out/version.svg", "source": "version.txt", "label": "version",
+                 "color": "blue"},
+                {"file": "out/tests.svg", "source": "junit.xml", "type": "junit"}
+            ]}"""
+        )
+        (directory / "metrics.json").write_text('{"lint": {"score": 9.5}}')
+        (directory / "version.txt").write_text("1.2.3\n")
+        (directory / "junit.xml").write_bytes(self.JUNIT_REPORT)
+        return manifest
+
+    def test_watch_manifest(self):
+        """Test reading the badge specifications of a watch manifest."""
+        import tempfile
+
+        from anybadge.watch import create_badge, parse_spec, read_manifest
+
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = self._write_watch_manifest(Path(directory))
+            specs = read_manifest(manifest)
+            self.assertEqual(Path(directory) / "out" / "pylint.svg", specs[0].file)
+            self.assertEqual(
+                ["9.5", "1.2.3", "3 passed, 2 failed, 1 skipped"],
+                [create_badge(spec).value_text for spec in specs],
+            )
+            self.assertEqual("green", create_badge(specs[0]).badge_color)
+
+        spec = parse_spec(
+            {"file": "a.svg", "source": "a.txt", "style": "coverage", "gradient": True}
+        )
+        self.assertEqual(
+            {"50": "red", "70": "orange", "85": "yellow", "100": "green"},
+            spec.options["gradient"],
+        )
+        for data in [
+            {"file": "a.svg"},
+            {"file": "a.svg", "source": "a.txt", "colour": "red"},
+            {"file": "a.svg", "source": "a.txt", "type": "pylint"},
+            {"file": "a.svg", "source": "a.txt", "style": "nostyle"},
+            {"file": "a.svg", "source": "a.txt", "thresholds": "2=red 4"},
+        ]:
+            with self.assertRaises(ValueError):
+                parse_spec(data)
+
+    def _check_badge_watcher(self, use_inotify: bool):
+        import os
+        import tempfile
+
+        from anybadge.watch import BadgeWatcher, read_manifest
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            directory = Path(temp_dir)
+            watcher = BadgeWatcher(
+                read_manifest(self._write_watch_manifest(directory)),
+                interval=0.05,
+                debounce=0.05,
+                use_inotify=use_inotify,
+            )
+            try:
+                self.assertEqual(3, len(watcher.start()))
+                self.assertEqual([], watcher.poll(timeout=0.05))
+
+                # A burst of writes to one file rewrites only its badge, once.
+                for value in ("1.2.4", "1.3.0", "2.0.0"):
+                    (directory / "version.txt").write_text(value)
+                written = watcher.poll(timeout=1)
+                self.assertEqual(["version.svg"], [spec.file.name for spec in written])
+                self.assertIn(">2.0.0<", (directory / "out/version.svg").read_text())
+
+                # Files replaced by renaming are seen too.
+                (directory / "metrics.tmp").write_text('{"lint": {"score": 3}}')
+                os.replace(directory / "metrics.tmp", directory / "metrics.json")
+                written = watcher.poll(timeout=1)
+                self.assertEqual(["pylint.svg"], [spec.file.name for spec in written])
+                self.assertIn(">3<", (directory / "out/pylint.svg").read_text())
+
+                # Unreadable sources keep their last badge, and unchanged values
+                # are not rewritten.
+                (directory / "metrics.json").write_text("{")
+                self.assertEqual([], watcher.poll(timeout=1))
+                self.assertIn(">3<", (directory / "out/pylint.svg").read_text())
+                (directory / "version.txt").write_text("2.0.0")
+                self.assertEqual([], watcher.poll(timeout=1))
+            finally:
+                watcher.close()
+
+    def test_badge_watcher_polling(self):
+        """Test rewriting badges when their sources change, by polling."""
+        self._check_badge_watcher(use_inotify=False)
+
+    def test_badge_watcher_inotify(self):
+        """Test rewriting badges when their sources change, with inotify."""
+        from anybadge.watch import InotifyWatcher, get_watcher
+
+        try:
+            get_watcher([TESTS_DIR / "test_anybadge.py"], use_inotify=True).close()
+        except OSError:
+            self.skipTest("inotify is not available.")
+        self._check_badge_watcher(use_inotify=True)
+        self.assertIsInstance(
+            get_watcher([TESTS_DIR / "test_anybadge.py"]), InotifyWatcher
+        )
+
+    def test_badge_watcher_write_error(self):
+        """Test that badges that can not be written do not stop the watcher."""
+        import tempfile
+
+        from anybadge.watch import BadgeWatcher, read_manifest
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            directory = Path(temp_dir)
+            specs = read_manifest(self._write_watch_manifest(directory))
+            # The directory of the version badge is a file, so it can not be written.
+            (directory / "blocked").write_text("")
+            specs[1] = specs[1]._replace(file=directory / "blocked" / "version.svg")
+            watcher = BadgeWatcher(
+                specs, interval=0.05, debounce=0.05, use_inotify=False
+            )
+            try:
+                with self.assertLogs("anybadge.watch", level="WARNING") as logs:
+                    written = watcher.start()
+                self.assertEqual(
+                    ["pylint.svg", "tests.svg"], [spec.file.name for spec in written]
+                )
+                self.assertIn("Failed to write", logs.output[0])
+
+                # The badge is written once its directory can be created.
+                (directory / "blocked").unlink()
+                (directory / "version.txt").write_text("1.2.4")
+                written = watcher.poll(timeout=1)
+                self.assertEqual(["version.svg"], [spec.file.name for spec in written])
+                self.assertIn(">1.2.4<", specs[1].file.read_text())
+            finally:
+                watcher.close()
+
+    def test_main_watch_once(self):
+        """Test writing the badges of a manifest from the command line."""
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = self._write_watch_manifest(Path(directory))
+            sh.anybadge("watch", "--once", str(manifest))
+            self.assertEqual(
+                ["pylint.svg", "tests.svg", "version.svg"],
+                sorted(p.name for p in (Path(directory) / "out").iterdir()),
+            )
+            self.assertEqual(1, main(["watch", f"{directory}/missing.json"]))
+
+    def test_write_archive(self):
+        """Test writing badges into tar and zip archives with an index."""
+        import json
+        import tarfile
+        import tempfile
+        import zipfile
+
+        from anybadge.archive import BadgeArchive, write_archive
+
+        badges = {
+            "coverage": Badge("coverage", 97, thresholds={50: "red", 100: "green"}),
+            "packages/app": Badge("app", "93%"),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("badges.tar", "badges.tar.gz", "badges.tgz"):
+                index = write_archive(Path(directory) / name, badges)
+                with tarfile.open(Path(directory) / name) as tar_file:
+                    self.assertEqual(
+                        ["coverage.svg", "packages/app.svg", "index.json"],
+                        tar_file.getnames(),
+                    )
+                    self.assertEqual(
+                        {"badges": index},
+                        json.load(tar_file.extractfile("index.json")),
+                    )
+                    svg = tar_file.extractfile("coverage.svg").read().decode()
+            self.assertIn(">97<", svg)
+            self.assertEqual(
+                {
+                    "file": "coverage.svg",
+                    "label": "coverage",
+                    "value": "97",
+                    "color": "#4C1",
+                },
+                index["coverage"],
+            )
+
+            path = Path(directory) / "badges.zip"
+            write_archive(path, badges.items())
+            with zipfile.ZipFile(path) as zip_file:
+                self.assertIsNone(zip_file.testzip())
+                self.assertIn(">93%<", zip_file.read("packages/app.svg").decode())
+
+            with self.assertRaises(RuntimeError):
+                write_archive(path, badges)
+            with self.assertRaises(ValueError):
+                write_archive(Path(directory) / "badges.rar", badges)
+
+            # An archive that fails part way through is removed.
+            for name in ("../escape", "coverage.svg"):
+                with self.assertRaises(ValueError):
+                    write_archive(
+                        Path(directory) / "bad.zip",
+                        [("coverage", Badge("a", "b")), (name, Badge("a", "b"))],
+                    )
+                self.assertFalse((Path(directory) / "bad.zip").exists())
+
+            with BadgeArchive(Path(directory) / "empty.tar") as archive:
+                pass
+            self.assertEqual({}, archive.index)
+
+    def test_main_archive(self):
+        """Test the command line options for writing archives."""
+        import json
+        import tarfile
+        import tempfile
+        import zipfile
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            directory = Path(temp_dir)
+            manifest = self._write_watch_manifest(directory)
+            sh.anybadge("archive", str(manifest), str(directory / "badges.tar.gz"))
+            with tarfile.open(directory / "badges.tar.gz") as tar_file:
+                index = json.load(tar_file.extractfile("index.json"))["badges"]
+            self.assertEqual(["out/pylint", "out/version", "out/tests"], list(index))
+            self.assertEqual("9.5", index["out/pylint"]["value"])
+            self.assertEqual(
+                1, main(["archive", str(manifest), str(directory / "badges.tar.gz")])
+            )
+
+            report = directory / "coverage.xml"
+            report.write_bytes(self.COBERTURA_REPORT)
+            sh.anybadge(
+                f"--coverage-report={report}",
+                f"--coverage-packages={directory / 'packages.zip'}",
+            )
+            with zipfile.ZipFile(directory / "packages.zip") as zip_file:
+                self.assertEqual(
+                    ["app.svg", "app.lib.svg", "index.json"], zip_file.namelist()
+                )
+
+            # Existing archives are not overwritten without --overwrite.
+            self.assertEqual(
+                1,
+                main(
+                    [
+                        f"--coverage-report={report}",
+                        f"--coverage-packages={directory / 'packages.zip'}",
+                    ]
+                ),
+            )
@@ -1,8 +1,54 @@
+import asyncio
+import gzip
+import io
+import json
+import logging
+import socket
 import subprocess
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
 import time
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
 
 import requests  # type: ignore
-from unittest import TestCase
+from unittest import TestCase, mock
+
+from anybadge.server.app import AnyBadgeApp, Request
+from anybadge.server.asgi import ASGIApplication
+from anybadge.server.cache import RenderCache, SQLiteCache
+from anybadge.server import config as server_config
+from anybadge.server.logs import JsonFormatter, log_access
+from anybadge.server.prewarm import PrewarmThread, prewarm
+from anybadge.server.render import (
+    BadgeParams,
+    LimitExceeded,
+    params_from_spec,
+    render_svg,
+)
+from anybadge.server.routes import badge_path, split_spec
+from anybadge.server.request_handler import (
+    AnyBadgeHTTPRequestHandler,
+    AnyBadgeHTTPServer,
+)
+from anybadge.server.static import StaticFiles
+from anybadge.server.store import BadgeStore, SQLiteBadgeStore
+from anybadge.server.wsgi import WSGIApplication
+from anybadge.server.thresholds import get_thresholds, parse_thresholds
+
+
+def wait_for_server(port: int, timeout: float = 10.0) -> None:
+    """Wait until a server is accepting connections on a local port."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
 
 
 class TestAnybadgeServer(TestCase):
@@ -16,10 +62,11 @@ class TestAnybadgeServer(TestCase):
             stderr=subprocess.PIPE,
             stdout=subprocess.PIPE,
         )
-        time.sleep(1)
+        wait_for_server(8000)
 
     def tearDown(self) -> None:
         self.proc.kill()
+        self.proc.wait()
 
     def test_server_is_running(self):
         """Test that the server is running."""
@@ -51,3 +98,948 @@ class TestAnybadgeServer(TestCase):
         )
         output_script = subprocess.check_output(["anybadge-server", "--help"])
         self.assertEqual(output_module, output_script)
+
+    def test_server_badge_request_with_thresholds(self):
+        """Test that thresholds passed in the URL select the badge color."""
+        url = "http://127.0.0.1:8000/?label=pylint&value=2.22&thresholds=2=red%204=orange%208=yellow"
+        response = requests.get(url)
+        self.assertTrue(response.ok)
+        self.assertIn(b'fill="#FE7D37"', response.content)
+
+    def test_server_badge_request_with_style(self):
+        """Test that a named style provides the thresholds and label."""
+        url = "http://127.0.0.1:8000/?style=coverage&value=45"
+        response = requests.get(url)
+        self.assertTrue(response.ok)
+        self.assertIn(b">coverage<", response.content)
+        self.assertIn(b">45%<", response.content)
+        self.assertIn(b'fill="#E05D44"', response.content)
+
+    def test_server_badge_request_with_invalid_thresholds(self):
+        """Test that invalid thresholds are rejected."""
+        url = "http://127.0.0.1:8000/?label=pylint&value=2.22&thresholds=2red"
+        response = requests.get(url)
+        self.assertEqual(400, response.status_code)
+
+    def test_server_query_request_redirects_to_path(self):
+        """Test that query string badge requests redirect to the canonical path."""
+        url = "http://127.0.0.1:8000/?label=build%20status&value=passing&color=green"
+        response = requests.get(url, allow_redirects=False)
+        self.assertEqual(301, response.status_code)
+        self.assertEqual(
+            "/badge/build_status-passing-green.svg", response.headers["Location"]
+        )
+
+        url = (
+            "http://127.0.0.1:8000/?label=pylint&value=2.22&thresholds=4=orange%202=red"
+        )
+        response = requests.get(url, allow_redirects=False)
+        self.assertEqual(
+            "/thresholds/2=red,4=orange/pylint-2.22.svg", response.headers["Location"]
+        )
+
+    def test_server_query_request_redirect_keeps_parameters(self):
+        """Test that parameters the path can not hold are kept in the redirect."""
+        url = "http://127.0.0.1:8000/?style=pylint&value=a&color=purple&v=2"
+        response = requests.get(url, allow_redirects=False)
+        self.assertEqual(301, response.status_code)
+        self.assertEqual(
+            "/style/pylint/a.svg?color=purple&v=2", response.headers["Location"]
+        )
+
+        response = requests.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertIn(b'fill="#800080"', response.content)
+
+    def test_server_path_badge_request(self):
+        """Test that badges can be requested using a path."""
+        url = "http://127.0.0.1:8000/badge/my--project-110%25-red.svg"
+        response = requests.get(url, allow_redirects=False)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("image/svg+xml", response.headers["Content-Type"])
+        self.assertIn(b">my-project<", response.content)
+        self.assertIn(b">110%<", response.content)
+        self.assertIn(b'fill="#E05D44"', response.content)
+
+    def test_server_path_style_request(self):
+        """Test that styled badges can be requested using a path."""
+        url = "http://127.0.0.1:8000/style/pylint/9.5.svg"
+        response = requests.get(url, allow_redirects=False)
+        self.assertEqual(200, response.status_code)
+        self.assertIn(b">pylint<", response.content)
+
+    def test_server_unknown_path(self):
+        """Test that unknown paths are not found."""
+        for path in ["/unknown", "/badge/a-b-c-d.svg", "/favicon.ico"]:
+            response = requests.get("http://127.0.0.1:8000" + path)
+            self.assertIn(response.status_code, (400, 404))
+
+    def test_server_push_badge(self):
+        """Test that badges can be pushed to the server and served from the store."""
+        url = "http://127.0.0.1:8000/badges/coverage"
+        response = requests.put(url, json={"value": 45, "style": "coverage"})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("/badges/coverage.svg", response.json()["path"])
+
+        response = requests.get("http://127.0.0.1:8000/badges/coverage.svg")
+        self.assertEqual(200, response.status_code)
+        self.assertIn(b">45%<", response.content)
+
+        response = requests.get("http://127.0.0.1:8000/badges/missing.svg")
+        self.assertEqual(404, response.status_code)
+
+    def test_server_push_badges_bulk(self):
+        """Test that many badges can be pushed in one request."""
+        url = "http://127.0.0.1:8000/badges"
+        specs = {
+            "build": {"label": "build", "value": "passing", "color": "green"},
+            "pylint": {"label": "pylint", "value": 3, "thresholds": "2=red 4=orange"},
+        }
+        response = requests.post(url, json=specs)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(["build", "pylint"], response.json()["updated"])
+
+        response = requests.get("http://127.0.0.1:8000/badges/pylint.svg")
+        self.assertIn(b'fill="#FE7D37"', response.content)
+
+        response = requests.post(url, json={"bad": {"label": "x"}})
+        self.assertEqual(400, response.status_code)
+
+
+class TestAnybadgeServerWorkers(TestCase):
+    """Test case class for running the anybadge server with worker processes."""
+
+    def setUp(self):
+        self.proc = subprocess.Popen(
+            [
+                "anybadge-server",
+                "-p",
+                "8001",
+                "--listen-address",
+                "127.0.0.1",
+                "--workers",
+                "2",
+            ],
+            stderr=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        wait_for_server(8001)
+
+    def tearDown(self) -> None:
+        # Stop gracefully, so that the supervisor stops its workers too.
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+    def test_workers_serve_requests_and_stop_on_sigterm(self):
+        """Test that workers serve badges, and that the server stops gracefully."""
+        for _ in range(5):
+            response = requests.get("http://127.0.0.1:8001/badge/build-passing.svg")
+            self.assertEqual(200, response.status_code)
+
+        self.proc.terminate()
+        self.assertEqual(0, self.proc.wait(timeout=10))
+
+    def test_workers_share_pushed_badges(self):
+        """Test that a badge pushed to one worker is served by every worker."""
+        url = "http://127.0.0.1:8001/badges/build"
+        response = requests.put(url, json={"label": "build", "value": "passing"})
+        self.assertEqual(200, response.status_code)
+
+        # Each request uses a new connection, so requests are spread over the workers.
+        for _ in range(20):
+            response = requests.get(url + ".svg")
+            self.assertEqual(200, response.status_code)
+            self.assertIn(b">passing<", response.content)
+
+
+class TestAnybadgeServerStatic(TestCase):
+    """Test case class for serving a directory of pre-rendered badges."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        Path(self.directory.name, "badge").mkdir()
+        Path(self.directory.name, "badge", "build-passing.svg").write_text("<svg/>")
+        Path(self.directory.name, "coverage.svgz").write_bytes(gzip.compress(b"<svg/>"))
+        self.proc = subprocess.Popen(
+            [
+                "anybadge-server",
+                "-p",
+                "8002",
+                "--listen-address",
+                "127.0.0.1",
+                "--static-dir",
+                self.directory.name,
+            ],
+            stderr=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        wait_for_server(8002)
+
+    def tearDown(self) -> None:
+        self.proc.kill()
+        self.proc.wait()
+        self.directory.cleanup()
+
+    def test_static_badge(self):
+        """Test that a pre-rendered badge is served from the directory."""
+        response = requests.get("http://127.0.0.1:8002/badge/build-passing.svg")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("image/svg+xml", response.headers["Content-Type"])
+        self.assertEqual(b"<svg/>", response.content)
+
+    def test_compressed_static_badge(self):
+        """Test that a gzipped badge is served with a gzip content encoding."""
+        response = requests.get("http://127.0.0.1:8002/coverage.svg")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("gzip", response.headers["Content-Encoding"])
+        self.assertEqual(b"<svg/>", response.content)
+
+    def test_missing_static_badge_is_rendered(self):
+        """Test that badges without a file are rendered."""
+        response = requests.get("http://127.0.0.1:8002/badge/build-failing-red.svg")
+        self.assertEqual(200, response.status_code)
+        self.assertIn(b">failing<", response.content)
+
+
+class TestStaticFiles(TestCase):
+    """Test case class for the static badge file cache."""
+
+    def test_changed_file_is_reopened(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, "build.svg")
+            path.write_text("<svg>passing</svg>")
+            static = StaticFiles(directory, stat_ttl=0)
+            first = static.lookup("/build.svg")
+            self.assertIs(first, static.lookup("/build.svg"))
+
+            path.write_text("<svg>failing</svg>!")
+            self.assertEqual(b"<svg>failing</svg>!", static.lookup("/build.svg").read())
+
+            path.unlink()
+            self.assertIsNone(static.lookup("/build.svg"))
+
+    def test_files_are_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, "build.svg")
+            path.write_text("<svg/>")
+            static = StaticFiles(directory, stat_ttl=60)
+            self.assertIsNotNone(static.lookup("/build.svg"))
+            path.unlink()
+            self.assertIsNotNone(static.lookup("/build.svg"))
+
+    def test_paths_outside_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            static = StaticFiles(directory)
+            for path in ["/../x.svg", "/a/../../x.svg", "/%2e%2e/x.svg", "/x.txt"]:
+                self.assertIsNone(static.relative_path(path))
+
+
+class TestRenderCache(TestCase):
+    """Test case class for the caches of rendered badges."""
+
+    def test_persistent_cache_is_kept(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = Path(directory) / "cache.db"
+            params = BadgeParams("build", "passing")
+            svg = RenderCache(persistent=SQLiteCache(cache_file)).render(params)
+
+            persistent = SQLiteCache(cache_file)
+            self.assertEqual(1, len(persistent))
+            self.assertEqual(svg, RenderCache(persistent=persistent).render(params))
+
+    def test_equivalent_params_share_an_entry(self):
+        cache = RenderCache()
+        cache.render(BadgeParams("build", "passing"))
+        cache.render(BadgeParams("build", "passing", "green"))
+        self.assertEqual(1, len(cache.memory))
+
+    def test_least_recently_used_are_evicted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SQLiteCache(Path(directory) / "cache.db", 2, evict_interval=1)
+            cache.set("a", b"a")
+            cache.set("b", b"b")
+            cache.get("a")
+            cache.set("c", b"c")
+            self.assertEqual(2, len(cache))
+            self.assertIsNone(cache.get("b"))
+            self.assertEqual(b"a", cache.get("a"))
+
+    def test_concurrent_misses_are_coalesced(self):
+        cache = RenderCache()
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_render(params):
+            started.set()
+            release.wait(5)
+            return b"<svg/>"
+
+        results = []
+        with mock.patch("anybadge.server.cache.render_svg", side_effect=slow_render):
+            params = BadgeParams("build", "passing")
+            threads = [
+                threading.Thread(target=lambda: results.append(cache.render(params)))
+                for _ in range(5)
+            ]
+            threads[0].start()
+            started.wait(5)
+            for thread in threads[1:]:
+                thread.start()
+            while cache.stats["coalesced"] < 4:
+                time.sleep(0.01)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual([b"<svg/>"] * 5, results)
+        self.assertEqual(1, cache.stats["renders"])
+        self.assertEqual(4, cache.stats["coalesced"])
+
+    def test_failed_render_is_not_left_in_flight(self):
+        cache = RenderCache()
+        with mock.patch(
+            "anybadge.server.cache.render_svg", side_effect=ValueError("bad")
+        ):
+            with self.assertRaises(ValueError):
+                cache.render(BadgeParams("build", "passing"))
+        self.assertEqual({}, cache._flights)
+
+
+class BlockingApp(AnyBadgeApp):
+    """Application that blocks requests until it is released."""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def handle(self, request):
+        self.entered.set()
+        self.release.wait(5)
+        return super().handle(request)
+
+
+class TestServerAdmissionControl(TestCase):
+    """Test case class for server timeouts and load shedding."""
+
+    def start_server(self, app=None, **kwargs):
+        server = AnyBadgeHTTPServer(
+            ("127.0.0.1", 0), AnyBadgeHTTPRequestHandler, app=app, **kwargs
+        )
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+
+        self.addCleanup(stop)
+        return server
+
+    def connect(self, server, request=b"GET /badge/a-b.svg HTTP/1.0\r\n\r\n"):
+        connection = socket.create_connection(server.server_address, timeout=5)
+        self.addCleanup(connection.close)
+        if request:
+            connection.sendall(request)
+        return connection
+
+    @staticmethod
+    def read_response(connection):
+        data = b""
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                return data
+            data += chunk
+
+    def test_busy_server_responds_with_503(self):
+        app = BlockingApp()
+        self.addCleanup(app.release.set)
+        server = self.start_server(app, threads=1, queue_size=1)
+
+        handled = self.connect(server)
+        self.assertTrue(app.entered.wait(5))
+        queued = self.connect(server)
+        rejected = self.connect(server)
+
+        response = self.read_response(rejected)
+        self.assertTrue(response.startswith(b"HTTP/1.0 503 "))
+        self.assertIn(b"Retry-After: 1\r\n", response)
+        self.assertEqual(1, app.counters["rejected_busy"])
+
+        app.release.set()
+        self.assertIn(b" 200 ", self.read_response(handled))
+        self.assertIn(b" 200 ", self.read_response(queued))
+
+    def test_idle_connection_is_closed(self):
+        server = self.start_server(header_timeout=0.2)
+        connection = self.connect(server, request=b"")
+        start = time.monotonic()
+        self.assertEqual(b"", self.read_response(connection))
+        self.assertLess(time.monotonic() - start, 4)
+
+    def test_incomplete_headers_time_out(self):
+        server = self.start_server(header_timeout=0.2)
+        connection = self.connect(server, request=b"GET / HTTP/1.0\r\n")
+        self.assertTrue(self.read_response(connection).startswith(b"HTTP/1.0 408 "))
+        self.assertEqual(1, server.app.counters["header_timeouts"])
+
+    def test_slow_headers_time_out(self):
+        server = self.start_server(header_timeout=0.5)
+        connection = self.connect(server, request=b"GET / HTTP/1.0\r\n")
+        # Each header arrives well within the timeout, but the headers as a whole
+        # take longer than it.
+        try:
+            for i in range(10):
+                time.sleep(0.1)
+                connection.sendall(b"X-Header-%d: 1\r\n" % i)
+            connection.sendall(b"\r\n")
+        except OSError:
+            pass
+        self.assertTrue(self.read_response(connection).startswith(b"HTTP/1.0 408 "))
+        self.assertEqual(1, server.app.counters["header_timeouts"])
+
+    def test_slow_body_times_out(self):
+        server = self.start_server(body_timeout=0.2)
+        connection = self.connect(
+            server,
+            request=b"PUT /badges/build HTTP/1.0\r\nContent-Length: 100\r\n\r\n{",
+        )
+        self.assertTrue(self.read_response(connection).startswith(b"HTTP/1.0 408 "))
+        self.assertEqual(1, server.app.counters["body_timeouts"])
+
+
+class TestServerLogging(TestCase):
+    """Test case class for server logging."""
+
+    def tearDown(self):
+        server_config.ACCESS_LOG_SAMPLE_RATE = 1.0
+
+    def test_access_log(self):
+        with self.assertLogs("anybadge.server.access", "INFO") as logs:
+            log_access("127.0.0.1", "GET", "/badge/a-b.svg", 200, 1000, 0.0012)
+        self.assertEqual(
+            [
+                'INFO:anybadge.server.access:127.0.0.1 "GET /badge/a-b.svg" 200 1000 1.2ms'
+            ],
+            logs.output,
+        )
+
+    def test_access_log_sampling(self):
+        server_config.ACCESS_LOG_SAMPLE_RATE = 0.0
+        with self.assertLogs("anybadge.server.access", "INFO") as logs:
+            log_access("127.0.0.1", "GET", "/badge/a-b.svg", 200, 1000, 0.001)
+            log_access("127.0.0.1", "GET", "/badge/a-b.svg", 500, 10, 0.001)
+        self.assertEqual(1, len(logs.records))
+        self.assertEqual(500, logs.records[0].http["status"])
+
+    def test_json_access_log(self):
+        with self.assertLogs("anybadge.server.access", "INFO") as logs:
+            log_access("127.0.0.1", "GET", "/badge/a-b.svg", 200, 1000, 0.001)
+        data = json.loads(JsonFormatter().format(logs.records[0]))
+        self.assertEqual("anybadge.server.access", data["logger"])
+        self.assertEqual("GET", data["method"])
+        self.assertEqual(200, data["status"])
+        self.assertEqual(1.0, data["duration_ms"])
+
+    def test_server_writes_access_log(self):
+        server = AnyBadgeHTTPServer(("127.0.0.1", 0), AnyBadgeHTTPRequestHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with self.assertLogs("anybadge.server.access", "INFO") as logs:
+                host, port = server.server_address
+                requests.get(f"http://{host}:{port}/badge/a-b.svg")
+                # The request is logged after the response has been sent.
+                deadline = time.monotonic() + 5
+                while not logs.records and time.monotonic() < deadline:
+                    time.sleep(0.01)
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual("/badge/a-b.svg", logs.records[0].http["path"])
+
+
+class TestPrewarm(TestCase):
+    """Test case class for prewarming the render cache."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.prewarm_file = Path(self.directory.name) / "prewarm.txt"
+        self.prewarm_file.write_text(
+            "# Badges to prewarm\n"
+            "/badge/build-passing.svg\n"
+            "http://badges.example.com/?label=coverage&value=80\n"
+            "release-1.0-blue\n"
+            '{"value": 65, "style": "coverage"}\n'
+            '127.0.0.1 "GET /badge/build-passing.svg" 200 1020 1.2ms\n'
+            "/badge/invalid.svg\n"
+            "\n"
+        )
+
+    def test_prewarm(self):
+        app = AnyBadgeApp()
+        self.assertEqual(4, prewarm(app, self.prewarm_file))
+        self.assertEqual(4, app.cache.stats["renders"])
+
+        app.handle(Request("GET", "/badge/build-passing.svg"))
+        app.handle(Request("GET", "/badge/coverage-80.svg"))
+        self.assertEqual(4, app.cache.stats["renders"])
+
+    def test_background_prewarm_reports_readiness(self):
+        app = AnyBadgeApp()
+        self.assertEqual(200, app.handle(Request("GET", "/ready")).status)
+
+        thread = PrewarmThread(app, self.prewarm_file)
+        response = app.handle(Request("GET", "/ready"))
+        self.assertEqual(503, response.status)
+        self.assertEqual("1", response.headers["Retry-After"])
+
+        thread.start()
+        thread.join()
+        self.assertEqual(200, app.handle(Request("GET", "/ready")).status)
+        self.assertEqual(4, app.cache.stats["renders"])
+
+
+class TestBadgeStore(TestCase):
+    """Test case class for the server badge store."""
+
+    def test_update_is_all_or_nothing(self):
+        store = BadgeStore()
+        with self.assertRaises(ValueError):
+            store.update({"good": {"label": "a", "value": "b"}, "bad": {"label": "a"}})
+        self.assertIsNone(store.get("good"))
+
+    def test_invalid_names(self):
+        store = BadgeStore()
+        for name in ["", "a/b", "badge.svg", "a b"]:
+            with self.assertRaises(ValueError):
+                store.set(name, {"label": "a", "value": "b"})
+
+    def test_snapshot_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot_file = Path(directory) / "badges.json"
+            store = BadgeStore(snapshot_file)
+            self.assertFalse(store.snapshot())
+
+            store.set("build", {"label": "build", "value": "passing"})
+            self.assertTrue(store.snapshot())
+            self.assertFalse(store.snapshot())
+
+            loaded = BadgeStore(snapshot_file)
+            loaded.load()
+            self.assertEqual(["build"], loaded.names())
+            self.assertIn(b">passing<", loaded.get("build"))
+
+    def test_sqlite_store_is_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot_file = Path(directory) / "badges.json"
+            store = SQLiteBadgeStore(Path(directory) / "store.db", snapshot_file)
+            other = SQLiteBadgeStore(Path(directory) / "store.db")
+
+            store.set("build", {"label": "build", "value": "passing"})
+            self.assertEqual(["build"], other.names())
+            self.assertIn(b">passing<", other.get("build"))
+            self.assertIsNone(other.get("missing"))
+
+            with self.assertRaises(ValueError):
+                other.update({"good": {"label": "a", "value": "b"}, "bad": {}})
+            self.assertEqual(1, len(store))
+
+            # Updates from any process are included in the snapshot.
+            self.assertTrue(store.snapshot())
+            other.set("coverage", {"value": 65, "style": "coverage"})
+            self.assertTrue(store.snapshot())
+            self.assertFalse(store.snapshot())
+
+            loaded = SQLiteBadgeStore(Path(directory) / "loaded.db", snapshot_file)
+            loaded.load()
+            self.assertEqual(["build", "coverage"], loaded.names())
+            self.assertEqual(store.specs(), loaded.specs())
+
+    def test_store_size_limit(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for store in [
+                BadgeStore(max_badges=2),
+                SQLiteBadgeStore(Path(directory) / "store.db", max_badges=2),
+            ]:
+                spec = {"label": "build", "value": "passing"}
+                store.update({"a": spec, "b": spec})
+                # Replacing stored badges does not add to the size of the store.
+                store.update({"a": spec, "b": spec})
+                with self.assertRaises(LimitExceeded):
+                    store.update({"b": spec, "c": spec})
+                self.assertEqual(["a", "b"], store.names())
+
+
+class TestServerThresholds(TestCase):
+    """Test case class for parsing thresholds passed to the server."""
+
+    def test_numeric_thresholds_are_sorted(self):
+        thresholds = parse_thresholds("10=green,2=red 8=yellow  4=orange")
+        self.assertEqual(["2", "4", "8", "10"], list(thresholds.keys()))
+
+    def test_invalid_thresholds(self):
+        for text in ["", "2", "2=", "=red", "2=red 4"]:
+            with self.assertRaises(ValueError):
+                parse_thresholds(text)
+
+    def test_thresholds_are_cached(self):
+        get_thresholds.cache_clear()
+        first = get_thresholds("2=red 4=orange")
+        second = get_thresholds("2=red 4=orange")
+        self.assertIs(first, second)
+        self.assertEqual(1, get_thresholds.cache_info().hits)
+
+    def test_cached_thresholds_are_sorted_once(self):
+        from anybadge.badge import _sorted_threshold_items
+
+        params = params_from_spec({"value": 65, "style": "coverage"})
+        render_svg(params)
+        misses = _sorted_threshold_items.cache_info().misses
+        render_svg(params_from_spec({"value": 75, "style": "coverage"}))
+        self.assertEqual(misses, _sorted_threshold_items.cache_info().misses)
+
+
+class TestAnyBadgeApp(TestCase):
+    """Test case class for the server application core."""
+
+    def test_head_request_is_handled_as_get(self):
+        app = AnyBadgeApp()
+        get = app.handle(Request("GET", "/badge/build-passing.svg"))
+        head = app.handle(Request("HEAD", "/badge/build-passing.svg"))
+        self.assertEqual(get.status, head.status)
+        self.assertEqual(get.headers, head.headers)
+
+    def test_badge_path_round_trip(self):
+        for label, value in [
+            ("temp", "-5"),
+            ("delta-", "5"),
+            ("-a-b-", "--1--"),
+            ("-", "my_project 110%"),
+        ]:
+            path = badge_path(label, value, "green")
+            spec = path[len("/badge/") : -len(".svg")]
+            self.assertEqual([label, value, "green"], split_spec(spec), path)
+
+        app = AnyBadgeApp()
+        response = app.handle(Request("GET", "/", "label=delta&value=-5"))
+        self.assertEqual("/badge/delta-%2D5.svg", response.headers["Location"])
+        response = app.handle(Request("GET", response.headers["Location"]))
+        self.assertIn(b">delta<", response.body)
+        self.assertIn(b">-5<", response.body)
+
+    def test_help_page_host(self):
+        app = AnyBadgeApp(host="badges.example.com")
+        response = app.handle(Request("GET", "/"))
+        self.assertIn(b"http://badges.example.com/badge/", response.body)
+
+        response = app.handle(Request("GET", "/", headers={"host": "[::1]:8000"}))
+        self.assertEqual(200, response.status)
+        self.assertIn(b"http://[::1]:8000/badge/", response.body)
+
+        for host in ['"><script>alert(1)</script>', "example.com/path", "a b"]:
+            response = app.handle(Request("GET", "/", headers={"host": host}))
+            self.assertEqual(400, response.status, host)
+            self.assertNotIn(b"<script>", response.body)
+
+    def test_stats(self):
+        app = AnyBadgeApp()
+        app.handle(Request("GET", "/badge/build-passing.svg"))
+        app.handle(Request("GET", "/badge/build-passing.svg"))
+        response = app.handle(Request("GET", "/stats"))
+        stats = json.loads(response.body)["render_cache"]
+        self.assertEqual(1, stats["renders"])
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(0, stats["coalesced"])
+        self.assertIn("hit_rate", json.loads(response.body)["text_width_cache"])
+
+    def test_input_limits(self):
+        app = AnyBadgeApp()
+        long_text = "x" * 1000
+        for path, query_string, status in [
+            ("/badge/build-passing.svg", "x=" + "a" * 3000, 414),
+            (f"/badge/{long_text}-passing.svg", "", 400),
+            (f"/badge/build-{long_text}.svg", "", 400),
+            (
+                "/thresholds/" + "%20".join(f"{i}=red" for i in range(50)) + "/a-1.svg",
+                "",
+                400,
+            ),
+        ]:
+            response = app.handle(Request("GET", path, query_string))
+            self.assertEqual(status, response.status, path)
+
+        self.assertEqual(
+            {
+                "rejected_url_length": 1,
+                "rejected_label_length": 1,
+                "rejected_value_length": 1,
+                "rejected_thresholds": 1,
+            },
+            app.counters,
+        )
+        self.assertEqual(0, app.cache.stats["renders"])
+
+    def test_invalid_field_types_are_rejected(self):
+        app = AnyBadgeApp()
+        for method, path, data in [
+            ("PUT", "/badges/x", {"value": 1, "color": 5}),
+            ("PUT", "/badges/x", {"value": 1, "color": {"x": 1}}),
+            ("PUT", "/badges/x", {"value": [1]}),
+            ("PUT", "/badges/x", {"value": 1, "label": {"a": 1}}),
+            ("PUT", "/badges/x", {"value": 1, "style": True}),
+            ("PUT", "/badges/x", {"value": 1, "thresholds": {"2": ["red"]}}),
+            ("PUT", "/badges/x", {"value": 1, "thresholds": ["2=red"]}),
+            ("POST", "/badges", {"x": {"value": 1, "color": 5}}),
+            ("POST", "/batch", [{"value": 1, "color": ["x"]}]),
+        ]:
+            body = json.dumps(data).encode()
+            request = Request(
+                method,
+                path,
+                headers={"content-length": str(len(body))},
+                read_body=io.BytesIO(body).read,
+            )
+            response = app.handle(request)
+            self.assertEqual(400, response.status, data)
+        self.assertEqual(0, len(app.store))
+
+    def test_pushed_badge_limits(self):
+        app = AnyBadgeApp()
+        body = json.dumps({"label": "build", "value": "x" * 1000}).encode()
+        request = Request(
+            "PUT",
+            "/badges/build",
+            headers={"content-length": str(len(body))},
+            read_body=io.BytesIO(body).read,
+        )
+        self.assertEqual(400, app.handle(request).status)
+        self.assertEqual(1, app.counters["rejected_value_length"])
+
+        body = json.dumps(
+            {f"badge{i}": {"value": i} for i in range(server_config.MAX_BATCH_SIZE + 1)}
+        ).encode()
+        request = Request(
+            "POST",
+            "/badges",
+            headers={"content-length": str(len(body))},
+            read_body=io.BytesIO(body).read,
+        )
+        self.assertEqual(413, app.handle(request).status)
+        self.assertEqual(1, app.counters["rejected_batch_size"])
+        self.assertEqual(0, len(app.store))
+
+        app = AnyBadgeApp(store=BadgeStore(max_badges=1))
+        for name, status in [("a", 200), ("a", 200), ("b", 413)]:
+            body = json.dumps({"label": "build", "value": "passing"}).encode()
+            request = Request(
+                "PUT",
+                f"/badges/{name}",
+                headers={"content-length": str(len(body))},
+                read_body=io.BytesIO(body).read,
+            )
+            self.assertEqual(status, app.handle(request).status)
+        self.assertEqual(1, app.counters["rejected_stored_badges"])
+
+    def test_batch_query(self):
+        app = AnyBadgeApp()
+        response = app.handle(
+            Request("GET", "/batch", "badge=build-passing&badge=coverage-80%25-green")
+        )
+        self.assertEqual(200, response.status)
+        badges = json.loads(response.body)
+        self.assertEqual(["build-passing", "coverage-80%-green"], list(badges))
+        self.assertIn(">80%<", badges["coverage-80%-green"])
+
+    def test_batch_errors_leave_shared_errors_unchanged(self):
+        app = AnyBadgeApp()
+        # Requests waiting for the same render are given the same error.
+        error = LimitExceeded("Label is too long.", "label_length")
+
+        def render(params):
+            raise error
+
+        app.cache.render = render  # type: ignore
+        for _ in range(2):
+            response = app.handle(Request("GET", "/batch", "badge=build-passing"))
+            self.assertEqual(400, response.status)
+            self.assertEqual(
+                b"Badge 'build-passing': Label is too long.", response.body
+            )
+        self.assertEqual(("Label is too long.",), error.args)
+        self.assertEqual(2, app.counters["rejected_label_length"])
+
+    def test_batch_json_sprite(self):
+        app = AnyBadgeApp()
+        body = json.dumps(
+            {
+                "build": {"label": "build", "value": "passing"},
+                "build-copy": {"label": "build", "value": "passing"},
+                "coverage": {"value": 45, "style": "coverage"},
+            }
+        ).encode()
+        request = Request(
+            "POST",
+            "/batch.svg",
+            headers={"content-length": str(len(body))},
+            read_body=io.BytesIO(body).read,
+        )
+        response = app.handle(request)
+        self.assertEqual(200, response.status)
+        self.assertEqual("image/svg+xml", response.headers["Content-Type"])
+
+        root = ET.fromstring(response.body)
+        ns = "{http://www.w3.org/2000/svg}"
+        views = [view.get("id") for view in root.iter(f"{ns}view")]
+        self.assertEqual(["build", "build-copy", "coverage"], views)
+        ids = [element.get("id") for element in root.iter() if element.get("id")]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual("64", root.get("height"))
+        self.assertEqual(1, app.cache.stats["hits"])
+
+    def test_batch_errors(self):
+        app = AnyBadgeApp()
+        response = app.handle(Request("GET", "/batch", "badge=build"))
+        self.assertEqual(400, response.status)
+        self.assertEqual(400, app.handle(Request("GET", "/batch")).status)
+        too_many = "&".join(f"badge=a-{i}" for i in range(101))
+        self.assertEqual(400, app.handle(Request("GET", "/batch", too_many)).status)
+        self.assertEqual(1, app.counters["rejected_batch_size"])
+
+    def test_method_not_allowed(self):
+        response = AnyBadgeApp().handle(Request("PUT", "/badge/build-passing.svg"))
+        self.assertEqual(405, response.status)
+
+    def test_push_badge(self):
+        app = AnyBadgeApp()
+        body = json.dumps({"label": "build", "value": "passing"}).encode()
+        request = Request(
+            "PUT",
+            "/badges/build",
+            headers={"content-length": str(len(body))},
+            read_body=io.BytesIO(body).read,
+        )
+        self.assertEqual(200, app.handle(request).status)
+        self.assertIn(b">passing<", app.store.get("build"))
+
+
+class TestWSGIApplication(TestCase):
+    """Test case class for the WSGI front end."""
+
+    def request(self, method, path, query_string="", body=b""):
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": query_string,
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+        setup_testing_defaults(environ)
+        started = []
+        result = self.app(
+            environ, lambda status, headers: started.append((status, headers))
+        )
+        status, headers = started[0]
+        return status, dict(headers), b"".join(result)
+
+    def setUp(self):
+        self.app = WSGIApplication()
+
+    def test_badge_request(self):
+        status, headers, body = self.request(
+            "GET", "/badge/Project_Awesomeness-110%-green.svg"
+        )
+        self.assertEqual("200 OK", status)
+        self.assertEqual("image/svg+xml", headers["Content-Type"])
+        self.assertEqual(str(len(body)), headers["Content-Length"])
+        self.assertIn(b">Project Awesomeness<", body)
+        self.assertIn(b">110%<", body)
+
+    def test_query_string_redirect(self):
+        status, headers, _ = self.request("GET", "/", "label=build&value=passing")
+        self.assertEqual("301 Moved Permanently", status)
+        self.assertEqual("/badge/build-passing.svg", headers["Location"])
+
+    def test_head_request_has_no_body(self):
+        status, headers, body = self.request("HEAD", "/badge/build-passing.svg")
+        self.assertEqual("200 OK", status)
+        self.assertNotEqual("0", headers["Content-Length"])
+        self.assertEqual(b"", body)
+
+    def test_push_badge(self):
+        body = json.dumps({"label": "build", "value": "passing"}).encode()
+        status, _, _ = self.request("PUT", "/badges/build", body=body)
+        self.assertEqual("200 OK", status)
+        status, _, body = self.request("GET", "/badges/build.svg")
+        self.assertEqual("200 OK", status)
+        self.assertIn(b">passing<", body)
+
+
+class TestASGIApplication(TestCase):
+    """Test case class for the ASGI front end."""
+
+    def request(self, method, path, query_string=b"", body=b""):
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query_string": query_string,
+            "headers": [(b"content-length", str(len(body)).encode())],
+        }
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.app(scope, receive, send))
+        start, response_body = sent
+        return start["status"], dict(start["headers"]), response_body["body"]
+
+    def setUp(self):
+        self.app = ASGIApplication()
+
+    def test_badge_request(self):
+        status, headers, body = self.request(
+            "GET", "/badge/Project_Awesomeness-110%-green.svg"
+        )
+        self.assertEqual(200, status)
+        self.assertEqual(b"image/svg+xml", headers[b"content-type"])
+        self.assertIn(b">Project Awesomeness<", body)
+        self.assertIn(b">110%<", body)
+
+    def test_not_found(self):
+        status, _, _ = self.request("GET", "/missing")
+        self.assertEqual(404, status)
+
+    def test_push_badge(self):
+        body = json.dumps({"build": {"label": "build", "value": "passing"}}).encode()
+        status, _, _ = self.request("POST", "/badges", body=body)
+        self.assertEqual(200, status)
+        status, _, body = self.request("GET", "/badges/build.svg")
+        self.assertEqual(200, status)
+        self.assertIn(b">passing<", body)
+
+    def test_lifespan(self):
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        asyncio.run(self.app({"type": "lifespan"}, receive, send))
+        self.assertEqual(
+            ["lifespan.startup.complete", "lifespan.shutdown.complete"], sent
+        )